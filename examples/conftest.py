@@ -0,0 +1,2 @@
+# Coroutine cases of target_is_async are run by "eztest test --mode async", pytest cannot run them.
+collect_ignore = ['target_is_async']
@@ -0,0 +1,19 @@
+import asyncio
+
+
+def setup_module():
+    print('Setup module')
+
+
+def teardown_module():
+    print('Teardown module')
+
+
+async def test_hello():
+    await asyncio.sleep(1)
+    print('Hello')
+
+
+async def test_world():
+    await asyncio.sleep(1)
+    print('World')
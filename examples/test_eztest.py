@@ -53,6 +53,30 @@ def frequent_test():
                  '--nolog'])
 
 
+def pool_test():
+    """Frequent pool testing, put stress count arrivals per internal in second into a queue for limit count of workers."""
+    file_path = os.path.join('target_is_test_func', 'test_case.py')
+    eztest.main(['', 'test',
+                 '-m', 'pool',
+                 '-t', file_path,
+                 '-d', '1',
+                 '-s', '2',
+                 '-l', '4',
+                 '-i', '1',
+                 '--nolog'])
+
+
+def async_test():
+    """Async testing, define stress count of virtual users and ends datetime."""
+    file_path = os.path.join('target_is_async', 'test_case.py')
+    eztest.main(['', 'test',
+                 '-m', 'async',
+                 '-t', file_path,
+                 '-s', '1000',
+                 '--duration', '1',
+                 '--nolog'])
+
+
 def ignore_cases():
     """Define cases to be ignored."""
     file_path = os.path.join('target_is_test_func', 'test_case.py')
@@ -103,6 +127,8 @@ if __name__ == '__main__':
     # simultaneous_test()
     # concurrency_test()
     # frequent_test()
+    # pool_test()
+    # async_test()
     # ignore_cases()
     # target_is_unittest()
     # target_is_module()
@@ -4,23 +4,34 @@ Copyright (C) 2014 lgt, version 1.0 by lgt
 * https://github.com/lgt1001/eztest
 """
 import argparse
+import copy
 import datetime
 import importlib
 import inspect
 import os
 import re
+import signal
 import socket
 import sys
+import threading
 import traceback
 
 import psutil
 
-from . import calc_report, ini, mail, report, testcase, testmode, utility
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from . import calc_report, compression, datagram, ini, loadprofile, mail, report, resultlog, testcase, testmode, thinktime, utility
 
 __version__ = '2.0.2'
 module_name = 'eztest'
 version = '{} v{}'.format(module_name, __version__)
 __all__ = ['calc_report', 'ini', 'report', 'stringbuilder', 'testcase', 'utility']
+PROCESS_STARTS_DELAY = 5
+AGENT_PORT = 8766
+PROFILE_MODES = [testmode.CONCURRENCY, testmode.FREQUENT, testmode.FREQUENT_POOL, testmode.ARRIVAL_RATE, testmode.ASYNC]
 
 
 class CaseType(object):
@@ -166,12 +177,12 @@ def _load_cases(target, case_matches=None, ignore_match_parts=None, class_matche
     return results
 
 
-def _get_report_server(report_server):
+def _get_report_server(report_server, default_port=8765):
     host_port = report_server.split(':')
     if len(host_port) > 1:
         host, port = host_port[0], int(host_port[1])
     else:
-        host, port = report_server, 8765
+        host, port = report_server, default_port
     return host, port
 
 
@@ -191,9 +202,30 @@ def _get_test_mode(mode):
         test_mode = testmode.CONCURRENCY
     elif mode in ['4', 'FREQUENT']:
         test_mode = testmode.FREQUENT
+    elif mode in ['5', 'POOL']:
+        test_mode = testmode.FREQUENT_POOL
+    elif mode in ['6', 'RATE']:
+        test_mode = testmode.ARRIVAL_RATE
+    elif mode in ['7', 'ASYNC']:
+        test_mode = testmode.ASYNC
     return test_mode
 
 
+def _is_coroutine_case(case):
+    """Whether case defines coroutine functions.
+
+    :param testcase.BaseCase case: case.
+    :return bool: True or False.
+    """
+    iscoroutinefunction = getattr(inspect, 'iscoroutinefunction', None)
+    if iscoroutinefunction is None:
+        return False
+    for name in ['initialize', 'run', 'verify', 'dispose']:
+        if iscoroutinefunction(getattr(case, name, None)):
+            return True
+    return False
+
+
 def _get_mail_configuration(mail_config):
     """Get mail configuration.
 
@@ -213,9 +245,16 @@ def dump(args):
     print('Dumping from report server: {} ...'.format(args.report_server))
     s = None
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.sendto(b'dump', _get_report_server(args.report_server))
-        data, _ = s.recvfrom(65535)
+        if args.transport == datagram.TCP:
+            s = socket.create_connection(_get_report_server(args.report_server), 60)
+            s.sendall(datagram.pack_frame(b'dump'))
+            data = datagram.read_frame(s.makefile('rb'), max_size=2 ** 32 - 1)
+            if data is None:
+                raise ConnectionError('Connection is closed by report server')
+        else:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.sendto(b'dump', _get_report_server(args.report_server))
+            data, _ = s.recvfrom(65535)
         print(data.decode('utf-8'))
     except ConnectionError:
         print('ConnectionError: unable to connect to {}'.format(args.report_server))
@@ -228,11 +267,118 @@ def dump(args):
 
 def calc(args):
     """Calculate by grouping case results with [group-minutes] minutes."""
-    calc_report.calc(args.path, group_minutes=args.group_minutes)
+    calc_report.calc(args.path, group_minutes=args.group_minutes, processes=args.processes,
+                     state_path=args.state)
 
 
-def test(args):
-    """Start eztest for target cases, classes, modules."""
+def convert(args):
+    """Convert binary result logs to CSV report files, [path].csv will be created for each of them."""
+    for file_path in args.path:
+        if not os.path.isfile(file_path) or not resultlog.is_result_log(file_path):
+            print('Not binary result log, ignore file: {}'.format(file_path))
+            continue
+        csv_file_path = file_path + '.csv'
+        count = resultlog.to_csv(file_path, csv_file_path)
+        print('Converted {} case results from {} to {}.'.format(count, file_path, csv_file_path))
+
+
+def _create_test(mode, args):
+    """Create test mode object from command line.
+
+    :param int mode: test mode.
+    :param args: arguments from command line.
+    :return testmode.NormalTest: test mode object.
+    """
+    if mode == testmode.NORMAL:
+        nt = testmode.NormalTest()
+    elif mode == testmode.CONTINUOUS:
+        nt = testmode.ContinuousTest()
+        nt.repeat_times = args.repeat
+        nt.interval_seconds = args.interval
+    elif mode == testmode.SIMULTANEOUS:
+        nt = testmode.SimultaneousTest()
+        nt.thread_count = args.stress
+        nt.repeat_times = args.repeat
+        nt.interval_seconds = args.interval
+    elif mode == testmode.CONCURRENCY:
+        nt = testmode.ConcurrencyTest()
+        nt.thread_count = args.stress
+        nt.interval_seconds = args.interval
+        nt.pacing_seconds = args.pacing
+    elif mode == testmode.FREQUENT:
+        nt = testmode.FrequentTest()
+        nt.thread_count = args.stress
+        nt.max_thread_count = args.limit
+        nt.interval_seconds = args.interval
+    elif mode == testmode.FREQUENT_POOL:
+        nt = testmode.FrequentPoolTest()
+        nt.thread_count = args.stress
+        nt.max_thread_count = args.limit
+        nt.queue_size = args.queue_size
+        nt.interval_seconds = args.interval
+    elif mode == testmode.ARRIVAL_RATE:
+        nt = testmode.ArrivalRateTest()
+        nt.thread_count = args.stress
+        nt.max_thread_count = args.limit
+        nt.queue_size = args.queue_size
+        nt.arrival_rate = args.rate
+    else:
+        from ._asyncmode import AsyncTest
+        nt = AsyncTest()
+        nt.thread_count = args.stress
+        nt.interval_seconds = args.interval
+        nt.pacing_seconds = args.pacing
+    if args.think_time:
+        nt.think_time = thinktime.parse_think_time(args.think_time)
+    stages = loadprofile.get_stages(args.stages, args.profile)
+    if stages:
+        if mode not in PROFILE_MODES:
+            raise ValueError('Load profile is only supported in concurrency, frequent, pool, rate and async mode.')
+        nt.set_profile(loadprofile.LoadProfile(stages))
+    nt.starts_time = args.starts
+    if args.ends:
+        nt.ends_time = args.ends
+    elif args.duration is not None and args.duration > 0:
+        dtnow = datetime.datetime.now()
+        nt.ends_time = (args.starts if args.starts and args.starts > dtnow else dtnow) + datetime.timedelta(minutes=args.duration)
+    nt.no_report = args.noreport
+    nt.report_batch_size = args.report_batch_size
+    nt.report_flush_interval = args.report_flush_interval
+    nt.report_format = args.report_format
+    if args.report_folder:
+        nt.report_folder = args.report_folder
+    if args.report_server:
+        nt.report_server = _get_report_server(args.report_server)
+        nt.report_transport = args.report_transport
+        nt.report_payload_limit = args.report_payload_limit
+    elif not nt.no_report:
+        nt.check_report_format()
+    return nt
+
+
+def _watch_cancel(nt, cancel_event):
+    """Cancel testing once cancel_event is set, until testing is finished.
+
+    :param testmode.NormalTest nt: test mode object.
+    :param cancel_event: event, e.g.: multiprocessing.Event.
+    """
+    while not nt.wait(0.5):
+        if cancel_event.is_set() and not nt.is_cancelled:
+            nt.cancel()
+
+
+def _run_tests(args, report_queue=None, cancel_event=None, progress_queue=None, progress_interval=None):
+    """Load cases from target, build test mode and start testing.
+
+    :param args: arguments from command line.
+    :param report_queue: queue which formatted case results will be put into instead of report file.
+    :param cancel_event: event which will cancel testing once it is set.
+    :param progress_queue: queue which (count of finished cases, count of failed cases, None) will be put into per
+        [progress_interval] seconds while testing is running.
+    :param float progress_interval: seconds.
+    :return tuple: count of finished cases, count of failed cases.
+    """
+    finished_count, failed_count = 0, 0
     mode = _get_test_mode(args.mode)
     mal = _get_mail_configuration(args.mail_config)
     results = _load_cases(args.target,
@@ -244,6 +390,8 @@ def test(args):
         cases = result.get('cases')
         if not cases:
             continue
+        if cancel_event is not None and cancel_event.is_set():
+            break
         if result.get('type') == CaseType.ClassCase:
             for c in cases:
                 c.no_log = args.nolog
@@ -266,50 +414,193 @@ def test(args):
                     bc.dispose = result.get('teardown_function')
                 bc.run = c
                 n_cases.append(bc)
-        if mode == testmode.NORMAL:
-            nt = testmode.NormalTest()
-        elif mode == testmode.CONTINUOUS:
-            nt = testmode.ContinuousTest()
-            nt.repeat_times = args.repeat
-            nt.interval_seconds = args.interval
-        elif mode == testmode.SIMULTANEOUS:
-            nt = testmode.SimultaneousTest()
-            nt.thread_count = args.stress
-            nt.repeat_times = args.repeat
-            nt.interval_seconds = args.interval
-        elif mode == testmode.CONCURRENCY:
-            nt = testmode.ConcurrencyTest()
-            nt.thread_count = args.stress
-            nt.interval_seconds = args.interval
-        else:
-            nt = testmode.FrequentTest()
-            nt.thread_count = args.stress
-            nt.max_thread_count = args.limit
-            nt.interval_seconds = args.interval
-        nt.starts_time = args.starts
-        if args.ends:
-            nt.ends_time = args.ends
-        elif args.duration is not None and args.duration > 0:
-            dtnow = datetime.datetime.now()
-            nt.ends_time = (args.starts if args.starts and args.starts > dtnow else dtnow) + datetime.timedelta(minutes=args.duration)
-        nt.no_report = args.noreport
-        if args.report_folder:
-            nt.report_folder = args.report_folder
-        if args.report_server:
-            nt.report_server = _get_report_server(args.report_server)
+        if mode != testmode.ASYNC and any(_is_coroutine_case(c) for c in n_cases):
+            raise ValueError('Cases of {} are coroutine functions, please use async mode.'.format(result.get('module_name')))
+        nt = _create_test(mode, args)
+        nt.report_queue = report_queue
         nt.mail = mal
         if 'setup_module' in result:
             nt.setup = result.get('setup_module')
         if 'teardown_module' in result:
             nt.teardown = result.get('teardown_module')
         nt.cases = n_cases
+        if cancel_event is not None:
+            watcher = threading.Thread(target=_watch_cancel, args=(nt, cancel_event))
+            watcher.daemon = True
+            watcher.start()
         nt.run()
+        if progress_queue is None:
+            nt.wait()
+        else:
+            while not nt.wait(progress_interval):
+                progress_queue.put((finished_count + nt.case_finished_count, failed_count + nt.case_failed_count, None))
+        finished_count += nt.case_finished_count
+        failed_count += nt.case_failed_count
         if mode == testmode.NORMAL:
             print('*' * 80)
             print('Summary of %s:' % result.get('module_name'))
             for c in n_cases:
                 print('%s\t%s' % (c.id, 'Pass' if c.status else 'Fail'))
             print('*' * 80)
+    return finished_count, failed_count
+
+
+def _run_in_process(args, report_queue, cancel_event, summary_queue, progress_interval=None):
+    """Start testing in worker process of [processes] or agent.
+
+    :param args: arguments from command line.
+    :param report_queue: queue which formatted case results will be put into, None will be put at the end.
+    :param cancel_event: event which will cancel testing once it is set.
+    :param summary_queue: queue which (count of finished cases, count of failed cases, finished datetime) will be put
+        into at the end.
+    :param float progress_interval: (count of finished cases, count of failed cases, None) will be put into
+        summary_queue per [progress_interval] seconds while testing is running, if it is set.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    finished_count, failed_count = 0, 0
+    try:
+        finished_count, failed_count = _start_tests(args, cancel_event, report_queue,
+                                                    summary_queue if progress_interval else None, progress_interval)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        if report_queue is not None:
+            report_queue.put(None)
+        summary_queue.put((finished_count, failed_count, datetime.datetime.now()))
+
+
+def _test_in_processes(args, cancel_event=None):
+    """Start [processes] worker processes, each of them runs testing with its share of [stress], [limit] and [rate].
+    Case results will be merged into one report file.
+
+    :param args: arguments from command line.
+    :param cancel_event: event which will cancel testing once it is set.
+    :return tuple: count of finished cases, count of failed cases.
+    """
+    import multiprocessing
+    mode = _get_test_mode(args.mode)
+    dtnow = datetime.datetime.now()
+    if args.starts and args.starts > dtnow:
+        starts = args.starts
+    else:
+        starts = dtnow + datetime.timedelta(seconds=PROCESS_STARTS_DELAY)
+    ends = args.ends
+    if not ends and args.duration is not None and args.duration > 0:
+        ends = starts + datetime.timedelta(minutes=args.duration)
+
+    stages = loadprofile.get_stages(args.stages, args.profile)
+    collector = testmode.NormalTest()
+    collector.no_report = args.noreport or bool(args.report_server)
+    collector.report_batch_size = args.report_batch_size
+    collector.report_flush_interval = args.report_flush_interval
+    collector.report_format = args.report_format
+    if args.report_folder:
+        collector.report_folder = args.report_folder
+    collector.additional_report_header = _create_test(mode, args).additional_report_header
+    collector.mail = _get_mail_configuration(args.mail_config)
+    report_queue = None if collector.no_report else multiprocessing.Queue()
+    summary_queue = multiprocessing.Queue()
+    if cancel_event is None:
+        cancel_event = multiprocessing.Event()
+
+    processes = []
+    for i in range(args.processes):
+        child_args = copy.copy(args)
+        child_args.processes = 1
+        child_args.stress = utility.split_value(args.stress, args.processes, i)
+        child_args.limit = utility.split_value(args.limit, args.processes, i)
+        child_args.rate = args.rate / args.processes
+        child_args.starts = starts
+        child_args.ends = ends
+        child_args.duration = None
+        child_args.mail_config = None
+        if stages:
+            child_args.stages = [str(stage) for stage in loadprofile.split_stages(stages, args.processes, i)]
+            child_args.profile = None
+        elif child_args.stress <= 0:
+            continue
+        processes.append(multiprocessing.Process(target=_run_in_process,
+                                                 args=(child_args, report_queue, cancel_event, summary_queue)))
+    print('Starting {} processes, testing will be started at {}...'.format(len(processes), starts))
+    collector.open_report()
+    for pr in processes:
+        pr.start()
+
+    finished_count = 0
+    while finished_count < len(processes):
+        try:
+            if report_queue is None:
+                processes[finished_count].join()
+                finished_count += 1
+                continue
+            try:
+                report_msg = report_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(pr.is_alive() for pr in processes):
+                    break
+                continue
+            if report_msg is None:
+                finished_count += 1
+            else:
+                collector.write_report(report_msg)
+        except KeyboardInterrupt:
+            print('Cancelling {} processes...'.format(len(processes)))
+            cancel_event.set()
+    finished_count, failed_count = 0, 0
+    for pr in processes:
+        pr.join()
+    while True:
+        try:
+            counts = summary_queue.get(timeout=1)
+        except queue.Empty:
+            break
+        finished_count += counts[0]
+        failed_count += counts[1]
+    collector.process_finished()
+    return finished_count, failed_count
+
+
+def _start_tests(args, cancel_event=None, report_queue=None, progress_queue=None, progress_interval=None):
+    """Start testing in this process, or in [processes] worker processes.
+
+    :param args: arguments from command line.
+    :param cancel_event: event which will cancel testing once it is set.
+    :param report_queue: queue which formatted case results will be put into instead of report file.
+    :param progress_queue: queue which counts will be put into while testing is running, see _run_tests. It is not
+        supported by [processes] worker processes.
+    :param float progress_interval: seconds.
+    :return tuple: count of finished cases, count of failed cases.
+    """
+    if args.processes > 1:
+        return _test_in_processes(args, cancel_event)
+    else:
+        return _run_tests(args, report_queue, cancel_event, progress_queue, progress_interval)
+
+
+def test(args):
+    """Start eztest for target cases, classes, modules."""
+    dtstart = datetime.datetime.now()
+    if args.starts and args.starts > dtstart:
+        dtstart = args.starts
+    elif args.processes > 1:
+        dtstart = args.starts = dtstart + datetime.timedelta(seconds=PROCESS_STARTS_DELAY)
+    finished_count, failed_count = _start_tests(args)
+    total_seconds = (datetime.datetime.now() - dtstart).total_seconds()
+    print('Finished {} cases({} failed) in {:.3f} seconds, {:.3f} cases per second.'.format(
+        finished_count, failed_count, total_seconds, finished_count / total_seconds if total_seconds > 0 else 0))
+
+
+def agent(args):
+    """Start load agent, which runs testing pushed by controller."""
+    from .agent import start_agent
+    print('Starting eztest agent ...')
+    start_agent(args.port, _run_in_process, bind=args.bind)
+
+
+def controller(args):
+    """Start testing on agents, stop them together and gather their throughput."""
+    from .agent import start_controller
+    start_controller(args, [_get_report_server(a, AGENT_PORT) for a in args.agents or []], args.local_agents, _run_in_process)
 
 
 def stop(args):
@@ -334,7 +625,8 @@ def stop(args):
 def start_server(args):
     """Start report server."""
     print('Starting eztest report server ...')
-    report.start_udp_report_server(args.port, args.handler, args.group_minutes)
+    report.start_udp_report_server(args.port, args.handler, args.group_minutes, args.report_format, args.lateness,
+                                  args.compression)
 
 
 def stop_server(args):
@@ -346,7 +638,11 @@ def stop_server(args):
             continue
         if 'eztest' in cmd and 'server' in cmd and 'start' in cmd:
             print('Stopping eztest report server ...')
-            pr.kill()
+            pr.terminate()  # report server flushes report file before it exits
+            try:
+                pr.wait(10)
+            except psutil.TimeoutExpired:
+                pr.kill()
             break
     else:
         print('No eztest report server process found.')
@@ -364,13 +660,12 @@ def _to_datetime(date_string):
         raise argparse.ArgumentTypeError('Input "{}" is not datetime format(year-month-day hour:minute:second).'.format(date_string))
 
 
-def _define_parser():
-    parser = argparse.ArgumentParser(prog=module_name, description=module_name)
-    parser.add_argument('--version', '-v', action='version', version=__version__)
+def _add_test_arguments(parser):
+    """Add arguments of testing to parser.
 
-    sub_parsers = parser.add_subparsers(dest='eztest')
-    test_parser = sub_parsers.add_parser('test', help='Start eztest for target cases, classes, modules.')
-    case_group = test_parser.add_argument_group('Case Group', 'Define arguments of case related.')
+    :param argparse.ArgumentParser parser: parser.
+    """
+    case_group = parser.add_argument_group('Case Group', 'Define arguments of case related.')
     case_group.add_argument('--target', '-t', required=True,
                             help='Folder or file path, or a module, a __init__.py file is required under that folder/module.')
     case_group.add_argument('--classes', '-cl', nargs='+',
@@ -382,22 +677,49 @@ def _define_parser():
     case_group.add_argument('--not-cases', '-nc', nargs='+',
                             help='''Case names to be ignored. It can be whole case name or part of them(e.g.: "*a", "a*", "*a*").''')
 
-    test_group = test_parser.add_argument_group('Test Mode Group', 'Define arguments of test mode related.')
+    test_group = parser.add_argument_group('Test Mode Group', 'Define arguments of test mode related.')
     test_group.add_argument('--mode', '-m', default='normal',
-                            choices=['0', '1', '2', '3', '4', 'normal', 'continuous', 'simultaneous', 'concurrency', 'frequent'],
+                            choices=['0', '1', '2', '3', '4', '5', '6', '7', 'normal', 'continuous', 'simultaneous', 'concurrency',
+                                     'frequent', 'pool', 'rate', 'async'],
                             help='''(a)0 or normal: Run selected cases only once. 
     (b)1 or continuous: Run cases [repeat] times with [interval] seconds' sleeping. 
     (c)2 or simultaneous: Start [stress] threads and run cases in each thread, sleep [interval] seconds after all cases are finished, and then start testing again with [repeat] times. 
     (d)3 or concurrency: Start [stress] threads and each thread will continuously run cases with [interval] seconds' sleeping. 
-    (e)4 or frequent: Start [stress] threads per [interval] seconds. And only can have [limit] available threads running.''')
+    (e)4 or frequent: Start [stress] threads per [interval] seconds. And only can have [limit] available threads running. 
+    (f)5 or pool: Start [limit] worker threads([stress] if [limit] is not set), and put [stress] arrivals into a queue per [interval] seconds for workers. 
+    (g)6 or rate: Start [limit] worker threads([stress] if [limit] is not set), and put [rate] arrivals per second into a queue for workers. 
+    (h)7 or async: Start [stress] virtual users on one asyncio event loop and each of them will continuously run cases with [interval] seconds' sleeping, 
+    cases can be coroutine functions(e.g.: "async def run(self)" or "async def test_*()").''')
     test_group.add_argument('--stress', '-s', type=int, default=1,
                             help='Start [stress] threads in each round of testing. Default value is 1.')
     test_group.add_argument('--repeat', '-r', type=int, default=1,
                             help='Repeat [repeat] times of testing. Default value is 1')
     test_group.add_argument('--interval', '-i', type=int, default=0,
                             help='Sleep [interval] seconds after one round of testing. Default value is 0.')
+    test_group.add_argument('--think-time', '-tt',
+                            help='Pause [think-time] seconds after each case. The format is "seconds", "constant:seconds", '
+                                 '"uniform:minimum:maximum" or "exponential:mean"(e.g.: "uniform:0.5:1.5").')
+    test_group.add_argument('--pacing', '-pc', type=float, default=0,
+                            help='Each thread or virtual user starts its rounds every [pacing] seconds in concurrency and '
+                                 'async mode, the time cases took is subtracted, and [interval] is ignored. Default value is 0.')
     test_group.add_argument('--limit', '-l', type=int, default=0,
                             help='Only can have [limit] count of running threads. No limitation if this is less than or equals to [stress].')
+    test_group.add_argument('--queue-size', '-qs', type=int, default=0,
+                            help='Only can have [queue-size] arrivals waiting for workers in pool mode, others will be dropped. '
+                                 'Default value is 0, which means the count of workers.')
+    test_group.add_argument('--rate', '-ra', type=float, default=1.0,
+                            help='Start [rate] arrivals per second in rate mode, it can be less than 1. Default value is 1.')
+    test_group.add_argument('--processes', '-ps', type=int, default=1,
+                            help='Start [processes] worker processes, and each of them runs testing with its share of '
+                                 '[stress], [limit] and [rate]. Case results are merged into one report. Default value is 1.')
+    test_group.add_argument('--stages', '-sg', nargs='+',
+                            help='Load profile stages. The format is "[name=]duration:target", target of testing is changed '
+                                 'linearly from target of previous stage to target of this stage within duration seconds, '
+                                 'and testing is stopped after the last stage(e.g.: "warm-up=60:10 300:50 60:0"). '
+                                 'Target is [stress] in concurrency, frequent, pool and async mode, and [rate] in rate mode.')
+    test_group.add_argument('--profile', '-pf',
+                            help='Load profile file, which is INI format file and each section is a stage with "duration" '
+                                 'and "target". Will be ignored if [stages] is provided.')
     test_group.add_argument('--starts', '-st', type=_to_datetime,
                             help='''Testing will be started at [starts]. It is datetime string(e.g.: "2014-01-02 03:04:05").''')
     test_group.add_argument('--duration', '-d', type=int,
@@ -405,11 +727,28 @@ def _define_parser():
     test_group.add_argument('--ends', '-et', type=_to_datetime,
                             help='''Testing will be stopped at [ends]. It is datetime string(e.g.: "2014-01-02 03:04:05").''')
 
-    log_group = test_parser.add_argument_group('Report/Log Group', 'Define arguments of report or log related.')
+    log_group = parser.add_argument_group('Report/Log Group', 'Define arguments of report or log related.')
     log_group.add_argument('--report-folder', '-rf',
                            help='Report and log files will be saved under [report-folder].')
     log_group.add_argument('--report-server', '-rs',
                            help='Report server. The format is "host_name:port_number" or "host_name" with default port number 8765.')
+    log_group.add_argument('--report-transport', '-rt', choices=[datagram.UDP, datagram.TCP], default=datagram.UDP,
+                           help='Transport of case results sent to report server. "tcp" sends them over a persistent '
+                                'connection, which waits for report server and reconnects instead of losing them. '
+                                'Default value is udp.')
+    log_group.add_argument('--report-payload-limit', '-rpl', type=int,
+                           help='Expected, received and output messages of case results sent to report server are '
+                                'truncated to [report-payload-limit] bytes. Default is not truncated.')
+    log_group.add_argument('--report-batch-size', '-rb', type=int, default=1000,
+                           help='Case results are written into report file by a background writer in batches of '
+                                '[report-batch-size] rows, threads running cases wait if too many rows are waiting. '
+                                '0 means writing and flushing each case result in its own thread. Default value is 1000.')
+    log_group.add_argument('--report-flush-interval', '-ri', type=float, default=1.0,
+                           help='Report file is flushed per [report-flush-interval] seconds. Default value is 1.')
+    log_group.add_argument('--report-format', '-rfm', choices=[resultlog.CSV, resultlog.BINARY], default=resultlog.CSV,
+                           help='Format of report file. "binary" writes compact binary result log(.ezr) which is '
+                                'faster to write and can be calculated or converted to CSV later, it does not keep '
+                                '"Intended DateTime" and "Schedule Lag" of rate mode. Default value is csv.')
     log_group.add_argument('--noreport', '-nr', action='store_true',
                            help='No report file will be generated if [noreport] is clarified.')
     log_group.add_argument('--nolog', '-nl', action='store_true',
@@ -423,8 +762,37 @@ def _define_parser():
     "to_mails", "cc_mails" and "bcc_mails" can be multiple values separated by comma. 
     "need_authentication" is boolean, "username" and "password" are required if "need_authentication" is True.''')
 
+
+def _define_parser():
+    parser = argparse.ArgumentParser(prog=module_name, description=module_name)
+    parser.add_argument('--version', '-v', action='version', version=__version__)
+
+    sub_parsers = parser.add_subparsers(dest='eztest')
+    test_parser = sub_parsers.add_parser('test', help='Start eztest for target cases, classes, modules.')
+    _add_test_arguments(test_parser)
     test_parser.set_defaults(func=test)
 
+    agent_parser = sub_parsers.add_parser('agent', help='Start load agent, which runs testing pushed by controller.')
+    agent_parser.add_argument('--port', '-p', type=int, default=AGENT_PORT,
+                              help='Port number. Default value is {}.'.format(AGENT_PORT))
+    agent_parser.add_argument('--bind', '-b', default='127.0.0.1',
+                              help='Address which agent listens on, agent does not authenticate controller, use 0.0.0.0 '
+                                   'to accept controllers of other nodes only in a trusted network. '
+                                   'Default value is 127.0.0.1.')
+    agent_parser.set_defaults(func=agent)
+
+    controller_parser = sub_parsers.add_parser('controller',
+                                               help='Start testing on agents, stop them together and gather their throughput.')
+    agent_group = controller_parser.add_argument_group('Agent Group', 'Define arguments of agents related.')
+    agent_group.add_argument('--agents', '-ag', nargs='+',
+                             help='Agents. The format is "host_name:port_number" or "host_name" with default port number {}. '
+                                  '[stress], [limit] and [rate] are split to agents, testing target should be '
+                                  'available on each agent.'.format(AGENT_PORT))
+    agent_group.add_argument('--local-agents', '-la', type=int, default=0,
+                             help='Start [local-agents] agents as local processes. Default value is 0.')
+    _add_test_arguments(controller_parser)
+    controller_parser.set_defaults(func=controller)
+
     stoptest_parser = sub_parsers.add_parser('stop', help='Stop eztest and its report server.')
     stoptest_parser.set_defaults(func=stop)
 
@@ -435,16 +803,36 @@ def _define_parser():
     port_handler_argument.add_argument('--port', '-p', type=int, default=8765, help='Port number.')
     port_handler_argument.add_argument('--handler', '-hl',
                                        help='Custom handler. The format is: "file_path:handler_class_name", or "module_name:handler_class_name".')
+    port_handler_argument.add_argument('--report-format', '-rfm', choices=[resultlog.CSV, resultlog.BINARY],
+                                       default=resultlog.CSV,
+                                       help='Format of report file saved by default handler. Default value is csv.')
 
     calc_parser = sub_parsers.add_parser('calc', help='Calculate report files generated by eztest.', parents=[group_minutes_argument])
     calc_parser.add_argument('--path', '-p', required=True, nargs='+',
                              help='Report folders or files to be calculated.')
+    calc_parser.add_argument('--processes', '-ps', type=int, default=0,
+                             help='Read report files in [processes] worker processes in parallel, '
+                                  '0 means the number of CPU cores. Default value is 0.')
+    calc_parser.add_argument('--state', '-st',
+                             help='Save summary and position of each report file into [state] file, and only read new '
+                                  'report files and appended case results if it exists.')
     calc_parser.set_defaults(func=calc)
 
+    convert_parser = sub_parsers.add_parser('convert', help='Convert binary result logs to CSV report files.')
+    convert_parser.add_argument('--path', '-p', required=True, nargs='+',
+                                help='Binary result logs to be converted, [path].csv will be created for each of them.')
+    convert_parser.set_defaults(func=convert)
+
     report_parser = sub_parsers.add_parser('server', help='Start|Stop|Restart report server.')
     report_sub = report_parser.add_subparsers(dest='server')
 
     start_parser = report_sub.add_parser('start', parents=[port_handler_argument, group_minutes_argument])
+    start_parser.add_argument('--lateness', '-lt', type=float,
+                              help='Case result which ends more than [lateness] seconds before the latest one of the case '
+                                   'is not added to groups in summary. Default is no limit.')
+    start_parser.add_argument('--compression', '-cp', choices=[compression.GZIP, compression.ZSTD, compression.NONE],
+                              help='Compress rolled over report files in background thread, or none. '
+                                   'Default is zstd if zstandard is installed, else gzip.')
     start_parser.set_defaults(func=start_server)
 
     stop_parser = report_sub.add_parser('stop')
@@ -453,6 +841,9 @@ def _define_parser():
     dump_parser = sub_parsers.add_parser('dump', help='Dump data from report server.')
     dump_parser.add_argument('--report-server', '-rs', default='localhost:8765',
                              help='Report server. The format is "host_name:port_number" or "host_name" with default port number 8765.')
+    dump_parser.add_argument('--transport', '-tp', choices=[datagram.UDP, datagram.TCP], default=datagram.UDP,
+                             help='Dump over UDP, or TCP which is not limited by the maximum size of a datagram. '
+                                  'Default value is udp.')
     dump_parser.set_defaults(func=dump)
 
     return parser, report_parser
@@ -0,0 +1,188 @@
+"""Internal asyncio test mode for coroutine-based cases.
+
+Async Test:
+    a. Start <thread_count> virtual users as tasks on one event loop;
+    b. In each virtual user, do:
+        b.1 Run self.cases one by one, "initialize", "run", "verify" and "dispose" can be coroutine functions;
+        b.2 After all cases are finished, sleep <interval_seconds> seconds without blocking the event loop;
+        b.3 Repeat #b.1 and #b.2 until testing is cancelled.
+"""
+import asyncio
+import datetime
+import inspect
+import traceback
+
+from ._funccase import BuildCase
+from .testcase import ERROR
+from .testmode import ASYNC, PROFILE_INTERVAL_SECONDS, NormalTest, _clock
+
+
+async def _call(func):
+    """Call function, and await its result if it is awaitable.
+
+    :param func: function or coroutine function.
+    :return: result of function.
+    """
+    result = func()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _finish_case(case):
+    """Log status of case, close its log file and call on_finished, which reports case to report file, report queue or
+    report server.
+
+    :param BaseCase case: case.
+    """
+    case.log('-' * 40)
+    if case.status:
+        case.log('Case is Pass.', True)
+    else:
+        case.log('Case is Fail.', True, ERROR)
+    if case._file is not None and (not case._file.closed):
+        case._file.close()
+    if case.on_finished:
+        case.on_finished(case)
+
+
+async def do_case(case):
+    """Will call initialize, run if initialize is True, verify if run is True, and dispose in sequence.
+    Same as BaseCase.do_case, but awaits coroutine functions. Log file is created and case is reported in executor, so
+    that a slow disk or a full report queue does not block the event loop.
+
+    :param BaseCase case: case.
+    """
+    loop = asyncio.get_event_loop()
+    is_build_case = isinstance(case, BuildCase)
+    if not case.no_log and not is_build_case:
+        await loop.run_in_executor(None, case.generate_log)
+    try:
+        flag = await _call(case.initialize)
+        if flag is None or flag:
+            case.start_datetime = datetime.datetime.now()
+            flag = await _call(case.run)
+            case.set_end_time()
+            if is_build_case or flag is None or flag:
+                if not is_build_case:
+                    await _call(case.verify)
+                case.set_status(True)
+            else:
+                case.set_status(False)
+        else:
+            case.set_status(False)
+    except Exception:
+        case.set_end_time()
+        case.status = False
+        case.log_exception()
+    finally:
+        try:
+            await _call(case.dispose)
+        except Exception:
+            pass
+        await loop.run_in_executor(None, _finish_case, case)
+
+
+class AsyncTest(NormalTest):
+    """Async Test:
+    a. Start <thread_count> virtual users as tasks on one event loop;
+    b. In each virtual user, do:
+        b.1 Run self.cases one by one, "initialize", "run", "verify" and "dispose" can be coroutine functions;
+        b.2 After all cases are finished, sleep <interval_seconds> seconds without blocking the event loop;
+        b.3 Repeat #b.1 and #b.2 until testing is cancelled.
+
+    Note: if <pacing_seconds> is set, each virtual user starts its rounds every <pacing_seconds> seconds instead, the
+    time cases took is subtracted from sleeping.
+
+    All cases should inherit from testcase.BaseCase.
+    """
+    def __init__(self):
+        super(AsyncTest, self).__init__()
+        self.thread_count = 1
+        self.interval_seconds = 0
+        self.pacing_seconds = 0
+        self.worker_count = 0
+        self.target_count = 0
+        self.test_mode = ASYNC
+        self._tasks = []
+
+    def reset(self):
+        """Reset: cancel existed testing, clean captured data."""
+        super(AsyncTest, self).reset()
+        self.worker_count = 0
+        self.target_count = 0
+        self._tasks = []
+
+    async def run_cases_async(self, cases):
+        """Run cases in sequence.
+
+        :param list cases: cases."""
+        try:
+            if self.profile is not None:
+                self.tag_stage(cases)
+            for case in cases:
+                if self.is_cancelled:
+                    break
+                if case is not None:
+                    case.on_finished = self.case_finished
+                    await do_case(case)
+                    think_seconds = self.get_think_seconds(case)
+                    if think_seconds > 0:
+                        await asyncio.sleep(think_seconds)
+        finally:
+            self.round_finished += 1
+
+    async def _do_in_task(self):
+        """Continuously run cases in each virtual user."""
+        rpi = 0
+        new_cases = self.new_cases(rpi)
+        while not self.is_cancelled:
+            if self.profile is not None and self.worker_count > self.target_count:
+                self.worker_count -= 1
+                break
+            if rpi > 0:
+                self.renew_cases(new_cases, rpi)
+            rpi += 1
+            self.round_started += 1
+            round_clock = _clock()
+            await self.run_cases_async(new_cases)
+            if self.pacing_seconds > 0:
+                pause_seconds = self.pacing_seconds - (_clock() - round_clock)
+            else:
+                pause_seconds = self.interval_seconds
+            if pause_seconds > 0:
+                await asyncio.sleep(pause_seconds)
+
+    def apply_target(self, target):
+        """Start virtual users, or let virtual users exit after their current round, to reach target concurrency.
+
+        :param float target: target count of virtual users.
+        """
+        self.target_count = int(round(target))
+        for _ in range(self.target_count - self.worker_count):
+            self.worker_count += 1
+            self._tasks.append(asyncio.ensure_future(self._do_in_task()))
+
+    async def _start_tasks(self):
+        """Start virtual users and wait until all of them are finished."""
+        if self.profile is not None:
+            self._profile_start_clock = _clock()
+            while self.update_profile():
+                await asyncio.sleep(PROFILE_INTERVAL_SECONDS)
+        else:
+            self.apply_target(self.thread_count)
+        await asyncio.gather(*self._tasks)
+
+    def start_test(self):
+        """Start Async testing."""
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._start_tasks())
+        except Exception:
+            print('-' * 80)
+            traceback.print_exc()
+        finally:
+            if hasattr(loop, 'shutdown_default_executor'):
+                loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+            self.process_finished()
@@ -7,6 +7,8 @@ from .testcase import BaseCase, ERROR, INFO
 
 class BuildCase(BaseCase):
     """Build case for external function."""
+    reusable = True
+
     def __init__(self):
         super(BuildCase, self).__init__()
 
@@ -0,0 +1,370 @@
+"""Load agent and controller.
+
+Agent: listen on a TCP port, run testing pushed by controller in a worker process, and report its status.
+Controller: split [stress], [limit], [rate] and targets of load profile stages to agents, start them at the same
+instant, stop them together and gather their throughput.
+
+Each request and response is a JSON line:
+{"command": "status"}
+{"command": "start", "args": {...}, "starts_in": 5.0, "duration": 60.0}
+{"command": "stop"}
+
+"starts_in" is seconds from the moment agent receives the request, so that clocks of agents do not need to be
+synchronized with controller.
+
+Agent does not authenticate controller, anyone who can connect to it can run any importable target on its node. It
+listens on 127.0.0.1 by default, bind it to other address only in a trusted network.
+
+examples:
+# Start agents on each node
+eztest agent --bind 0.0.0.0 --port 8766
+
+# Start testing on agents
+eztest controller --agents node1:8766 node2:8766 --target examples.target_is_module --mode concurrency --stress 100 --duration 60
+
+# Start testing on 2 local agents
+eztest controller --local-agents 2 --target examples.target_is_module --mode concurrency --stress 100 --duration 60
+"""
+import argparse
+import copy
+import datetime
+import json
+import multiprocessing
+import socket
+import threading
+import time
+import traceback
+
+from eztest import loadprofile, stringbuilder, utility
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+CONTROLLER_STARTS_DELAY = 5
+PROGRESS_INTERVAL_SECONDS = 1
+DEFAULT_BIND = '127.0.0.1'
+IDLE = 'idle'
+WAITING = 'waiting'
+RUNNING = 'running'
+FINISHED = 'finished'
+
+
+def request(address, message, timeout=10):
+    """Send request to agent and get its response.
+
+    :param tuple address: (host, port) of agent.
+    :param dict message: request.
+    :param float timeout: timeout in seconds.
+    :return dict: response.
+    """
+    s = socket.create_connection(address, timeout=timeout)
+    try:
+        s.sendall((json.dumps(message) + '\n').encode('utf-8'))
+        f = s.makefile('rb')
+        try:
+            line = f.readline()
+        finally:
+            f.close()
+    finally:
+        s.close()
+    if not line:
+        raise ConnectionError('No response from {}:{}'.format(*address))
+    return json.loads(line.decode('utf-8'))
+
+
+class Agent(object):
+    """Load agent which runs testing pushed by controller in a worker process."""
+    def __init__(self, run_func):
+        """Init.
+
+        :param run_func: function to start testing, which is called as
+            run_func(args, None, cancel_event, summary_queue, PROGRESS_INTERVAL_SECONDS) in worker process, and should put
+            (count of finished cases, count of failed cases, None) into summary_queue per PROGRESS_INTERVAL_SECONDS
+            seconds while testing is running, and (count of finished cases, count of failed cases, finished datetime)
+            at the end.
+        """
+        self.run_func = run_func
+        self.starts_time = None
+        self.ends_time = None
+        self.finished_time = None
+        self.finished_count = 0
+        self.failed_count = 0
+        self._process = None
+        self._cancel_event = None
+        self._summary_queue = None
+        self._mutex = threading.Lock()
+
+    def get_state(self):
+        """Get state of agent.
+
+        :return str: idle, waiting, running or finished.
+        """
+        if self._process is None:
+            return IDLE
+        if self.finished_time is not None:
+            return FINISHED
+        return WAITING if datetime.datetime.now() < self.starts_time else RUNNING
+
+    def _read_summaries(self, process, summary_queue):
+        """Read counts which worker process puts into summary queue, until the last one is read or worker process exits
+        without it.
+
+        :param process: worker process.
+        :param summary_queue: summary queue of worker process.
+        """
+        finished_time = None
+        while finished_time is None:
+            try:
+                finished_count, failed_count, finished_time = summary_queue.get(timeout=1)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                finished_time = datetime.datetime.now()
+            else:
+                self.finished_count, self.failed_count = finished_count, failed_count
+        self.finished_time = finished_time
+
+    def start(self, args, starts_in, duration=None):
+        """Start testing in worker process.
+
+        :param dict args: arguments of testing.
+        :param float starts_in: testing will be started after [starts_in] seconds.
+        :param float duration: testing will be stopped after [duration] seconds, or never if it is None.
+        """
+        if self.get_state() in [WAITING, RUNNING]:
+            raise RuntimeError('Testing is running.')
+        args = argparse.Namespace(**args)
+        self.starts_time = datetime.datetime.now() + datetime.timedelta(seconds=max(starts_in, 0))
+        self.ends_time = self.starts_time + datetime.timedelta(seconds=duration) if duration else None
+        self.finished_time = None
+        self.finished_count, self.failed_count = 0, 0
+        args.starts, args.ends, args.duration = self.starts_time, self.ends_time, None
+        self._cancel_event = multiprocessing.Event()
+        self._summary_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=self.run_func, args=(args, None, self._cancel_event, self._summary_queue, PROGRESS_INTERVAL_SECONDS))
+        self._process.start()
+        reader = threading.Thread(target=self._read_summaries, args=(self._process, self._summary_queue))
+        reader.daemon = True
+        reader.start()
+        print('Testing will be started at {}...'.format(self.starts_time))
+
+    def stop(self):
+        """Stop testing."""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def status(self):
+        """Get status of agent.
+
+        :return dict: status.
+        """
+        state = self.get_state()
+        result = dict(state=state, finished_count=self.finished_count, failed_count=self.failed_count)
+        if state == FINISHED:
+            seconds = max((self.finished_time - self.starts_time).total_seconds(), 0)
+            result['seconds'] = seconds
+            result['throughput'] = self.finished_count / seconds if seconds > 0 else 0
+        return result
+
+    def handle(self, message):
+        """Handle request from controller.
+
+        :param dict message: request.
+        :return dict: response.
+        """
+        command = message.get('command')
+        with self._mutex:
+            try:
+                if command == 'start':
+                    self.start(message['args'], message.get('starts_in', 0), message.get('duration'))
+                elif command == 'stop':
+                    self.stop()
+                elif command != 'status':
+                    raise ValueError('Unknown command: {}'.format(command))
+                return self.status()
+            except Exception as e:
+                return dict(error='{}: {}'.format(type(e).__name__, str(e)))
+
+
+class _AgentRequestHandler(socketserver.StreamRequestHandler):
+    """Handle a JSON line request."""
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            response = self.server.agent.handle(json.loads(line.decode('utf-8')))
+        except ValueError as e:
+            response = dict(error='ValueError: {}'.format(str(e)))
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+class _AgentServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def start_agent(port, run_func, port_queue=None, bind=DEFAULT_BIND):
+    """Start agent.
+
+    :param int port: agent port number, 0 means any free port.
+    :param run_func: function to start testing, see Agent.__init__.
+    :param port_queue: queue which port number will be put into once agent is listening.
+    :param str bind: address which agent listens on, empty string means all addresses.
+    """
+    server = _AgentServer((bind, port), _AgentRequestHandler)
+    server.agent = Agent(run_func)
+    port = server.server_address[1]
+    print('Serving agent on %s:%s...' % (bind or '*', port))
+    if port_queue is not None:
+        port_queue.put(port)
+    try:
+        server.serve_forever()
+    finally:
+        server.agent.stop()
+        server.server_close()
+
+
+def _request_all(agents, message):
+    """Send request to each agent.
+
+    :param list agents: a list of (host, port).
+    :param dict message: request.
+    :return list: a list of response, or error.
+    """
+    responses = []
+    for address in agents:
+        try:
+            responses.append(request(address, message))
+        except Exception as e:
+            responses.append(dict(error='{}: {}'.format(type(e).__name__, str(e))))
+    return responses
+
+
+def _start_local_agents(count, run_func):
+    """Start agents as local processes.
+
+    :param int count: count of agents.
+    :param run_func: function to start testing, see Agent.__init__.
+    :return tuple: a list of (host, port), a list of processes.
+    """
+    port_queue = multiprocessing.Queue()
+    processes = []
+    for i in range(count):
+        pr = multiprocessing.Process(target=start_agent, args=(0, run_func, port_queue))
+        pr.start()
+        processes.append(pr)
+    return [('localhost', port_queue.get(timeout=30)) for _ in processes], processes
+
+
+def format_statuses(agents, statuses):
+    """Format status of agents.
+
+    :param list agents: a list of (host, port).
+    :param list statuses: a list of status.
+    :return str: output string.
+    """
+    sb = stringbuilder.StringBuilder()
+    sb.append_line('Agent,State,Finished Count,Failed Count,Seconds,Throughput')
+    total_finished, total_failed, total_throughput = 0, 0, 0
+    for address, status in zip(agents, statuses):
+        if 'error' in status:
+            sb.append_line('{}:{},{},,,,'.format(address[0], address[1], status['error']))
+            continue
+        total_finished += status['finished_count']
+        total_failed += status['failed_count']
+        total_throughput += status.get('throughput', 0)
+        sb.append_line('{}:{},{},{},{},{},{}'.format(
+            address[0], address[1], status['state'], status['finished_count'], status['failed_count'],
+            status.get('seconds', ''), status.get('throughput', '')))
+    sb.append_line('Total,,{},{},,{}'.format(total_finished, total_failed, total_throughput))
+    return str(sb)
+
+
+def start_controller(args, agents, local_agents=0, run_func=None):
+    """Start testing on agents, stop them together and gather their throughput.
+
+    :param args: arguments of testing from command line.
+    :param list agents: a list of (host, port).
+    :param int local_agents: count of agents to be started as local processes.
+    :param run_func: function to start testing in local agents, see Agent.__init__.
+    """
+    local_processes = []
+    try:
+        agents = list(agents)
+        if local_agents > 0:
+            local_addresses, local_processes = _start_local_agents(local_agents, run_func)
+            agents.extend(local_addresses)
+        if not agents:
+            print('No agent found.')
+            return
+
+        round_trips = []
+        for address in agents:
+            dtnow = time.time()
+            status = _request_all([address], dict(command='status'))[0]
+            round_trips.append(time.time() - dtnow)
+            if 'error' in status:
+                print('Agent {}:{} is unavailable, {}'.format(address[0], address[1], status['error']))
+                return
+            elif status['state'] in [WAITING, RUNNING]:
+                print('Agent {}:{} is busy.'.format(address[0], address[1]))
+                return
+
+        dtnow = datetime.datetime.now()
+        starts = args.starts if args.starts and args.starts > dtnow else dtnow + datetime.timedelta(seconds=CONTROLLER_STARTS_DELAY)
+        ends = args.ends
+        if not ends and args.duration is not None and args.duration > 0:
+            ends = starts + datetime.timedelta(minutes=args.duration)
+        duration = (ends - starts).total_seconds() if ends else None
+
+        stages = loadprofile.get_stages(args.stages, args.profile)
+        test_args = copy.copy(vars(args))
+        for key in ['eztest', 'func', 'agents', 'local_agents', 'starts', 'ends', 'duration']:
+            test_args.pop(key, None)
+        count = len(agents)
+        print('Starting testing on {} agents at {}...'.format(count, starts))
+        for i, address in enumerate(agents):
+            agent_args = dict(test_args)
+            agent_args['stress'] = utility.split_value(args.stress, count, i)
+            agent_args['limit'] = utility.split_value(args.limit, count, i)
+            agent_args['rate'] = args.rate / count
+            if stages:
+                agent_args['stages'] = [str(stage) for stage in loadprofile.split_stages(stages, count, i)]
+                agent_args['profile'] = None
+            starts_in = (starts - datetime.datetime.now()).total_seconds() - round_trips[i] / 2
+            response = request(address, dict(command='start', args=agent_args, starts_in=starts_in, duration=duration))
+            if 'error' in response:
+                print('Failed to start agent {}:{}, {}'.format(address[0], address[1], response['error']))
+                _request_all(agents, dict(command='stop'))
+                return
+
+        is_stopped = False
+        while True:
+            try:
+                if not is_stopped and ends and datetime.datetime.now() >= ends:
+                    _request_all(agents, dict(command='stop'))
+                    is_stopped = True
+                statuses = _request_all(agents, dict(command='status'))
+                if all('error' in status or status['state'] == FINISHED for status in statuses):
+                    break
+                time.sleep(1)
+            except KeyboardInterrupt:
+                print('Stopping testing on {} agents...'.format(count))
+                _request_all(agents, dict(command='stop'))
+                is_stopped = True
+        print('-' * 80)
+        print(format_statuses(agents, statuses))
+    except Exception:
+        traceback.print_exc()
+    finally:
+        for pr in local_processes:
+            pr.terminate()
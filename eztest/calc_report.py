@@ -1,4 +1,4 @@
-"""Calculate failure rate and average of time taken for report files, and print results.
+"""Calculate failure rate, average, standard deviation and percentiles of time taken for report files, and print results.
 examples:
 from eztest.calc_report import calc
 calc(["a.csv", "b.csv"], 30)
@@ -9,76 +9,130 @@ calc("folder_a")
 eztest --calc "a.csv" "b.csv" --group-minutes 30
 eztest --calc "a.csv"
 eztest --calc "folder_a"
+eztest --calc "report.ezr"      # Binary result log is read natively.
+eztest --calc "report.csv.1.gz" # Compressed report files(gzip, or zstd if zstandard is installed) are read as a stream.
+eztest --calc "folder_a" --state "state.json"   # Only new files and appended case results are read.
+
+Report files are read in chunks of CHUNK_SIZE characters and case results of each file are added to summary in
+batches(NumPy is used if it is installed), which gets the same results as reading them line by line(analyze_lines).
+
+With a state file, summary and position of each file(offset after the last complete case result) are saved after
+calculating, and the next calculating resumes from them. Files are recognized by fingerprint of their first bytes, so
+report files renamed by rollover or compressed later are not read again.
+
+Time taken of each case, group and stage is kept in a latency histogram(see histogram.py), percentiles are at most 0.1%
+higher than the exact ones.
 
 Output:
-Case Id,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken
-case1,136,7670,1.7731%,3.69,26.583,16.610214623718797
-case2,0,4,0.0000%,16.461,26.072,20.065125
-
-Case Id,Group Index,Start Time,End Time,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken
-case1,1,2018-06-18 10:32:00,2018-06-18 11:02:00,30,1938,1.5480%,3.83,26.583,16.469082024050984
-case1,2,2018-06-18 11:02:00,2018-06-18 11:32:00,42,2000,2.1000%,3.72,18.932,16.959928979894286
-case1,3,2018-06-18 11:32:00,2018-06-18 12:02:00,38,1932,1.9669%,3.69,25.363,16.23456723705196
-case1,4,2018-06-18 12:02:00,2018-06-18 12:32:00,26,1798,1.4461%,3.72,20.412,16.72942924743759
-case1,5,2018-06-18 12:32:00,2018-06-18 13:02:00,0,2,0.0000%,16.491,16.491,16.491
-case2,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,2,0.0000%,26.072,26.072,26.072
-case2,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,
-case2,3,2018-06-18 11:32:00,2018-06-18 12:02:00,0,2,0.0000%,16.461,16.461,16.461
+Case Id,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken,Standard Deviation,P50,P90,P95,P99,P99.9
+case1,136,7670,1.7731%,3.69,26.583,15.966938722294655,2.6951683775243493,16.474111,17.989631,18.481151,19.464191,26.443775
+case2,0,4,0.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072
+
+Case Id,Group Index,Start Time,End Time,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken,Standard Deviation,P50,P90,P95,P99,P99.9
+case1,1,2018-06-18 10:32:00,2018-06-18 11:02:00,30,1938,1.5480%,3.83,26.583,15.971461300309597,2.903636211637802,16.334847,18.104319,18.694143,26.066943,26.583
+case1,2,2018-06-18 11:02:00,2018-06-18 11:32:00,42,2000,2.1000%,3.72,18.932,15.699961,2.359098888448511,16.195583,17.596415,17.842175,18.251775,18.710527
+case1,3,2018-06-18 11:32:00,2018-06-18 12:02:00,38,1932,1.9669%,3.69,25.363,16.05983436853002,2.7359523524439617,16.596991,18.137087,18.530303,23.822335,25.363
+case1,4,2018-06-18 12:02:00,2018-06-18 12:32:00,26,1798,1.4461%,3.72,20.412,16.107459517426275,2.741176125065527,16.687103,18.169855,18.612223,19.464191,20.412
+case1,5,2018-06-18 12:32:00,2018-06-18 13:02:00,0,2,0.0000%,16.491,16.491,16.491,0.0,16.491,16.491,16.491,16.491,16.491
+case2,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,2,0.0000%,26.072,26.072,26.072,0.0,26.072,26.072,26.072,26.072,26.072
+case2,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,,,,,,,
+case2,3,2018-06-18 11:32:00,2018-06-18 12:02:00,0,2,0.0000%,16.461,16.461,16.461,0.0,16.461,16.461,16.461,16.461,16.461
+
+If report files have "Stage" column(testing with load profile), summary of each stage is also output:
+Stage,Case Id,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken,Standard Deviation,P50,P90,P95,P99,P99.9
+warm-up,case1,0,120,0.0000%,3.69,5.2,4.012,0.312,3.998463,4.45235,4.718591,5.062655,5.2
+steady,case1,136,7550,1.8013%,3.72,26.583,15.966938722294655,2.6951683775243493,16.474111,17.989631,18.481151,19.464191,26.443775
 """
+import array
 import datetime
+import hashlib
+import io
+import json
+import multiprocessing
 import os
 import re
 
-from eztest import stringbuilder, utility
+from eztest import compression, histogram, resultlog, stringbuilder, utility
 
 try:
     from _collections import OrderedDict
 except ImportError:
     from collections import OrderedDict
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 AVERAGE = 'average'
+CHUNK_SIZE = 4194304
 FAIL_COUNT = 'fail_count'
+FIELD_PATTERN = re.compile(r'"((?:[^"]|"")*)"')
+FINGERPRINT = 'fingerprint'
+FINGERPRINT_SIZE = 4096
+HISTOGRAM = 'histogram'
 ID = 'id'
 MAX_TIME = 'max_time'
 MIN_TIME = 'min_time'
+OFFSET = 'offset'
 PASS_COUNT = 'pass_count'
+PATH = 'path'
+PERCENTILES = (50, 90, 95, 99, 99.9)
+POSITION = 'position'
+REPORT_HEADER = '"Repeat Index","Id","Description","Status"'
+STAGE_COLUMN = '"Stage"'
+STAGE_INDEX = 'stage_index'
 START_TIME = 'start_time'
+STATE_VERSION = 1
 STATUS_PATTERN = re.compile(r'^"\d+","(.+?)",".+?","(Pass|Fail)"')
+STATUS_LINE_PATTERN = re.compile(STATUS_PATTERN.pattern, re.MULTILINE)
+STATUS_LINE_BYTES_PATTERN = re.compile(STATUS_PATTERN.pattern.encode('ascii'), re.MULTILINE)
 TIME_PATTERN = re.compile(r'"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6})","(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6})","([\d\\.]+)"')
+TIME_BYTES_PATTERN = re.compile(TIME_PATTERN.pattern.encode('ascii'))
 TOTAL_COUNT = 'total_count'
 
 
-def add_to_group_summary(summary, case_id, start_time, time_taken=None, is_case_pass=None):
+class GroupSummary(dict):
+    """Group summary, keys are (case id, group index) and values are summary of groups which have case results.
+    Group index is counted from start time of the first group of the case(start datetime of the first case result added
+    to summary, truncated to minutes), negative for groups before it. Groups without case results are not kept.
+    """
+    def __init__(self, *args, **kwargs):
+        super(GroupSummary, self).__init__(*args, **kwargs)
+        self.start_times = dict()
+
+
+def add_to_group_summary(summary, case_id, index, start_time, time_taken, is_case_pass):
     """Add to group summary.
 
-    :param dict summary: group summary.
+    :param GroupSummary summary: group summary.
     :param str case_id: case id.
-    :param datetime.datetime start_time: start datetime.
+    :param int index: group index.
+    :param datetime.datetime start_time: start datetime of group.
     :param float time_taken: time taken in second.
     :param bool is_case_pass: is case pass.
     """
-    key = '{}_{}'.format(case_id, utility.date2str(start_time, '%Y%m%d%H%M%S'))
-    if time_taken is None:
-        if key not in summary:
-            summary[key] = {ID: case_id,
-                            START_TIME: start_time}
-    elif key not in summary:
+    key = (case_id, index)
+    if key not in summary:
         summary[key] = {ID: case_id,
                         START_TIME: start_time,
-                        AVERAGE: time_taken,
                         TOTAL_COUNT: 1,
                         FAIL_COUNT: 0 if is_case_pass else 1,
                         MIN_TIME: time_taken,
-                        MAX_TIME: time_taken
+                        MAX_TIME: time_taken,
+                        HISTOGRAM: histogram.Histogram()
                         }
+        summary[key][HISTOGRAM].record(time_taken)
+        summary[key][AVERAGE] = summary[key][HISTOGRAM].mean()
     else:
         summary[key][TOTAL_COUNT] += 1
         if not is_case_pass:
             summary[key][FAIL_COUNT] += 1
-        summary[key][AVERAGE] = (summary[key][AVERAGE] + time_taken) / 2.0
         summary[key][MIN_TIME] = min(summary[key][MIN_TIME], time_taken)
         summary[key][MAX_TIME] = max(summary[key][MAX_TIME], time_taken)
+        summary[key][HISTOGRAM].record(time_taken)
+        summary[key][AVERAGE] = summary[key][HISTOGRAM].mean()
 
 
 def add_to_case_summary(summary, case_id, time_taken, is_case_pass):
@@ -90,37 +144,55 @@ def add_to_case_summary(summary, case_id, time_taken, is_case_pass):
     :param bool is_case_pass: is case pass.
     """
     if case_id not in summary:
-        summary[case_id] = {AVERAGE: time_taken,
-                            TOTAL_COUNT: 1,
+        summary[case_id] = {TOTAL_COUNT: 1,
                             FAIL_COUNT: 0 if is_case_pass else 1,
                             MIN_TIME: time_taken,
-                            MAX_TIME: time_taken}
+                            MAX_TIME: time_taken,
+                            HISTOGRAM: histogram.Histogram()}
     else:
         summary[case_id][TOTAL_COUNT] += 1
         if not is_case_pass:
             summary[case_id][FAIL_COUNT] += 1
-        summary[case_id][AVERAGE] = (summary[case_id][AVERAGE] + time_taken) / 2.0
         summary[case_id][MIN_TIME] = min(summary[case_id][MIN_TIME], time_taken)
         summary[case_id][MAX_TIME] = max(summary[case_id][MAX_TIME], time_taken)
+    summary[case_id][HISTOGRAM].record(time_taken)
+    summary[case_id][AVERAGE] = summary[case_id][HISTOGRAM].mean()
 
 
 def get_start_time(summary, case_id):
-    """Get start datetime from group summary.
+    """Get start datetime of the first group of case from group summary.
 
-    :param dict summary: group summary.
+    :param GroupSummary summary: group summary.
     :param str case_id: case id.
     :return datetime.datetime: start datetime.
     """
-    for key, value in summary.items():
-        if key.startswith(case_id + '_'):
-            return value.get(START_TIME)
-    else:
-        return None
+    return summary.start_times.get(case_id)
+
+
+def get_microseconds(delta):
+    """Get total microseconds of timedelta.
+
+    :param datetime.timedelta delta: timedelta.
+    :return int: microseconds.
+    """
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def get_group_index(start_time, end_date, group_gap):
+    """Get index of group which case result belongs to: the group which it ends in, or ends at the end of.
+
+    :param datetime.datetime start_time: start datetime of the first group.
+    :param datetime.datetime end_date: end datetime of case result.
+    :param datetime.timedelta group_gap: group gap.
+    :return int: group index, negative if case result ends before the first group.
+    """
+    return (get_microseconds(end_date - start_time) - 1) // get_microseconds(group_gap)
 
 
 def analyze_case(case_id, is_pass, start_date, end_date, time_taken,
-                 case_summary, start_times, group_summary, group_gap):
-    """Add case result to summary.
+                 case_summary, end_times, group_summary, group_gap, stage=None, stage_summary=None, lateness=None):
+    """Add case result to summary. Case result is added to the group given by its own end datetime, so results can be
+    added in any order.
 
     :param str case_id: case id.
     :param bool is_pass: is case passed.
@@ -128,85 +200,678 @@ def analyze_case(case_id, is_pass, start_date, end_date, time_taken,
     :param datetime.datetime end_date: end datetime.
     :param float time_taken: time taken.
     :param dict case_summary: case summary.
-    :param dict start_times: a dictionary keeps case id and start datetime mapping.
-    :param dict group_summary: group summary.
+    :param dict end_times: a dictionary keeps case id and the latest end datetime mapping, used with lateness.
+    :param GroupSummary group_summary: group summary.
     :param datetime.timedelta group_gap: group gap in seconds.
-    :return:
+    :param str stage: stage of load profile.
+    :param dict stage_summary: a dictionary keeps (stage, case id) and summary mapping.
+    :param datetime.timedelta lateness: case result which ends more than [lateness] before the latest one of the case is
+        late, it is added to case summary and stage summary but not group summary. None means no case result is late.
+    :return bool: False if case result is late.
     """
     add_to_case_summary(case_summary, case_id, time_taken, is_pass)
+    if stage is not None and stage_summary is not None:
+        add_to_case_summary(stage_summary, (stage, case_id), time_taken, is_pass)
 
-    if case_id not in start_times:
-        exited_start_time = get_start_time(group_summary, case_id)
-        if exited_start_time:
-            start_times[case_id] = exited_start_time
-        else:
-            start_times[case_id] = start_date.replace(second=0, microsecond=0)
-    my_start_time = start_times[case_id]
+    if lateness is not None:
+        latest_end_time = end_times.get(case_id)
+        if latest_end_time is None or end_date > latest_end_time:
+            end_times[case_id] = end_date
+        elif end_date < latest_end_time - lateness:
+            return False
 
-    if my_start_time + group_gap >= end_date:
-        add_to_group_summary(group_summary, case_id, my_start_time, time_taken, is_pass)
-    else:
-        while True:
-            my_start_time += group_gap
-            start_times[case_id] = my_start_time
-            if my_start_time + group_gap < end_date:
-                add_to_group_summary(group_summary, case_id, my_start_time)
-            else:
-                break
-        add_to_group_summary(group_summary, case_id, my_start_time, time_taken, is_pass)
+    first_start_time = group_summary.start_times.get(case_id)
+    if first_start_time is None:
+        first_start_time = group_summary.start_times[case_id] = start_date.replace(second=0, microsecond=0)
+    index = get_group_index(first_start_time, end_date, group_gap)
+    add_to_group_summary(group_summary, case_id, index, first_start_time + group_gap * index, time_taken, is_pass)
+    return True
+
+
+def format_times(value):
+    """Format minimum, maximum, average, standard deviation and percentiles of time taken.
+
+    :param dict value: value of case summary, group summary or stage summary.
+    :return str: comma separated values, empty if summary does not have any case result.
+    """
+    if HISTOGRAM not in value:
+        return ',' * (3 + len(PERCENTILES))
+    values = value[HISTOGRAM]
+    return ','.join(str(v) for v in [value[MIN_TIME], value[MAX_TIME], values.mean(), values.stddev()] +
+                    values.percentiles(PERCENTILES))
 
 
-def output_summary(case_summary, group_summary, group_gap):
+def output_summary(case_summary, group_summary, group_gap, stage_summary=None):
     """Format summary and output.
 
     :param dict case_summary: case summary.
-    :param dict group_summary: group summary.
+    :param GroupSummary group_summary: group summary.
     :param datetime.timedelta group_gap: group gap in seconds.
+    :param dict stage_summary: stage summary.
     :return str: output string.
     """
+    times_header = 'Minimum Time Taken,Maximum Time Taken,Average Time Taken,Standard Deviation,{}'.format(
+        ','.join('P{:g}'.format(p) for p in PERCENTILES))
     sb = stringbuilder.StringBuilder()
-    sb.append_line('Case Id,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken')
+    sb.append_line('Case Id,Fail Count,Total Count,Failure Rate,' + times_header)
+    group_indexes = dict()
+    for case_id, index in sorted(group_summary):
+        group_indexes.setdefault(case_id, []).append(index)
     groups = []
     for case_id, value in case_summary.items():
-        sb.append_line('{},{},{},{},{},{},{}'.format(
+        sb.append_line('{},{},{},{},{}'.format(
             case_id,
             value[FAIL_COUNT],
             value[TOTAL_COUNT],
             '{:.4f}%'.format(value[FAIL_COUNT] / (1 if value[TOTAL_COUNT] == 0 else value[TOTAL_COUNT]) * 100),
-            value[MIN_TIME],
-            value[MAX_TIME],
-            value[AVERAGE]
+            format_times(value)
         ))
-        index = 1
-        for key, group_value in group_summary.items():
-            if key.startswith(case_id):
-                groups.append('{},{},{},{},{},{},{},{},{},{}'.format(
-                    case_id,
-                    index,
-                    utility.date2str(group_value[START_TIME], '%Y-%m-%d %H:%M:%S'),
-                    utility.date2str(group_value[START_TIME] + group_gap, '%Y-%m-%d %H:%M:%S'),
-                    group_value.get(FAIL_COUNT, 0),
-                    group_value.get(TOTAL_COUNT, 0),
-                    '{:.4f}%'.format(group_value[FAIL_COUNT] / (1 if group_value[TOTAL_COUNT] == 0 else group_value[TOTAL_COUNT]) * 100
-                                     if FAIL_COUNT in group_value else 0),
-                    group_value.get(MIN_TIME, ""),
-                    group_value.get(MAX_TIME, ""),
-                    group_value.get(AVERAGE, "")
-                ))
-                index += 1
+        indexes = group_indexes.get(case_id)
+        if not indexes:
+            continue
+        for index in range(indexes[0], indexes[-1] + 1):
+            group_value = group_summary.get((case_id, index))
+            if group_value is None:     # Group without case results.
+                group_value = {START_TIME: group_summary.start_times[case_id] + group_gap * index}
+            groups.append('{},{},{},{},{},{},{},{}'.format(
+                case_id,
+                index - indexes[0] + 1,
+                utility.date2str(group_value[START_TIME], '%Y-%m-%d %H:%M:%S'),
+                utility.date2str(group_value[START_TIME] + group_gap, '%Y-%m-%d %H:%M:%S'),
+                group_value.get(FAIL_COUNT, 0),
+                group_value.get(TOTAL_COUNT, 0),
+                '{:.4f}%'.format(group_value[FAIL_COUNT] / (1 if group_value[TOTAL_COUNT] == 0 else group_value[TOTAL_COUNT]) * 100
+                                 if FAIL_COUNT in group_value else 0),
+                format_times(group_value)
+            ))
 
     sb.append_line()
-    sb.append_line('Case Id,Group Index,Start Time,End Time,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken')
+    sb.append_line('Case Id,Group Index,Start Time,End Time,Fail Count,Total Count,Failure Rate,' + times_header)
     for group in groups:
         sb.append_line(group)
+
+    if stage_summary:
+        sb.append_line()
+        sb.append_line('Stage,Case Id,Fail Count,Total Count,Failure Rate,' + times_header)
+        for (stage, case_id), value in stage_summary.items():
+            sb.append_line('{},{},{},{},{},{}'.format(
+                stage,
+                case_id,
+                value[FAIL_COUNT],
+                value[TOTAL_COUNT],
+                '{:.4f}%'.format(value[FAIL_COUNT] / (1 if value[TOTAL_COUNT] == 0 else value[TOTAL_COUNT]) * 100),
+                format_times(value)
+            ))
     return str(sb)
 
 
-def calc(file_paths, group_minutes=60):
-    """Analyze report files and calculate failure rate, average of time taken.
+def get_stage_index(header):
+    """Get index of "Stage" column among columns from "Log Path" to the end of report file.
+
+    :param str header: header line of report file.
+    :return int: index, None if report file does not have "Stage" column.
+    """
+    columns = header.strip().split(',')
+    if STAGE_COLUMN in columns and '"Log Path"' in columns:
+        return columns.index(STAGE_COLUMN) - columns.index('"Log Path"')
+    return None
+
+
+def to_datetime(value):
+    """Convert datetime string written in report file("%Y-%m-%d %H:%M:%S.%f") to datetime, faster than str2date.
+
+    :param str value: datetime string.
+    :return datetime.datetime: datetime.
+    """
+    return datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                             int(value[11:13]), int(value[14:16]), int(value[17:19]), int(value[20:26]))
+
+
+def to_microseconds(values, minutes=None):
+    """Convert datetime strings written in report file to microseconds since 1970-01-01 00:00:00.
+
+    :param list values: datetime strings.
+    :param dict minutes: cache of microseconds of "%Y-%m-%d %H:%M" strings, used if NumPy is not installed.
+    :return list: microseconds.
+    """
+    if numpy is not None:
+        return numpy.array(values, dtype='datetime64[us]').astype(numpy.int64).tolist()
+    if minutes is None:
+        minutes = dict()
+    result = []
+    for value in values:
+        minute = minutes.get(value[:16])
+        if minute is None:
+            minute = minutes[value[:16]] = resultlog.to_microseconds(to_datetime(value[:16] + ':00.000000'))
+        second = int(value[17:19])
+        if second > 59:
+            raise ValueError('Seconds out of range in datetime string "{}"'.format(value))
+        result.append(minute + second * 1000000 + int(value[20:26]))
+    return result
+
+
+class _CaseRows(object):
+    """Results of a case read from a report file, kept in typed arrays."""
+    __slots__ = ['first_start', 'ends', 'pending_ends', 'time_takens', 'passes', 'fail_count']
+
+    def __init__(self, first_start):
+        self.first_start = first_start
+        self.ends = array.array('q')
+        self.pending_ends = []
+        self.time_takens = array.array('d')
+        self.passes = array.array('b')
+        self.fail_count = 0
+
+
+def read_rows(f, stage_index=None):
+    """Read case results of report file in chunks, first line(header) should be read already.
+    Rows are matched in the same way as reading them line by line.
+
+    :param f: file object.
+    :param int stage_index: index of "Stage" column returned by get_stage_index.
+    :return tuple: OrderedDict of case id and _CaseRows, OrderedDict of (stage, case id) and [time takens, fail count],
+        or None if a case result does not have case id.
+    """
+    cases, stages = OrderedDict(), OrderedDict()
+    minutes = dict()
+    match_status = STATUS_LINE_PATTERN.match
+    case_id, is_pass, stage = None, None, None
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if not chunk.endswith('\n'):
+            chunk += f.readline()
+        line_start, line_end = 0, 0
+        for time_match in TIME_PATTERN.finditer(chunk):
+            time_start = time_match.start()
+            if time_start < line_end:   # Only the first one of each line.
+                continue
+            while True:     # Match status of lines until the line of time.
+                status_match = match_status(chunk, line_start)
+                if status_match:
+                    case_id, status = status_match.groups()
+                    is_pass = status == 'Pass'
+                line_end = chunk.find('\n', line_start) + 1 or len(chunk)
+                if line_end > time_start:
+                    break
+                line_start = line_end
+            line_start = line_end
+            case_rows = cases.get(case_id)
+            if case_rows is None:
+                if case_id is None:
+                    return None
+                case_rows = cases[case_id] = _CaseRows(to_datetime(time_match.group(1)))
+            time_taken = float(time_match.group(3))
+            case_rows.pending_ends.append(time_match.group(2))
+            case_rows.time_takens.append(time_taken)
+            case_rows.passes.append(is_pass)
+            if not is_pass:
+                case_rows.fail_count += 1
+            if stage_index is not None:
+                fields = FIELD_PATTERN.findall(chunk, time_match.end(), line_end)
+                stage = fields[stage_index].replace('""', '"') if stage_index < len(fields) else ''
+                stage_rows = stages.get((stage, case_id))
+                if stage_rows is None:
+                    stage_rows = stages[(stage, case_id)] = [array.array('d'), 0]
+                stage_rows[0].append(time_taken)
+                if not is_pass:
+                    stage_rows[1] += 1
+        while line_start < len(chunk):
+            status_match = match_status(chunk, line_start)
+            if status_match:
+                case_id, status = status_match.groups()
+                is_pass = status == 'Pass'
+            line_start = chunk.find('\n', line_start) + 1 or len(chunk)
+        for case_rows in cases.values():
+            if case_rows.pending_ends:
+                case_rows.ends.extend(to_microseconds(case_rows.pending_ends, minutes))
+                case_rows.pending_ends = []
+    return cases, stages
+
+
+def get_group_segments(ends, start_us, gap_us):
+    """Get groups of case results in the same way as analyze_case: group index of each result is given by its own end
+    datetime.
+
+    :param array.array ends: end datetimes in microseconds.
+    :param int start_us: start datetime of the first group in microseconds.
+    :param int gap_us: group gap in microseconds.
+    :return list: (index of the first result, group index) of each run of consecutive results in the same group.
+    """
+    if numpy is not None:
+        indexes = (numpy.frombuffer(ends, dtype=numpy.int64) - start_us - 1) // gap_us
+        starts = [0] + (numpy.flatnonzero(indexes[1:] != indexes[:-1]) + 1).tolist()
+        return list(zip(starts, indexes[starts].tolist()))
+    segments = []
+    group_start, group_end = None, None
+    for i, end in enumerate(ends):
+        if group_start is not None and group_start < end <= group_end:
+            continue
+        group_index = (end - start_us - 1) // gap_us
+        group_start = start_us + group_index * gap_us
+        group_end = group_start + gap_us
+        segments.append((i, group_index))
+    return segments
+
+
+def add_values(summary, key, time_takens, fail_count, **fields):
+    """Add case results to summary, same as adding them one by one.
+
+    :param dict summary: case summary, group summary or stage summary.
+    :param key: key of summary.
+    :param array.array time_takens: time takens.
+    :param int fail_count: count of failed case results.
+    :param fields: other fields of summary if key is new, e.g.: ID and START_TIME of group summary.
+    """
+    values = histogram.Histogram()
+    values.record_values(time_takens)
+    value = summary.get(key)
+    if value is None:
+        fields.update({AVERAGE: values.mean(), TOTAL_COUNT: len(time_takens), FAIL_COUNT: fail_count,
+                       MIN_TIME: min(time_takens), MAX_TIME: max(time_takens), HISTOGRAM: values})
+        summary[key] = fields
+    else:
+        value[HISTOGRAM].merge(values)
+        value[AVERAGE] = value[HISTOGRAM].mean()
+        value[TOTAL_COUNT] += len(time_takens)
+        value[FAIL_COUNT] += fail_count
+        value[MIN_TIME] = min(value[MIN_TIME], min(time_takens))
+        value[MAX_TIME] = max(value[MAX_TIME], max(time_takens))
+
+
+def analyze_rows(cases, stages, case_summary, group_summary, group_gap, stage_summary=None):
+    """Add case results returned by read_rows to summary, same as analyzing them one by one with analyze_case.
+
+    :param OrderedDict cases: case id and _CaseRows mapping.
+    :param OrderedDict stages: (stage, case id) and [time takens, fail count] mapping.
+    :param dict case_summary: case summary.
+    :param GroupSummary group_summary: group summary.
+    :param datetime.timedelta group_gap: group gap.
+    :param dict stage_summary: a dictionary keeps (stage, case id) and summary mapping.
+    :return bool: True.
+    """
+    gap_us = get_microseconds(group_gap)
+    for case_id, case_rows in cases.items():
+        add_values(case_summary, case_id, case_rows.time_takens, case_rows.fail_count)
+        first_start_time = group_summary.start_times.get(case_id)
+        if first_start_time is None:
+            first_start_time = group_summary.start_times[case_id] = case_rows.first_start.replace(second=0,
+                                                                                                  microsecond=0)
+        segments = get_group_segments(case_rows.ends, resultlog.to_microseconds(first_start_time), gap_us)
+        for i, (first, index) in enumerate(segments):
+            stop = segments[i + 1][0] if i + 1 < len(segments) else len(case_rows.time_takens)
+            passes = case_rows.passes[first:stop]
+            add_values(group_summary, (case_id, index), case_rows.time_takens[first:stop], len(passes) - sum(passes),
+                       **{ID: case_id, START_TIME: first_start_time + group_gap * index})
+    if stage_summary is not None:
+        for key, (time_takens, fail_count) in stages.items():
+            add_values(stage_summary, key, time_takens, fail_count)
+    return True
+
+
+def read_result_log(file_path, position=None):
+    """Read case results of binary result log into typed arrays, same as read_rows.
+
+    :param str file_path: binary result log path.
+    :param dict position: resume reading from position of a previous reading, see resultlog.read_records.
+    :return tuple: OrderedDict of case id and _CaseRows, OrderedDict of (stage, case id) and [time takens, fail count].
+    """
+    cases, stages = OrderedDict(), OrderedDict()
+    for record in resultlog.read_records(file_path, position):
+        if record.start_time is None or record.end_time is None or record.time_taken is None:
+            continue
+        case_rows = cases.get(record.id)
+        if case_rows is None:
+            case_rows = cases[record.id] = _CaseRows(record.start_time)
+        case_rows.ends.append(resultlog.to_microseconds(record.end_time))
+        case_rows.time_takens.append(record.time_taken)
+        case_rows.passes.append(record.status)
+        if not record.status:
+            case_rows.fail_count += 1
+        if record.stage is not None:
+            stage_rows = stages.get((record.stage, record.id))
+            if stage_rows is None:
+                stage_rows = stages[(record.stage, record.id)] = [array.array('d'), 0]
+            stage_rows[0].append(record.time_taken)
+            if not record.status:
+                stage_rows[1] += 1
+    return cases, stages
+
+
+def read_file(file_path):
+    """Read case results of report file or binary result log into typed arrays. It is run in worker processes to
+    read many files in parallel, the results are added to summary by analyze_rows in order of files.
+
+    :param str file_path: file path.
+    :return tuple: result of read_rows, None if file should be analyzed one by one(analyze_lines, analyze_result_log).
+    """
+    try:
+        if resultlog.is_result_log(file_path):
+            return read_result_log(file_path)
+        with compression.open_file(file_path) as f:
+            line = f.readline()
+            if not line or not line.startswith(REPORT_HEADER):
+                return None
+            return read_rows(f, get_stage_index(line))
+    except Exception:
+        return None
+
+
+class _RangeReader(io.RawIOBase):
+    """Read at most [size] bytes of file object, count of bytes which are read is kept."""
+    def __init__(self, f, size=None):
+        """Init.
+
+        :param f: file object opened in binary mode.
+        :param int size: count of bytes to read, None means until end of file.
+        """
+        super(_RangeReader, self).__init__()
+        self.count = 0
+        self._f = f
+        self._size = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        size = len(b) if self._size is None else min(len(b), self._size - self.count)
+        if size <= 0:
+            return 0
+        data = self._f.read(size)
+        b[:len(data)] = data
+        self.count += len(data)
+        return len(data)
+
+
+def get_complete_end(f, start, end):
+    """Get end offset of the last complete case result of report file, which may be written while it is read. A case
+    result is complete once the line of its datetime columns is written(Output may have many lines).
+
+    :param f: report file opened in binary mode.
+    :param int start: offset of a case result to search from.
+    :param int end: size of report file.
+    :return int: end offset, start if there is no complete case result.
+    """
+    block_size = 65536
+    while True:
+        begin = max(start, end - block_size)
+        f.seek(begin)
+        data = f.read(end - begin)
+        data = data[:data.rfind(b'\n') + 1]
+        line_start = 0 if begin == start else data.find(b'\n') + 1
+        row_starts = [m.start() for m in STATUS_LINE_BYTES_PATTERN.finditer(data, line_start)] if data else []
+        if row_starts or begin == start:
+            break
+        block_size *= 4
+    if row_starts and not TIME_BYTES_PATTERN.search(data, row_starts[-1]):
+        return begin + row_starts[-1]
+    return begin + len(data)
+
+
+def read_new_rows(file_path, position):
+    """Read case results which are written into report file or binary result log since a previous reading, into typed
+    arrays same as read_file. It is run in worker processes to read many files in parallel.
+
+    :param str file_path: file path.
+    :param dict position: position after the previous reading, empty if file is not read yet. Position of report file
+        is {"offset": offset after the last complete case result, "stage_index": index of "Stage" column}, see
+        resultlog.read_records for binary result log.
+    :return tuple: result of read_rows(None if file is not report file, position is not changed then), and position
+        after the last complete case result.
+    """
+    try:
+        new_position = dict(position)
+        if resultlog.is_result_log(file_path):
+            return read_result_log(file_path, new_position), new_position
+        is_compressed = compression.get_method(file_path) is not None
+        with compression.open_file(file_path, 'rb') as f:
+            offset = new_position.get(OFFSET, 0)
+            if offset:
+                compression.skip(f, offset)
+            else:
+                header = f.readline()
+                if not header.endswith(b'\n') or not header.startswith(REPORT_HEADER.encode('utf-8')):
+                    return None, position
+                new_position[STAGE_INDEX] = get_stage_index(header.decode('utf-8'))
+                offset = len(header)
+            size = None
+            if not is_compressed:   # Compressed report file is rolled over already, so it is complete.
+                size = get_complete_end(f, offset, os.fstat(f.fileno()).st_size) - offset
+                f.seek(offset)
+            reader = _RangeReader(f, size)
+            rows = read_rows(io.TextIOWrapper(io.BufferedReader(reader)), new_position.get(STAGE_INDEX))
+        if rows is None:
+            return None, position
+        new_position[OFFSET] = offset + reader.count
+        return rows, new_position
+    except Exception:
+        return None, position
+
+
+def _read_new_rows(task):
+    """Call read_new_rows in worker process.
+
+    :param tuple task: file path, position and prefix returned by match_positions.
+    :return tuple: result of read_new_rows.
+    """
+    return read_new_rows(task[0], task[1])
+
+
+def analyze_file(file_path, case_summary, group_summary, group_gap, stage_summary=None, rows=None):
+    """Read report file or binary result log in chunks and add its case results to summary in batches.
+
+    :param str file_path: file path.
+    :param dict case_summary: case summary.
+    :param GroupSummary group_summary: group summary.
+    :param datetime.timedelta group_gap: group gap.
+    :param dict stage_summary: a dictionary keeps (stage, case id) and summary mapping.
+    :param tuple rows: result of read_file if file is read already.
+    :return bool: False if file should be analyzed one by one(analyze_lines, analyze_result_log), summary is not changed
+        then. Summary is only changed after the whole file is read, errors of adding case results are raised.
+    """
+    if rows is None:
+        rows = read_file(file_path)
+    if rows is None:
+        return False
+    return analyze_rows(rows[0], rows[1], case_summary, group_summary, group_gap, stage_summary)
+
+
+def analyze_lines(file_path, case_summary, group_summary, group_gap, stage_summary=None):
+    """Read report file line by line and add its case results to summary one by one.
+
+    :param str file_path: report file path.
+    :param dict case_summary: case summary.
+    :param GroupSummary group_summary: group summary.
+    :param datetime.timedelta group_gap: group gap.
+    :param dict stage_summary: a dictionary keeps (stage, case id) and summary mapping.
+    """
+    end_times, case_id, is_pass = dict(), None, None
+    with compression.open_file(file_path) as f:
+        line = f.readline()
+        if not line or not line.startswith(REPORT_HEADER):
+            print('Not report file, ignore file: {}'.format(file_path))
+            return
+        stage_index = get_stage_index(line)
+        stage = None
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            status_match = STATUS_PATTERN.match(line)
+            time_match = TIME_PATTERN.search(line)
+            if status_match:
+                case_id = status_match.group(1)
+                is_pass = True if status_match.group(2) == 'Pass' else False
+
+            if time_match:
+                start_date, end_date = utility.str2date(time_match.group(1)), utility.str2date(time_match.group(2))
+                time_taken = float(time_match.group(3))
+                if stage_index is not None:
+                    fields = FIELD_PATTERN.findall(line, time_match.end())
+                    stage = fields[stage_index].replace('""', '"') if stage_index < len(fields) else ''
+
+                analyze_case(case_id, is_pass, start_date, end_date, time_taken,
+                             case_summary, end_times, group_summary, group_gap, stage, stage_summary)
+
+
+def analyze_result_log(file_path, case_summary, group_summary, group_gap, stage_summary=None):
+    """Read binary result log and add its case results to summary one by one.
+
+    :param str file_path: binary result log path.
+    :param dict case_summary: case summary.
+    :param GroupSummary group_summary: group summary.
+    :param datetime.timedelta group_gap: group gap.
+    :param dict stage_summary: a dictionary keeps (stage, case id) and summary mapping.
+    """
+    end_times = dict()
+    for record in resultlog.read_records(file_path):
+        if record.start_time is not None and record.end_time is not None and record.time_taken is not None:
+            analyze_case(record.id, record.status, record.start_time, record.end_time, record.time_taken,
+                         case_summary, end_times, group_summary, group_gap, record.stage, stage_summary)
+
+
+def to_state_value(value):
+    """Convert value of case summary, group summary or stage summary to the one saved in state file.
+
+    :param dict value: value of summary.
+    :return list: total count, fail count, minimum and maximum of time taken, and histogram.
+    """
+    return [value[TOTAL_COUNT], value[FAIL_COUNT], value[MIN_TIME], value[MAX_TIME], value[HISTOGRAM].to_dict()]
+
+
+def from_state_value(value, **fields):
+    """Convert value saved in state file to value of summary.
+
+    :param list value: value returned by to_state_value.
+    :param fields: other fields of summary, e.g.: ID and START_TIME of group summary.
+    :return dict: value of summary.
+    """
+    values = histogram.Histogram.from_dict(value[4])
+    fields.update({TOTAL_COUNT: value[0], FAIL_COUNT: value[1], MIN_TIME: value[2], MAX_TIME: value[3],
+                   HISTOGRAM: values, AVERAGE: values.mean()})
+    return fields
+
+
+def load_state(state_path, group_gap, case_summary, group_summary, stage_summary):
+    """Load summary saved by save_state.
+
+    :param str state_path: state file path.
+    :param datetime.timedelta group_gap: group gap.
+    :param dict case_summary: case summary, which summary of state file is loaded into.
+    :param GroupSummary group_summary: group summary.
+    :param dict stage_summary: stage summary.
+    :return list: files saved in state file, empty if state file does not exist or is saved with other group minutes.
+    """
+    if not os.path.isfile(state_path):
+        return []
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            raise ValueError('Unknown version {}'.format(state.get('version')))
+        if state['group_gap'] != get_microseconds(group_gap):
+            print('Group minutes are changed, calculate from the beginning instead of state file: {}'.format(state_path))
+            return []
+        start_times = dict((case_id, resultlog.from_microseconds(start)) for case_id, start in state['start_times'])
+        cases = [(case_id, from_state_value(value)) for case_id, value in state['cases']]
+        groups = [((case_id, index), from_state_value(value, **{ID: case_id,
+                                                               START_TIME: start_times[case_id] + group_gap * index}))
+                  for case_id, index, value in state['groups']]
+        stages = [((stage, case_id), from_state_value(value)) for stage, case_id, value in state['stages']]
+        files = state['files']
+        for file_state in files:
+            position = file_state[POSITION]
+            if 'cases' in position:     # Dictionaries of binary result log.
+                position['cases'] = dict((int(k), tuple(v)) for k, v in position['cases'].items())
+                position['stages'] = dict((int(k), v) for k, v in position['stages'].items())
+    except Exception as e:
+        print('Cannot load state file, calculate from the beginning: {}, {}'.format(state_path, e))
+        return []
+    case_summary.update(cases)
+    group_summary.update(groups)
+    group_summary.start_times.update(start_times)
+    stage_summary.update(stages)
+    print('Resume calculating from state file: {}'.format(state_path))
+    return files
+
+
+def save_state(state_path, group_gap, case_summary, group_summary, stage_summary, files):
+    """Save summary and position of each file into state file, so calculating can be resumed from them.
+
+    :param str state_path: state file path.
+    :param datetime.timedelta group_gap: group gap.
+    :param dict case_summary: case summary.
+    :param GroupSummary group_summary: group summary.
+    :param dict stage_summary: stage summary.
+    :param list files: {"path": file path, "fingerprint": fingerprint, "position": position after reading} of each file.
+    """
+    state = {'version': STATE_VERSION,
+             'group_gap': get_microseconds(group_gap),
+             'start_times': [[case_id, resultlog.to_microseconds(start)]
+                             for case_id, start in group_summary.start_times.items()],
+             'cases': [[case_id, to_state_value(value)] for case_id, value in case_summary.items()],
+             'groups': [[case_id, index, to_state_value(value)] for (case_id, index), value in group_summary.items()],
+             'stages': [[stage, case_id, to_state_value(value)] for (stage, case_id), value in stage_summary.items()],
+             'files': files}
+    temp_path = state_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(state, f)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    os.rename(temp_path, state_path)
+
+
+def get_fingerprint(prefix, size):
+    """Get fingerprint of file.
+
+    :param bytes prefix: the first bytes of file(decompressed if it is compressed).
+    :param int size: count of bytes of fingerprint.
+    :return list: size and SHA-1 of the first [size] bytes.
+    """
+    return [size, hashlib.sha1(prefix[:size]).hexdigest()]
+
+
+def match_positions(file_list, files):
+    """Match files with files saved in state file by fingerprint(the first bytes which are read already), so report
+    files which are renamed by rollover or compressed after the previous calculating are resumed rather than read again.
+
+    :param list file_list: file paths.
+    :param list files: files returned by load_state.
+    :return list: (file path, position, prefix) of each file, position is empty if file is not read yet.
+    """
+    prefixes = []
+    for file_path in file_list:
+        try:
+            with compression.open_file(file_path, 'rb') as f:
+                prefixes.append(f.read(FINGERPRINT_SIZE))
+        except Exception:
+            prefixes.append(b'')
+    positions = [None] * len(file_list)
+    unmatched = list(files)
+    for is_same_path in (True, False):    # File which is not renamed is preferred.
+        for i, file_path in enumerate(file_list):
+            if positions[i] is not None:
+                continue
+            for file_state in unmatched:
+                size = file_state[FINGERPRINT][0]
+                if (not is_same_path or file_state[PATH] == os.path.abspath(file_path)) and \
+                        len(prefixes[i]) >= size and get_fingerprint(prefixes[i], size) == file_state[FINGERPRINT]:
+                    positions[i] = file_state[POSITION]
+                    unmatched.remove(file_state)
+                    break
+    return [(file_path, position or dict(), prefix) for file_path, position, prefix in
+            zip(file_list, positions, prefixes)]
+
+
+def calc(file_paths, group_minutes=60, processes=1, state_path=None):
+    """Analyze report files and calculate failure rate, average, standard deviation and percentiles of time taken.
 
     :param list|str file_paths: file paths.
     :param int group_minutes: calculate failure rate and average of time taken by grouping case results with [group_minutes] minutes.
+    :param int processes: read files in [processes] worker processes, 0 means the number of CPU cores.
+    :param str state_path: save summary and position of each file into state file, case results which are read already
+        are not read again if state file exists(only new files and appended bytes are read).
     """
     if not file_paths:
         raise ValueError('Please provide file path.')
@@ -218,41 +883,60 @@ def calc(file_paths, group_minutes=60):
         if os.path.isfile(file_path):
             file_list.append(file_path)
         elif os.path.isdir(file_path):
-            file_list.extend([os.path.join(file_path, f) for f in os.listdir(file_path) if os.path.isfile(os.path.join(file_path, f))])
+            file_list.extend([os.path.join(file_path, f) for f in os.listdir(file_path)
+                              if os.path.isfile(os.path.join(file_path, f)) and
+                              not f.endswith(compression.TEMP_EXTENSION)])
         else:
             print('Error: cannot find {}.'.format(file_path))
 
-    group_summary = OrderedDict()
+    group_summary = GroupSummary()
     case_summary = dict()
-    for file_path in file_list:
-        print('Calculating for {}...'.format(file_path))
-        start_times, case_id, is_pass = dict(), None, None
-        try:
-            with open(file_path, 'r') as f:
-                line = f.readline()
-                if not line or not line.startswith('"Repeat Index","Id","Description","Status"'):
+    stage_summary = OrderedDict()
+    tasks, read, files = file_list, read_file, []
+    if state_path is not None:
+        file_list = [f for f in file_list if os.path.abspath(f) != os.path.abspath(state_path)]
+        tasks = match_positions(file_list, load_state(state_path, group_gap, case_summary, group_summary,
+                                                      stage_summary))
+        read = _read_new_rows
+    if processes <= 0:
+        processes = multiprocessing.cpu_count()
+    pool = None
+    if min(processes, len(file_list)) > 1:
+        pool = multiprocessing.Pool(min(processes, len(file_list)))
+        results = pool.imap(read, tasks)
+    else:
+        results = (read(task) for task in tasks)
+    try:
+        for file_path, task in zip(file_list, tasks):
+            rows = next(results)
+            print('Calculating for {}...'.format(file_path))
+            if state_path is not None:
+                rows, position = rows
+                if rows is None or not analyze_file(file_path, case_summary, group_summary, group_gap, stage_summary,
+                                                    rows):
                     print('Not report file, ignore file: {}'.format(file_path))
-                    continue
-                while True:
-                    line = f.readline()
-                    if not line:
-                        break
-                    status_match = STATUS_PATTERN.match(line)
-                    time_match = TIME_PATTERN.search(line)
-                    if status_match:
-                        case_id = status_match.group(1)
-                        is_pass = True if status_match.group(2) == 'Pass' else False
-
-                    if time_match:
-                        start_date, end_date = utility.str2date(time_match.group(1)), utility.str2date(time_match.group(2))
-                        time_taken = float(time_match.group(3))
-
-                        analyze_case(case_id, is_pass, start_date, end_date, time_taken,
-                                     case_summary, start_times, group_summary, group_gap)
-        except Exception:
-            print('Not report file, ignore file: {}'.format(file_path))
+                    position = task[1]
+                if position:
+                    files.append({PATH: os.path.abspath(file_path), POSITION: position,
+                                  FINGERPRINT: get_fingerprint(task[2], min(position[OFFSET], len(task[2])))})
+                continue
+            if rows is not None and analyze_file(file_path, case_summary, group_summary, group_gap, stage_summary, rows):
+                continue
+            try:
+                if resultlog.is_result_log(file_path):
+                    analyze_result_log(file_path, case_summary, group_summary, group_gap, stage_summary)
+                else:
+                    analyze_lines(file_path, case_summary, group_summary, group_gap, stage_summary)
+            except Exception:
+                print('Not report file, ignore file: {}'.format(file_path))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if state_path is not None:
+        save_state(state_path, group_gap, case_summary, group_summary, stage_summary, files)
 
     if not group_summary:
         print('No report result found.')
     else:
-        print(output_summary(case_summary, group_summary, group_gap))
+        print(output_summary(case_summary, group_summary, group_gap, stage_summary))
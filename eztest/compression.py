@@ -0,0 +1,184 @@
+"""Compression of rolled report files, and reading of compressed report files without extracting them.
+
+gzip is always available, zstd is used if the zstandard package is installed. Compressed files are recognized by their
+magic bytes rather than file extension, so calc and convert read report.csv.1.gz or report.ezr.1.zst as a stream.
+
+usage:
+compressor = Compressor(GZIP)
+compressor.put('reports/report.csv.1')     # reports/report.csv.1.gz is written in background thread
+compressor.close()      # wait until queued files are compressed
+
+with open_file('reports/report.csv.1.gz') as f:
+    header = f.readline()
+"""
+import gzip
+import io
+import os
+import shutil
+import threading
+import traceback
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+NONE = 'none'
+EXTENSIONS = {GZIP: '.gz', ZSTD: '.zst'}
+TEMP_EXTENSION = '.part'
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+CHUNK_SIZE = 1048576
+
+
+def get_default_method():
+    """Get default compression method.
+
+    :return str: zstd if zstandard package is installed, else gzip.
+    """
+    return ZSTD if zstandard is not None else GZIP
+
+
+def check_method(method):
+    """Check whether compression method can be used.
+
+    :param str method: gzip or zstd.
+    """
+    if method not in EXTENSIONS:
+        raise ValueError('Unknown compression method: {}'.format(method))
+    if method == ZSTD and zstandard is None:
+        raise ValueError('zstandard package is required by zstd compression, please install it.')
+
+
+def get_method(file_path):
+    """Get compression method of file by its magic bytes.
+
+    :param str file_path: file path.
+    :return str: gzip or zstd, None if file is not compressed.
+    """
+    with open(file_path, 'rb') as f:
+        magic = f.read(len(ZSTD_MAGIC))
+    if magic.startswith(GZIP_MAGIC):
+        return GZIP
+    if magic == ZSTD_MAGIC:
+        return ZSTD
+    return None
+
+
+def open_file(file_path, mode='r'):
+    """Open file for reading, compressed file is decompressed while it is read.
+
+    :param str file_path: file path.
+    :param str mode: 'r' or 'rb'.
+    :return: file object.
+    """
+    method = get_method(file_path)
+    if method is None:
+        return open(file_path, mode)
+    if method == GZIP:
+        stream = gzip.open(file_path, 'rb')
+    else:
+        check_method(method)
+        stream = io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True), CHUNK_SIZE)
+    if 'b' in mode:
+        return stream
+    return io.TextIOWrapper(stream)
+
+
+def skip(f, size):
+    """Skip bytes of file object opened by open_file, compressed file is read and discarded if it is not seekable.
+
+    :param f: file object opened in binary mode.
+    :param int size: count of bytes to skip from current position.
+    """
+    if f.seekable():
+        f.seek(size, io.SEEK_CUR)
+        return
+    while size > 0:
+        data = f.read(min(size, CHUNK_SIZE))
+        if not data:
+            break
+        size -= len(data)
+
+
+def compress_file(file_path, method=GZIP):
+    """Compress file into [file_path].gz or [file_path].zst, and remove file once it is compressed.
+
+    Compressed file is written as [file_path].gz.part first and renamed once it is completed, so readers never see a
+    partial compressed file.
+
+    :param str file_path: file path.
+    :param str method: gzip or zstd.
+    :return str: compressed file path.
+    """
+    check_method(method)
+    destination = file_path + EXTENSIONS[method]
+    temp_path = destination + TEMP_EXTENSION
+    with open(file_path, 'rb') as source:
+        if method == GZIP:
+            with gzip.open(temp_path, 'wb', compresslevel=6) as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+        else:
+            with open(temp_path, 'wb') as target:
+                zstandard.ZstdCompressor(level=3).copy_stream(source, target, read_size=CHUNK_SIZE,
+                                                             write_size=CHUNK_SIZE)
+    os.rename(temp_path, destination)
+    os.remove(file_path)
+    return destination
+
+
+class Compressor(object):
+    """Compress files one by one in a background thread, which is started once the first file is put."""
+    def __init__(self, method=None):
+        """Init.
+
+        :param str method: gzip or zstd, default method if it is None.
+        """
+        self.method = method or get_default_method()
+        self.compressed_count = 0
+        self.failed_count = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._mutex = threading.Lock()
+
+    def put(self, file_path):
+        """Put file to be compressed.
+
+        :param str file_path: file path.
+        """
+        with self._mutex:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._queue.put(file_path)
+
+    def close(self):
+        """Wait until files which are put are compressed, and stop background thread."""
+        with self._mutex:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        """Compress files in queue until None is got."""
+        while True:
+            file_path = self._queue.get()
+            if file_path is None:
+                break
+            try:
+                compress_file(file_path, self.method)
+                self.compressed_count += 1
+            except Exception:
+                self.failed_count += 1
+                traceback.print_exc()
@@ -0,0 +1,455 @@
+"""Datagram of case results, a compact binary format which test cases send to report server.
+
+Case results are sent in batches by a background sender, each datagram carries as many case results as fit into
+[datagram_size] bytes(under MTU, so it is not fragmented), and is sent once it is full or per flush interval.
+
+Over TCP(transport is tcp), each datagram is sent as a frame: length(uint32) and datagram, on a persistent connection.
+Report server replies 1 byte ACK once case results of the frame are queued, so a frame is kept in a bounded spill
+buffer until it is acknowledged, and is sent again after reconnecting if connection is lost. A frame may be written
+twice if connection is lost after it is queued but before ACK is received. A request of dump is a frame of b'dump',
+and is replied with a frame of dump in UTF-8, which can be of any size.
+
+Datagram starts with 5 bytes header b'EZTD\\x01'(magic and version), followed by case results, numbers are
+little-endian, text is UTF-8 with uint16 length(65535 if it is None). Each case result starts with 37 bytes: case
+index(uint16, index of case in this datagram), repeat index(uint32), status(uint8, 1 is Pass), starts datetime(int64),
+ends datetime(int64), time taken in seconds(float64, NaN if it is None), length of expected(uint16), length of
+received(uint16) and count of output messages(uint16). It is followed by id(text) and description(text) if it is the
+first result of the case in this datagram, then expected, received and output messages(text). Datetime is microseconds
+since 1970-01-01 00:00:00(see resultlog.to_microseconds).
+
+Each datagram can be decoded by itself, losing a datagram does not affect others. Expected, received and output
+messages are truncated to [payload_limit] bytes if it is set, a case result which is still larger than the maximum
+UDP payload is dropped.
+
+usage:
+sender = ReportSender(('localhost', 8765), datagram_size=1400, flush_interval=0.1, payload_limit=1024)
+sender.start()
+sender.put(dict(repeat_index=0, id='case1', description='', status=True, expected=None, received=None,
+                output_messages=[], start_time=start_datetime, end_time=end_datetime, time_taken=0.3))
+sender.close()
+print(sender.sent_count, sender.datagram_count, sender.dropped_count)
+
+sender = StreamReportSender(('localhost', 8765), flush_interval=0.1, spill_size=67108864)
+
+case_results = decode(data)
+"""
+import collections
+import datetime
+import socket
+import struct
+import threading
+
+from . import reportwriter, resultlog
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+MAGIC = b'EZTD'
+VERSION = b'\x01'
+HEADER = MAGIC + VERSION
+DATAGRAM_SIZE = 1400
+MAX_DATAGRAM_SIZE = 65507
+NO_TEXT = 0xFFFF
+MAX_TEXT_SIZE = 0xFFFE
+UDP = 'udp'
+TCP = 'tcp'
+ACK = b'\x06'
+MAX_FRAME_SIZE = 16777216
+
+_uint16_struct = struct.Struct('<H')
+_frame_struct = struct.Struct('<I')
+_result_struct = struct.Struct('<HIBqqdHHH')
+_EPOCH = resultlog.EPOCH
+_timedelta = datetime.timedelta
+
+
+def _encode_text(value, limit=None):
+    """Encode text field.
+
+    :param value: value, it is converted to str.
+    :param int limit: truncate UTF-8 bytes to [limit] bytes if it is set.
+    :return bytes: length and bytes.
+    """
+    if value is None:
+        return _uint16_struct.pack(NO_TEXT)
+    data = str(value).encode('utf-8')
+    limit = MAX_TEXT_SIZE if limit is None else min(limit, MAX_TEXT_SIZE)
+    if len(data) > limit:
+        data = data[:limit].decode('utf-8', 'ignore').encode('utf-8')
+    return _uint16_struct.pack(len(data)) + data
+
+
+def _decode_text(data, position):
+    """Decode text field.
+
+    :param bytes data: datagram.
+    :param int position: position of text field.
+    :return tuple: text(None if it is None) and position after it.
+    """
+    length, = _uint16_struct.unpack_from(data, position)
+    position += 2
+    if length == NO_TEXT:
+        return None, position
+    end = position + length
+    if end > len(data):
+        raise ValueError('Text is out of datagram at {}'.format(position))
+    return data[position:end].decode('utf-8'), end
+
+
+def _encode_result(case_result, payload_limit=None):
+    """Encode case result without its case.
+
+    :param dict case_result: case result, see report.ReportBaseHandler.write.
+    :param int payload_limit: expected, received and output messages are truncated to [payload_limit] bytes if it is set.
+    :return tuple: values of result struct after case index, and bytes of expected, received and output messages.
+    """
+    time_taken = case_result.get('time_taken')
+    expected = _encode_text(case_result.get('expected'), payload_limit)
+    received = _encode_text(case_result.get('received'), payload_limit)
+    parts = [expected[2:], received[2:]]
+    count, remaining = 0, payload_limit
+    for message in (case_result.get('output_messages') or [])[:MAX_TEXT_SIZE]:
+        if remaining is not None and remaining <= 0:
+            break
+        text = _encode_text(message, remaining)
+        parts.append(text)
+        count += 1
+        if remaining is not None:
+            remaining -= len(text) - 2
+    values = (case_result.get('repeat_index') or 0, 1 if case_result.get('status') else 0,
+              resultlog.to_microseconds(case_result.get('start_time')),
+              resultlog.to_microseconds(case_result.get('end_time')),
+              float('nan') if time_taken is None else time_taken,
+              _uint16_struct.unpack(expected[:2])[0], _uint16_struct.unpack(received[:2])[0], count)
+    return values, b''.join(parts)
+
+
+class Encoder(object):
+    """Encode case results into datagrams."""
+    def __init__(self, datagram_size=DATAGRAM_SIZE, payload_limit=None):
+        """Init.
+
+        :param int datagram_size: a datagram has at most [datagram_size] bytes, unless it only has one case result.
+        :param int payload_limit: expected, received and output messages are truncated to [payload_limit] bytes if it
+            is set.
+        """
+        self.datagram_size = min(datagram_size, MAX_DATAGRAM_SIZE)
+        self.payload_limit = payload_limit
+        self.skipped_count = 0
+
+    def encode(self, case_results):
+        """Encode case results into datagrams, case result which is larger than the maximum UDP payload is skipped.
+
+        :param list case_results: case results.
+        :return list: tuples of datagram and count of case results in it.
+        """
+        datagrams = []
+        parts, size, count, case_indexes = [HEADER], len(HEADER), 0, dict()
+        for case_result in case_results:
+            values, payload = _encode_result(case_result, self.payload_limit)
+            key = (case_result.get('id'), case_result.get('description'))
+            case_bytes = _encode_text(key[0]) + _encode_text(key[1])
+            record_size = _result_struct.size + len(payload)
+            case_index = case_indexes.get(key)
+            if count and size + record_size + (0 if case_index is not None else len(case_bytes)) > self.datagram_size:
+                datagrams.append((b''.join(parts), count))
+                parts, size, count, case_indexes = [HEADER], len(HEADER), 0, dict()
+                case_index = None
+            if case_index is None:
+                record_size += len(case_bytes)
+                if len(HEADER) + record_size > MAX_DATAGRAM_SIZE:
+                    self.skipped_count += 1
+                    continue
+                case_index = case_indexes[key] = len(case_indexes)
+                parts.append(_result_struct.pack(case_index, *values))
+                parts.append(case_bytes)
+            else:
+                parts.append(_result_struct.pack(case_index, *values))
+            parts.append(payload)
+            size += record_size
+            count += 1
+        if count:
+            datagrams.append((b''.join(parts), count))
+        return datagrams
+
+
+def is_datagram(data):
+    """Whether data is datagram of case results.
+
+    :param bytes data: data.
+    :return bool: whether it starts with magic.
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def decode(data):
+    """Decode datagram into case results. Malformed datagram is rejected with ValueError, nothing but text, numbers and
+    datetimes are created from it.
+
+    :param bytes data: datagram.
+    :return list: case results, see report.ReportBaseHandler.write.
+    """
+    if data[:len(HEADER)] != HEADER:
+        raise ValueError('Not datagram of case results, or unsupported version: {!r}'.format(data[:len(HEADER)]))
+    unpack_from, result_size, epoch, timedelta = _result_struct.unpack_from, _result_struct.size, _EPOCH, _timedelta
+    no_datetime = resultlog.NO_DATETIME
+    case_results, cases = [], []
+    position, data_size = len(HEADER), len(data)
+    try:
+        while position < data_size:
+            (case_index, repeat_index, status, start_us, end_us, time_taken, expected_length, received_length,
+             count) = unpack_from(data, position)
+            position += result_size
+            if case_index < len(cases):
+                case_id, description = cases[case_index]
+            elif case_index == len(cases):
+                case_id, position = _decode_text(data, position)
+                description, position = _decode_text(data, position)
+                cases.append((case_id, description))
+            else:
+                raise ValueError('Unknown case index {} at {}'.format(case_index, position - result_size))
+            expected = received = None
+            if expected_length != NO_TEXT:
+                expected = data[position:position + expected_length].decode('utf-8')
+                position += expected_length
+            if received_length != NO_TEXT:
+                received = data[position:position + received_length].decode('utf-8')
+                position += received_length
+            output_messages = []
+            for _ in range(count):
+                message, position = _decode_text(data, position)
+                output_messages.append(message)
+            if position > data_size:
+                raise ValueError('Case result is out of datagram at {}'.format(position))
+            case_results.append({
+                'repeat_index': repeat_index,
+                'id': case_id,
+                'description': description,
+                'status': status == 1,
+                'expected': expected,
+                'received': received,
+                'output_messages': output_messages,
+                'start_time': None if start_us == no_datetime else epoch + timedelta(0, 0, start_us),
+                'end_time': None if end_us == no_datetime else epoch + timedelta(0, 0, end_us),
+                'time_taken': None if time_taken != time_taken else time_taken
+            })
+    except (struct.error, OverflowError) as e:
+        raise ValueError('Malformed datagram at {}: {}'.format(position, e))
+    return case_results
+
+
+def pack_frame(data):
+    """Pack data into frame.
+
+    :param bytes data: data.
+    :return bytes: length(uint32) and data.
+    """
+    return _frame_struct.pack(len(data)) + data
+
+
+def read_frame(file, max_size=MAX_FRAME_SIZE):
+    """Read a frame from stream.
+
+    :param file: file object of stream, e.g.: socket.makefile('rb').
+    :param int max_size: raise ValueError if length of frame is larger than [max_size].
+    :return bytes: data of frame, None if stream is closed(a partial frame is discarded).
+    """
+    header = file.read(_frame_struct.size)
+    if len(header) < _frame_struct.size:
+        return None
+    length, = _frame_struct.unpack(header)
+    if length > max_size:
+        raise ValueError('Frame of {} bytes is larger than {} bytes'.format(length, max_size))
+    data = file.read(length)
+    if len(data) < length:
+        return None
+    return data
+
+
+class ReportSender(reportwriter.ReportWriter):
+    """Send case results to report server in batches of datagrams in a background thread."""
+    def __init__(self, address, datagram_size=DATAGRAM_SIZE, flush_interval=0.1, payload_limit=None,
+                 batch_size=1000, queue_size=0):
+        """Init.
+
+        :param tuple address: (host, port) of report server.
+        :param int datagram_size: a datagram has at most [datagram_size] bytes, unless it only has one case result.
+        :param float flush_interval: case results are sent at least per [flush_interval] seconds.
+        :param int payload_limit: expected, received and output messages are truncated to [payload_limit] bytes if it
+            is set.
+        :param int batch_size: case results are encoded and sent once [batch_size] case results are taken from queue.
+        :param int queue_size: only can have [queue_size] case results waiting in queue, others are dropped, 10 times
+            of [batch_size] if it is 0.
+        """
+        super(ReportSender, self).__init__(None, batch_size, flush_interval, queue_size)
+        self.address = address
+        self.file = self._open()
+        self.encoder = Encoder(datagram_size, payload_limit)
+        self.sent_count = 0
+        self.datagram_count = 0
+        self.dropped_count = 0
+        self.last_error = None
+        self._mutex = threading.Lock()
+
+    def put(self, case_result):
+        """Put a case result into queue, it is dropped if the queue is full.
+
+        :param dict case_result: case result, see report.ReportBaseHandler.write.
+        """
+        try:
+            self._queue.put_nowait(case_result)
+        except queue.Full:
+            with self._mutex:
+                self.dropped_count += 1
+
+    def close(self):
+        """Send all queued case results, stop sender thread and close socket."""
+        super(ReportSender, self).close()
+        self._finish()
+
+    def _open(self):
+        """Open socket.
+
+        :return socket.socket: UDP socket.
+        """
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _finish(self):
+        """Close socket after sender thread is stopped."""
+        self.file.close()
+
+    def _write(self, batch):
+        """Encode a batch of case results and send datagrams.
+
+        :param list batch: case results.
+        """
+        skipped_count = self.encoder.skipped_count
+        datagrams = self.encoder.encode(batch)
+        dropped_count = self.encoder.skipped_count - skipped_count
+        for data, count in datagrams:
+            try:
+                self.file.sendto(data, self.address)
+                self.sent_count += count
+                self.datagram_count += 1
+            except Exception as e:
+                self.last_error = e
+                dropped_count += count
+        if dropped_count:
+            with self._mutex:
+                self.dropped_count += dropped_count
+
+    def _flush(self):
+        """Datagrams are sent once they are encoded."""
+        pass
+
+
+class StreamReportSender(ReportSender):
+    """Send case results to report server in frames over a persistent TCP connection, reconnect if it is lost."""
+    def __init__(self, address, flush_interval=0.1, payload_limit=None, batch_size=1000, queue_size=0,
+                 spill_size=67108864, reconnect_interval=1.0, timeout=10):
+        """Init.
+
+        :param tuple address: (host, port) of report server.
+        :param float flush_interval: case results are sent at least per [flush_interval] seconds.
+        :param int payload_limit: expected, received and output messages are truncated to [payload_limit] bytes if it
+            is set.
+        :param int batch_size: case results are encoded and sent once [batch_size] case results are taken from queue.
+        :param int queue_size: only can have [queue_size] case results waiting in queue, others are dropped, 10 times
+            of [batch_size] if it is 0.
+        :param int spill_size: frames which are not acknowledged are kept in a spill buffer of at most [spill_size]
+            bytes, the oldest ones are dropped if it is full.
+        :param float reconnect_interval: connect again after [reconnect_interval] seconds if connection is lost.
+        :param float timeout: timeout of connecting, sending and waiting for ACK in seconds.
+        """
+        super(StreamReportSender, self).__init__(address, MAX_DATAGRAM_SIZE, flush_interval, payload_limit, batch_size,
+                                                 queue_size)
+        self.spill_size = spill_size
+        self.reconnect_interval = reconnect_interval
+        self.timeout = timeout
+        self.connection_count = 0
+        self._frames = collections.deque()
+        self._spilled_size = 0
+        self._reconnect_clock = None
+
+    def _open(self):
+        """Connection is opened by sender thread when the first frame is sent."""
+        return None
+
+    def _finish(self):
+        """Send spilled frames once more and close connection, frames which still can not be sent are dropped."""
+        self._send_frames(True)
+        dropped_count = sum(count for _, count in self._frames)
+        if dropped_count:
+            with self._mutex:
+                self.dropped_count += dropped_count
+        self._frames.clear()
+        self._spilled_size = 0
+        self._disconnect()
+
+    def _write(self, batch):
+        """Encode a batch of case results into frames, spill them and send spilled frames.
+
+        :param list batch: case results.
+        """
+        skipped_count = self.encoder.skipped_count
+        for data, count in self.encoder.encode(batch):
+            frame = pack_frame(data)
+            self._frames.append((frame, count))
+            self._spilled_size += len(frame)
+        dropped_count = self.encoder.skipped_count - skipped_count
+        while self._spilled_size > self.spill_size:
+            frame, count = self._frames.popleft()
+            self._spilled_size -= len(frame)
+            dropped_count += count
+        if dropped_count:
+            with self._mutex:
+                self.dropped_count += dropped_count
+        self._send_frames()
+
+    def _flush(self):
+        """Send spilled frames if connection was lost."""
+        if self._frames:
+            self._send_frames()
+
+    def _send_frames(self, reconnect_now=False):
+        """Connect if it is not connected, send spilled frames one by one and wait for ACK of each of them.
+
+        :param bool reconnect_now: connect without waiting for reconnect interval.
+        """
+        if self.file is None:
+            if not self._frames or (not reconnect_now and self._reconnect_clock is not None and
+                                    reportwriter._clock() < self._reconnect_clock):
+                return
+            try:
+                self.file = socket.create_connection(self.address, self.timeout)
+                self.connection_count += 1
+            except Exception as e:
+                self.last_error = e
+                self._reconnect_clock = reportwriter._clock() + self.reconnect_interval
+                return
+        while self._frames:
+            frame, count = self._frames[0]
+            try:
+                self.file.sendall(frame)
+                if self.file.recv(1) != ACK:
+                    raise ConnectionError('Connection is closed by report server before ACK')
+            except Exception as e:
+                self.last_error = e
+                self._disconnect()
+                self._reconnect_clock = reportwriter._clock() + self.reconnect_interval
+                return
+            self._frames.popleft()
+            self._spilled_size -= len(frame)
+            self.sent_count += count
+            self.datagram_count += 1
+
+    def _disconnect(self):
+        """Close connection."""
+        if self.file is not None:
+            try:
+                self.file.close()
+            except Exception:
+                pass
+            self.file = None
@@ -0,0 +1,202 @@
+"""Latency histogram: a mergeable histogram of time taken with log buckets(HDR-style) in fixed memory, which gets
+percentiles, mean and standard deviation of case results.
+
+Time taken is recorded in microseconds. Values less than 2 ** SUB_BUCKET_BITS microseconds are kept exactly, each
+larger power of two is divided into 2 ** (SUB_BUCKET_BITS - 1) buckets, so a percentile is at most 0.1% higher than
+the exact one(it is the highest value of the bucket, but never higher than the maximum). Count, sum and sum of squares
+are kept in integers, so mean and standard deviation do not depend on the order of values, and merging histograms gets
+the same results as recording all values into one histogram.
+
+usage:
+histogram = Histogram()
+histogram.record(0.3)
+histogram.record_values([0.2, 0.5])
+histogram.merge(other_histogram)
+histogram = Histogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+print(histogram.percentile(99.9), histogram.percentiles([50, 99]), histogram.mean(), histogram.stddev())
+"""
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SUB_BUCKET_BITS = 11
+
+
+def to_microseconds(seconds):
+    """Convert seconds to microseconds recorded in histogram.
+
+    :param float seconds: seconds.
+    :return int: microseconds, 0 if seconds is negative.
+    """
+    return max(int(seconds * 1000000 + 0.5), 0)
+
+
+def get_bucket(microseconds):
+    """Get index of bucket.
+
+    :param int microseconds: microseconds.
+    :return int: index of bucket.
+    """
+    shift = max(microseconds.bit_length() - SUB_BUCKET_BITS, 0)
+    return (shift << (SUB_BUCKET_BITS - 1)) + (microseconds >> shift)
+
+
+def get_bucket_range(bucket):
+    """Get range of microseconds of bucket.
+
+    :param int bucket: index of bucket.
+    :return tuple: the lowest and highest microseconds of bucket.
+    """
+    shift = max((bucket >> (SUB_BUCKET_BITS - 1)) - 1, 0)
+    lowest = (bucket - (shift << (SUB_BUCKET_BITS - 1))) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+class Histogram(object):
+    """Latency histogram."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.square_total = 0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = dict()
+
+    def record(self, seconds):
+        """Record a value.
+
+        :param float seconds: time taken in seconds.
+        """
+        microseconds = to_microseconds(seconds)
+        self.count += 1
+        self.total += microseconds
+        self.square_total += microseconds * microseconds
+        if self.minimum is None or microseconds < self.minimum:
+            self.minimum = microseconds
+        if self.maximum is None or microseconds > self.maximum:
+            self.maximum = microseconds
+        bucket = get_bucket(microseconds)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def record_values(self, values):
+        """Record values, same as recording them one by one(NumPy is used if it is installed).
+
+        :param values: time takens in seconds, e.g.: list or array.array('d').
+        """
+        if numpy is None or len(values) == 0:
+            for value in values:
+                self.record(value)
+            return
+        microseconds = numpy.maximum((numpy.asarray(values, dtype=numpy.float64) * 1000000 + 0.5).astype(numpy.int64), 0)
+        shifts = numpy.maximum(numpy.frexp(microseconds.astype(numpy.float64))[1] - SUB_BUCKET_BITS, 0)
+        buckets, counts = numpy.unique((shifts << (SUB_BUCKET_BITS - 1)) + (microseconds >> shifts), return_counts=True)
+        for bucket, count in zip(buckets.tolist(), counts.tolist()):
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        microseconds = microseconds.tolist()
+        self.count += len(microseconds)
+        self.total += sum(microseconds)
+        self.square_total += sum(m * m for m in microseconds)
+        minimum, maximum = min(microseconds), max(microseconds)
+        if self.minimum is None or minimum < self.minimum:
+            self.minimum = minimum
+        if self.maximum is None or maximum > self.maximum:
+            self.maximum = maximum
+
+    def merge(self, other):
+        """Merge values of other histogram into this one.
+
+        :param Histogram other: other histogram.
+        """
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.square_total += other.square_total
+        self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def mean(self):
+        """Get mean of values.
+
+        :return float: mean in seconds, None if there is no value.
+        """
+        if self.count == 0:
+            return None
+        return self.total / (self.count * 1000000.0)
+
+    def stddev(self):
+        """Get (population) standard deviation of values.
+
+        :return float: standard deviation in seconds, None if there is no value.
+        """
+        if self.count == 0:
+            return None
+        return math.sqrt(self.count * self.square_total - self.total * self.total) / (self.count * 1000000.0)
+
+    def percentile(self, percentile):
+        """Get value at percentile.
+
+        :param float percentile: percentile between 0 and 100, e.g.: 99.9.
+        :return float: the highest value of bucket which the value at percentile belongs to in seconds, but not higher
+            than the maximum, None if there is no value.
+        """
+        return self.percentiles([percentile])[0]
+
+    def percentiles(self, percentiles):
+        """Get values at percentiles in one pass over buckets.
+
+        :param list percentiles: percentiles between 0 and 100.
+        :return list: values at percentiles in seconds, see percentile.
+        """
+        if self.count == 0:
+            return [None] * len(percentiles)
+        buckets = sorted(self.buckets)
+        if len(buckets) == 1:
+            return [min(get_bucket_range(buckets[0])[1], self.maximum) / 1000000.0] * len(percentiles)
+        ranks = sorted((max(-(-int(round(p * 1000)) * self.count // 100000), 1), i) for i, p in enumerate(percentiles))
+        values = [None] * len(percentiles)
+        seen, position = 0, 0
+        for bucket in buckets:
+            seen += self.buckets[bucket]
+            while seen >= ranks[position][0]:
+                values[ranks[position][1]] = min(get_bucket_range(bucket)[1], self.maximum) / 1000000.0
+                position += 1
+                if position == len(ranks):
+                    return values
+        return values
+
+    def to_dict(self):
+        """Convert histogram to dictionary which can be saved as JSON.
+
+        :return dict: dictionary, buckets are [bucket, count] pairs.
+        """
+        return {'count': self.count, 'total': self.total, 'square_total': self.square_total,
+                'minimum': self.minimum, 'maximum': self.maximum, 'buckets': sorted(self.buckets.items())}
+
+    @classmethod
+    def from_dict(cls, value):
+        """Create histogram from dictionary returned by to_dict.
+
+        :param dict value: dictionary.
+        :return Histogram: histogram.
+        """
+        result = cls()
+        result.count, result.total, result.square_total = value['count'], value['total'], value['square_total']
+        result.minimum, result.maximum = value['minimum'], value['maximum']
+        result.buckets = dict((bucket, count) for bucket, count in value['buckets'])
+        return result
+
+    def __eq__(self, other):
+        return isinstance(other, Histogram) and (self.count, self.total, self.square_total, self.buckets) == (
+            other.count, other.total, other.square_total, other.buckets)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'Histogram(count={}, mean={}, stddev={})'.format(self.count, self.mean(), self.stddev())
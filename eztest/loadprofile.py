@@ -0,0 +1,173 @@
+"""Load profile: ramp target concurrency or arrival rate of testing through a list of stages.
+
+Each stage has a duration in seconds and a target. Target of testing is changed linearly from target of previous
+stage (0 for the first stage) to target of current stage within duration of current stage, and testing is stopped
+after the last stage. Target is the count of threads in concurrency mode, virtual users in async mode, arrivals per
+interval in frequent and pool mode, and arrivals per second in rate mode.
+
+A stage is "[name=]duration:target" in command line, e.g.:
+eztest test --target examples.target_is_module --mode concurrency --stages warm-up=60:10 300:50 60:0
+
+Or a section in INI file, section name is the stage name, e.g.:
+[warm-up]
+duration=60
+target=10
+
+[steady]
+duration=300
+target=50
+
+usage:
+stages = get_stages(['warm-up=60:10', '300:50', '60:0'])
+stages = get_stages(file_path='profile.ini')
+profile = LoadProfile(stages)
+profile.get_target(90)              # (stage "Stage 2", 14.0)
+profile.get_arrival_seconds(100)    # Seconds when the 100th arrival should be started if target is arrival rate.
+"""
+import math
+import os
+
+from . import ini, utility
+
+
+class Stage(object):
+    """A stage of load profile."""
+    def __init__(self, duration=0.0, target=0.0, name=None):
+        """Init.
+
+        :param float duration: duration in seconds.
+        :param float target: target concurrency or arrival rate at the end of this stage.
+        :param str name: stage name.
+        """
+        self.duration = float(duration)
+        self.target = float(target)
+        self.name = name
+
+    def __str__(self):
+        return '{}={}:{}'.format(self.name, _format_number(self.duration), _format_number(self.target))
+
+
+def _format_number(value):
+    """Format float so that it can be parsed back to the same value, e.g. "60" or "0.8333333333333334".
+
+    :param float value: value.
+    :return str: formatted value.
+    """
+    return '%d' % value if value.is_integer() else repr(value)
+
+
+def parse_stage(value, index=0):
+    """Parse stage from "[name=]duration:target".
+
+    :param str value: stage string.
+    :param int index: index of stage, stage is named as "Stage [index + 1]" if name is not provided.
+    :return Stage: stage.
+    """
+    name, _, timing = value.rpartition('=')
+    try:
+        duration, target = timing.split(':')
+        stage = Stage(duration, target, name or 'Stage {}'.format(index + 1))
+    except ValueError:
+        raise ValueError('Stage "{}" is not "[name=]duration:target" format.'.format(value))
+    return stage
+
+
+def load_stages(file_path):
+    """Load stages from INI file, each section is a stage with "duration" and "target".
+
+    :param str file_path: INI file path.
+    :return list: stages.
+    """
+    if not os.path.isfile(file_path):
+        raise ValueError('Cannot find load profile file: {}'.format(file_path))
+    stages = []
+    for section in ini.INI(file_path).sections:
+        if not section.contains('duration') or not section.contains('target'):
+            raise ValueError('Stage "{}" should have "duration" and "target".'.format(section.name))
+        stage = Stage(name=section.name)
+        section.to_object(stage)
+        stages.append(stage)
+    return stages
+
+
+def get_stages(values=None, file_path=None):
+    """Get stages from command line, or INI file.
+
+    :param list values: a list of "[name=]duration:target".
+    :param str file_path: INI file path.
+    :return list: stages, None if neither of them is provided.
+    """
+    if values:
+        return [parse_stage(value, i) for i, value in enumerate(values)]
+    elif file_path:
+        return load_stages(file_path)
+    return None
+
+
+def split_stages(stages, count, index):
+    """Split target of each stage into count shares, and get stages with share of index.
+
+    :param list stages: stages.
+    :param int count: count of shares.
+    :param int index: index of share.
+    :return list: stages.
+    """
+    result = []
+    for stage in stages:
+        if stage.target == int(stage.target):
+            target = utility.split_value(int(stage.target), count, index)
+        else:
+            target = stage.target / count
+        result.append(Stage(stage.duration, target, stage.name))
+    return result
+
+
+class LoadProfile(object):
+    """Load profile, a list of stages."""
+    def __init__(self, stages):
+        """Init.
+
+        :param list stages: stages.
+        """
+        if not stages:
+            raise ValueError('Load profile should have at least one stage.')
+        for stage in stages:
+            if stage.duration < 0 or stage.target < 0:
+                raise ValueError('Duration and target of stage "{}" should not be negative.'.format(stage.name))
+        self.stages = list(stages)
+        self.total_seconds = sum(stage.duration for stage in self.stages)
+        if self.total_seconds <= 0:
+            raise ValueError('Load profile should have duration.')
+
+    def get_target(self, seconds):
+        """Get stage and target at seconds after testing is started.
+
+        :param float seconds: seconds after testing is started.
+        :return tuple: stage and target, (None, None) if load profile is finished.
+        """
+        elapsed, start_target = 0.0, 0.0
+        for stage in self.stages:
+            if seconds < elapsed + stage.duration:
+                return stage, start_target + (stage.target - start_target) * (seconds - elapsed) / stage.duration
+            elapsed += stage.duration
+            start_target = stage.target
+        return None, None
+
+    def get_arrival_seconds(self, count):
+        """Get seconds after testing is started when [count] arrivals have been started, target is arrival rate.
+
+        :param int count: count of arrivals.
+        :return float: seconds, None if load profile is finished before that.
+        """
+        elapsed, start_target, remaining = 0.0, 0.0, float(count)
+        for stage in self.stages:
+            area = (start_target + stage.target) / 2.0 * stage.duration
+            if remaining < area:
+                # Arrivals within x seconds of stage: start_target * x + slope * x * x / 2
+                slope = (stage.target - start_target) / stage.duration
+                discriminant = math.sqrt(max(start_target * start_target + 2 * slope * remaining, 0.0))
+                return elapsed + (2 * remaining / (start_target + discriminant) if remaining > 0 else 0.0)
+            remaining -= area
+            elapsed += stage.duration
+            start_target = stage.target
+        return None
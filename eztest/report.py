@@ -1,32 +1,58 @@
-"""Report server and report handler."""
+"""Report server and report handler.
+
+Report server receives datagrams in a receive thread, which only puts them into a bounded queue, so the socket is
+drained as fast as possible. Main thread takes datagrams from the queue, decodes them and writes case results into
+handler in batches. Counts of batches(datagrams or frames) received, dropped(queue is full) and failed, and count of
+case results written are appended to dump.
+
+A datagram carries a batch of case results in compact binary format(see datagram), which is decoded by its schema,
+nothing but text, numbers and datetimes is created from it. Malformed datagrams, e.g.: pickled case results sent by
+former versions, are rejected and counted as failed.
+
+Report server also listens on TCP of the same port, each connection is served in its own thread, which reads frames of
+datagrams and acknowledges each of them once it is put into the queue. It waits while the queue is full instead of
+dropping frames, so TCP clients are slowed down. Dump is replied in a frame over TCP, so it is not limited by the
+maximum size of a datagram.
+"""
 import datetime
 import importlib
 import os
 import re
+import signal
 import socket
 import sys
+import threading
+import time
 import traceback
 
-from eztest import calc_report, utility
+from eztest import calc_report, compression, datagram, resultlog, rollingwindow, utility
 
 try:
-    from _collections import OrderedDict
+    import queue
 except ImportError:
-    from collections import OrderedDict
+    import Queue as queue
 
 try:
-    import cPickle as pickle
+    import socketserver
 except ImportError:
-    import pickle
+    import SocketServer as socketserver
+
+DUMP = b'dump'
+
+_clock = getattr(time, 'monotonic', time.time)
 
 
 class ReportBaseHandler(object):
     """Base report handler."""
     def __init__(self):
-        self.group_summary = OrderedDict()
+        self.group_summary = calc_report.GroupSummary()
         self.case_summary = dict()
-        self.start_times = dict()
+        self.end_times = dict()
+        self.late_counts = dict()
         self.group_gap = datetime.timedelta(seconds=3600)
+        self.lateness = None
+        self.rolling_windows = dict()
+        self.window_seconds = rollingwindow.WINDOWS
 
     def write(self, case_result):
         """Add case result to summary.
@@ -45,17 +71,41 @@ class ReportBaseHandler(object):
                 "time_taken": float(...)  # time taken
             )
         """
-        calc_report.analyze_case(
+        is_added = calc_report.analyze_case(
             case_id=case_result['id'],
             is_pass=case_result['status'],
             start_date=case_result['start_time'],
             end_date=case_result['end_time'],
             time_taken=case_result['time_taken'],
             case_summary=self.case_summary,
-            start_times=self.start_times,
+            end_times=self.end_times,
             group_summary=self.group_summary,
-            group_gap=self.group_gap
+            group_gap=self.group_gap,
+            lateness=self.lateness
         )
+        if not is_added:
+            self.late_counts[case_result['id']] = self.late_counts.get(case_result['id'], 0) + 1
+        if case_result['end_time'] is not None:
+            window = self.rolling_windows.get(case_result['id'])
+            if window is None:
+                window = self.rolling_windows[case_result['id']] = rollingwindow.RollingWindow(max(self.window_seconds))
+            window.record(case_result['end_time'], case_result['time_taken'], case_result['status'])
+
+    def write_batch(self, case_results):
+        """Add case results to summary.
+
+        :param list case_results: case results, see write.
+        """
+        for case_result in case_results:
+            self.write(case_result)
+
+    def flush(self):
+        """Flush case results which are written, called by report server per flush interval and once it is stopped."""
+        pass
+
+    def close(self):
+        """Release resources of handler, called by report server once it is stopped."""
+        pass
 
     def dump(self):
         """Dump summary.
@@ -63,37 +113,82 @@ class ReportBaseHandler(object):
         :return str: summary.
         """
         if self.group_summary:
-            return calc_report.output_summary(case_summary=self.case_summary,
-                                              group_summary=self.group_summary,
-                                              group_gap=self.group_gap)
+            summary = calc_report.output_summary(case_summary=self.case_summary,
+                                                 group_summary=self.group_summary,
+                                                 group_gap=self.group_gap)
+            if self.late_counts:
+                summary += '\nCase Id,Late Count(ended more than {:g} seconds before the latest one, not in groups)\n'.format(
+                    self.lateness.total_seconds()) + ''.join(
+                    '{},{}\n'.format(case_id, count) for case_id, count in self.late_counts.items())
+            return summary + self.dump_windows()
         else:
             return 'No data found.'
 
+    def dump_windows(self):
+        """Dump throughput, failure rate and time taken of each case over rolling windows, which end at the latest
+        second of all case results.
+
+        :return str: summary of rolling windows, empty if there is no case result.
+        """
+        seconds = [window.latest_second for window in self.rolling_windows.values() if window.latest_second is not None]
+        if not seconds:
+            return ''
+        end_second = max(seconds)
+        lines = ['', 'Rolling windows until {}'.format(
+            utility.date2str(resultlog.from_microseconds((end_second + 1) * 1000000), '%Y-%m-%d %H:%M:%S')),
+            'Case Id,Window Seconds,Fail Count,Total Count,Failure Rate,Throughput,Average Time Taken,{}'.format(
+                ','.join('P{:g}'.format(p) for p in calc_report.PERCENTILES))]
+        for case_id, window in self.rolling_windows.items():
+            for window_seconds in self.window_seconds:
+                count, failed_count, values = window.get(window_seconds, end_second)
+                lines.append('{},{},{},{},{:.4f}%,{:g},{}'.format(
+                    case_id, window_seconds, failed_count, count, failed_count * 100.0 / (count or 1),
+                    count / float(window_seconds),
+                    ','.join('' if v is None else str(v) for v in [values.mean()] + values.percentiles(
+                        calc_report.PERCENTILES))))
+        return '\n'.join(lines) + '\n'
+
 
 class ReportFileHandler(ReportBaseHandler):
-    """Report handler which will save case result into CSV file."""
-    def __init__(self):
+    """Report handler which will save case result into CSV file, or binary result log if report format is binary.
+
+    Rows are written through a buffered stream of [buffer_size] bytes, which is flushed once it is full or flush is
+    called. Size of report file is counted in memory, so rollover does not need to ask file system. Rolled report files
+    are compressed in a background thread if compression is gzip or zstd.
+    """
+    def __init__(self, report_format=resultlog.CSV):
         super(ReportFileHandler, self).__init__()
         self.report_folder_name = 'reports'
-        self.filename = 'report.csv'
+        self.report_format = report_format
+        self.filename = 'report' + (resultlog.FILE_EXTENSION if report_format == resultlog.BINARY else '.csv')
         self.max_bytes = 10485760
+        self.buffer_size = 1048576
         self.file_index = 1
+        self.compression = compression.get_default_method()
+        self._compressor = None
         self._stream = None
+        self._size = 0
+        self._encoder = resultlog.Encoder()
 
     def _open(self):
         """Create and open report file.
 
         :return: file object.
         """
-        stream = open(os.path.join(self.report_folder_name, self.filename), 'a', encoding='utf-8')
-        stream.write('"Repeat Index","Id","Description","Status","Expected","Received","Output","Starts DateTime","Ends DateTime","E2E Taken"\n')
+        stream = open(os.path.join(self.report_folder_name, self.filename), 'ab', self.buffer_size)
+        if self.report_format == resultlog.BINARY:
+            stream.write(resultlog.HEADER)
+        else:
+            stream.write(b'"Repeat Index","Id","Description","Status","Expected","Received","Output","Starts DateTime","Ends DateTime","E2E Taken"\n')
         stream.flush()
+        self._size = stream.tell()
         return stream
 
-    def should_rollover(self, message):
+    def should_rollover(self, message, pending_size=0):
         """Check whether need to do roll over.
 
-        :param str message: message
+        :param bytes message: message
+        :param int pending_size: size of messages which are not written into report file yet.
         :return bool: True or False.
         """
         if self._stream is None:
@@ -101,10 +196,8 @@ class ReportFileHandler(ReportBaseHandler):
                 os.rename(self.report_folder_name, '{}_{}'.format(self.report_folder_name, datetime.datetime.now().strftime('%Y%m%d%H%M%S')))
             os.mkdir(self.report_folder_name)
             self._stream = self._open()
-        else:
-            self._stream.seek(0, 2)  #due to non-posix-compliant Windows feature
-            if self._stream.tell() + len(message) >= self.max_bytes:
-                return True
+        elif self._size + pending_size + len(message) >= self.max_bytes:
+            return True
         return False
 
     def do_rollover(self):
@@ -117,6 +210,11 @@ class ReportFileHandler(ReportBaseHandler):
         if os.path.exists(source):
             os.rename(source, destination)
             self.file_index += 1
+            if self.compression and self.compression != compression.NONE:
+                if self._compressor is None:
+                    self._compressor = compression.Compressor(self.compression)
+                self._compressor.put(destination)
+        self._encoder = resultlog.Encoder()
         self._stream = self._open()
 
     @classmethod
@@ -153,26 +251,334 @@ class ReportFileHandler(ReportBaseHandler):
             utility.date2str(case_result['end_time']),
             case_result['time_taken'])
 
+    def encode(self, case_result):
+        """Encode case result as a row of CSV file in UTF-8, or a record of binary result log if report format is binary.
+
+        :param dict case_result: case result.
+        :return bytes: row, or record with case id in front of it if it is the first record of the case in report file.
+        """
+        if self.report_format != resultlog.BINARY:
+            return self.format(case_result).encode('utf-8')
+        return self._encoder.encode(resultlog.Record(
+            case_result['id'], case_result['description'], case_result['repeat_index'], case_result['status'],
+            case_result['start_time'], case_result['end_time'], case_result['time_taken'], None))
+
     def write(self, case_result):
         """Write case result into report file.
 
         :param dict case_result: case result.
         """
-        message = self.format(case_result)
+        message = self.encode(case_result)
         if self.should_rollover(message):
             self.do_rollover()
+            if self.report_format == resultlog.BINARY:   # case ids are written into new report file again
+                message = self.encode(case_result)
         self._stream.write(message)
-        self._stream.flush()
+        self._size += len(message)
         super(ReportFileHandler, self).write(case_result)
 
+    def write_batch(self, case_results):
+        """Write case results into report file with one write call per report file.
+
+        :param list case_results: case results, see write.
+        """
+        is_binary = self.report_format == resultlog.BINARY
+        messages, pending_size = [], 0
+        for case_result in case_results:
+            message = self.encode(case_result)
+            if self.should_rollover(message, pending_size):
+                if messages:
+                    self._stream.write(b''.join(messages))
+                    self._size += pending_size
+                    messages, pending_size = [], 0
+                self.do_rollover()
+                if is_binary:
+                    message = self.encode(case_result)
+            messages.append(message)
+            pending_size += len(message)
+        if messages:
+            self._stream.write(b''.join(messages))
+            self._size += pending_size
+        for case_result in case_results:
+            super(ReportFileHandler, self).write(case_result)
+
+    def flush(self):
+        """Flush report file."""
+        if self._stream is not None:
+            self._stream.flush()
+
+    def close(self):
+        """Close report file, and wait until rolled report files are compressed."""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self._compressor is not None:
+            self._compressor.close()
+
+
+class _StreamRequestHandler(socketserver.StreamRequestHandler):
+    """Read frames from a persistent TCP connection."""
+    def handle(self):
+        self.server.report_server.handle_stream(self.request, self.rfile, self.wfile)
+
+
+class _StreamServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ReportServer(object):
+    """UDP and TCP report server, which receives batches of case results in receive threads and writes them in
+    batches."""
+    def __init__(self, handler, port=8765, queue_size=100000, batch_size=1000, receive_buffer_size=8388608,
+                 flush_interval=1.0):
+        """Init.
+
+        :param ReportBaseHandler handler: report handler.
+        :param int port: port number, a free port is used if it is 0.
+        :param int queue_size: only can have [queue_size] datagrams waiting in queue, others are dropped(TCP clients wait
+            instead).
+        :param int batch_size: decode at most [batch_size] datagrams and write their case results into handler once.
+        :param int receive_buffer_size: SO_RCVBUF of socket, which may be limited by operating system.
+        :param float flush_interval: flush handler per [flush_interval] seconds, and once server is stopped.
+        """
+        self.handler = handler
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.received_count = 0
+        self.processed_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._dump_queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._mutex = threading.Lock()
+        self._connections = set()
+        self._connections_condition = threading.Condition(self._mutex)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+        except (OSError, socket.error):
+            traceback.print_exc()
+        self._socket.settimeout(0.5)
+        self._socket.bind(('', port))
+        self.port = self._socket.getsockname()[1]
+        self._stream_server = _StreamServer(('', self.port), _StreamRequestHandler)
+        self._stream_server.report_server = self
+
+    def serve_forever(self):
+        """Receive and write case results until shutdown is called."""
+        receive_thread = threading.Thread(target=self._receive)
+        receive_thread.daemon = True
+        receive_thread.start()
+        stream_thread = threading.Thread(target=self._stream_server.serve_forever, kwargs=dict(poll_interval=0.5))
+        stream_thread.daemon = True
+        stream_thread.start()
+        flush_clock = _clock() + self.flush_interval
+        try:
+            while not self._stop_event.is_set():
+                batch = []
+                try:
+                    batch.append(self._queue.get(timeout=0.2))
+                    while len(batch) < self.batch_size:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if batch:
+                    self._write(batch)
+                while not self._dump_queue.empty():
+                    self._dump(self._dump_queue.get())
+                if _clock() >= flush_clock:
+                    self._flush()
+                    flush_clock = _clock() + self.flush_interval
+        finally:
+            self._stop_event.set()
+            self._stream_server.shutdown()
+            with self._connections_condition:
+                for connection in self._connections:
+                    try:
+                        connection.shutdown(socket.SHUT_RDWR)
+                    except (OSError, socket.error):
+                        pass
+                deadline = _clock() + 5
+                while self._connections and _clock() < deadline:
+                    self._connections_condition.wait(deadline - _clock())
+            receive_thread.join()
+            stream_thread.join()
+            self._drain()
+            self._flush()
+            self._stream_server.server_close()
+            self._socket.close()
+            try:
+                if hasattr(self.handler, 'close'):
+                    self.handler.close()
+            except Exception:
+                traceback.print_exc()
+
+    def shutdown(self):
+        """Stop serving, datagrams and frames which are received already are written before serve_forever returns,
+        frames which are not acknowledged yet are sent again by client."""
+        self._stop_event.set()
+
+    def dump(self):
+        """Dump summary of handler, counts of batches and case results.
+
+        :return str: summary.
+        """
+        return '{}\nReceived Batches,Dropped Batches,Failed Batches,Written Case Results\n{},{},{},{}\n'.format(
+            self.handler.dump(), self.received_count, self.dropped_count, self.error_count, self.processed_count)
+
+    def _receive(self):
+        """Receive datagrams into queue, dump requests are put into dump queue."""
+        while not self._stop_event.is_set():
+            try:
+                data, client = self._socket.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except Exception:
+                if not self._stop_event.is_set():
+                    traceback.print_exc()
+                continue
+            if data == DUMP:
+                self._dump_queue.put(client)
+                continue
+            try:
+                self._queue.put_nowait(data)
+                with self._mutex:
+                    self.received_count += 1
+            except queue.Full:
+                with self._mutex:
+                    self.received_count += 1
+                    self.dropped_count += 1
+
+    def handle_stream(self, connection, rfile, wfile):
+        """Read frames from a TCP connection until it is closed, put them into queue and acknowledge each of them,
+        dump is replied in a frame. Connection is shut down once server is stopped, frames which are not acknowledged
+        are sent again by client.
+
+        :param socket.socket connection: connection.
+        :param rfile: file object to read from connection.
+        :param wfile: file object to write to connection.
+        """
+        with self._mutex:
+            if self._stop_event.is_set():
+                return
+            self._connections.add(connection)
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    data = datagram.read_frame(rfile)
+                except ValueError:
+                    with self._mutex:
+                        self.error_count += 1
+                    traceback.print_exc()
+                    return
+                if data is None or self._stop_event.is_set():
+                    return
+                if data == DUMP:
+                    reply = queue.Queue(maxsize=1)
+                    self._dump_queue.put(reply)
+                    while True:
+                        try:
+                            wfile.write(datagram.pack_frame(reply.get(timeout=0.5)))
+                            break
+                        except queue.Empty:
+                            if self._stop_event.is_set():
+                                return
+                    continue
+                with self._mutex:
+                    self.received_count += 1
+                while True:
+                    try:
+                        self._queue.put(data, timeout=0.5)
+                        break
+                    except queue.Full:
+                        if self._stop_event.is_set():
+                            return
+                wfile.write(datagram.ACK)
+        finally:
+            with self._connections_condition:
+                self._connections.discard(connection)
+                self._connections_condition.notify_all()
+
+    def _write(self, batch):
+        """Decode datagrams and write case results into handler.
+
+        :param list batch: datagrams.
+        """
+        case_results, decoded_count = [], 0
+        for data in batch:
+            try:
+                case_results.extend(datagram.decode(data))
+                decoded_count += 1
+            except ValueError:
+                with self._mutex:
+                    self.error_count += 1
+        try:
+            if hasattr(self.handler, 'write_batch'):
+                self.handler.write_batch(case_results)
+            else:
+                for case_result in case_results:
+                    self.handler.write(case_result)
+            self.processed_count += len(case_results)
+        except Exception:
+            with self._mutex:
+                self.error_count += decoded_count
+            traceback.print_exc()
+
+    def _drain(self):
+        """Write datagrams and frames left in queue once receiving is stopped, frames in queue are acknowledged
+        already."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _flush(self):
+        """Flush handler."""
+        try:
+            if hasattr(self.handler, 'flush'):
+                self.handler.flush()
+        except Exception:
+            traceback.print_exc()
+
+    def _dump(self, client):
+        """Send dump to client.
+
+        :param client: address of UDP client, or queue which dump is put into for TCP client.
+        """
+        data = b''
+        try:
+            data = self.dump().encode('utf-8')
+            if isinstance(client, tuple):
+                self._socket.sendto(data, client)
+        except Exception:
+            traceback.print_exc()
+        if not isinstance(client, tuple):
+            client.put(data)
+
 
-def start_udp_report_server(port=8765, handler_name=None, group_minutes=60):
+def start_udp_report_server(port=8765, handler_name=None, group_minutes=60, report_format=resultlog.CSV,
+                            lateness=None, compression_method=None):
     """Start report server.
 
     :param int port: report server port number.
     :param str handler_name: handler_file_path:handler_class_name  or handler_module_name:handler_class_name.
+    :param int group_minutes: group case results with [group_minutes] minutes in summary.
+    :param str report_format: csv or binary, format of report file saved by default handler.
+    :param float lateness: case result which ends more than [lateness] seconds before the latest one of the case is not
+        added to groups in summary, None means case results are added to groups whenever they arrive.
+    :param str compression_method: gzip, zstd or none, compression of rolled report files saved by default handler,
+        None means zstd if zstandard package is installed, else gzip.
     """
-    _socket = None
     try:
         if handler_name:
             fname, hanname = handler_name.split(':')
@@ -187,23 +593,21 @@ def start_udp_report_server(port=8765, handler_name=None, group_minutes=60):
                     mymodule = importlib.import_module(m_name)
             handler = getattr(mymodule, hanname)()
         else:
-            handler = ReportFileHandler()
+            handler = ReportFileHandler(report_format)
         if hasattr(handler, 'group_gap'):
             setattr(handler, 'group_gap', datetime.timedelta(seconds=group_minutes * 60))
-        _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        _socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        _socket.bind(('', port))
-        print('Serving UDP on port:%s...' % port)
-        while True:
-            try:
-                data, client = _socket.recvfrom(65535)
-                if data == b'dump':
-                    _socket.sendto(handler.dump().encode('utf-8'), client)
-                else:
-                    handler.write(pickle.loads(data))
-            except Exception:
-                traceback.print_exc()
+        if lateness is not None and hasattr(handler, 'lateness'):
+            setattr(handler, 'lateness', datetime.timedelta(seconds=lateness))
+        if compression_method is not None and hasattr(handler, 'compression'):
+            if compression_method != compression.NONE:
+                compression.check_method(compression_method)
+            setattr(handler, 'compression', compression_method)
+        server = ReportServer(handler, port)
+        try:
+            signal.signal(signal.SIGTERM, lambda signum, frame: server.shutdown())
+        except ValueError:  # not in main thread
+            pass
+        print('Serving UDP and TCP on port:%s...' % port)
+        server.serve_forever()
     except Exception:
         traceback.print_exc()
-    finally:
-        _socket.close()
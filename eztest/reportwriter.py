@@ -0,0 +1,114 @@
+"""Background report writer, which takes file I/O off the threads running cases.
+
+Rows are put into a bounded queue, a writer thread takes them in batches, writes each batch with one call and flushes
+the file per flush interval. Threads putting rows are blocked while the queue is full, so a slow disk slows testing
+down instead of using up memory. All queued rows are written and flushed once the writer is closed.
+
+usage:
+writer = ReportWriter(open('report.csv', 'w'), batch_size=1000, flush_interval=1.0)
+writer.start()
+writer.put('"0","case1",...\n')
+writer.close()      # Write all queued rows and flush, the file is not closed.
+
+# Rows can also be encoded in writer thread, e.g.: records of binary result log.
+writer = ReportWriter(open('report.ezr', 'wb'), encode=resultlog.Encoder().encode)
+"""
+import threading
+import time
+import traceback
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class ReportWriter(object):
+    """Write rows into report file in a background thread."""
+    def __init__(self, file, batch_size=1000, flush_interval=1.0, queue_size=0, encode=None):
+        """Init.
+
+        :param file: file object.
+        :param int batch_size: rows are written once [batch_size] rows are taken from queue.
+        :param float flush_interval: rows taken from queue are written and flushed at least per [flush_interval] seconds.
+        :param int queue_size: only can have [queue_size] rows waiting in queue, 10 times of [batch_size] if it is 0.
+        :param encode: function which converts a row into str or bytes before it is written, in writer thread.
+        """
+        self.file = file
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.encode = encode
+        self.written_count = 0
+        self._queue = queue.Queue(maxsize=queue_size if queue_size > 0 else self.batch_size * 10)
+        self._thread = None
+
+    def start(self):
+        """Start writer thread."""
+        self._thread = threading.Thread(target=self._write_batches)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, report_msg):
+        """Put a row into queue, wait while the queue is full.
+
+        :param report_msg: a row of report file, or object which will be converted by [encode].
+        """
+        self._queue.put(report_msg)
+
+    def close(self):
+        """Write all queued rows, flush file and stop writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _write(self, batch):
+        """Write a batch of rows into file.
+
+        :param list batch: rows.
+        """
+        try:
+            if self.encode is not None:
+                batch = [self.encode(report_msg) for report_msg in batch]
+            self.file.write(batch[0][:0].join(batch))
+            self.written_count += len(batch)
+        except Exception:
+            traceback.print_exc()
+
+    def _flush(self):
+        """Flush file."""
+        try:
+            self.file.flush()
+        except Exception:
+            traceback.print_exc()
+
+    def _write_batches(self):
+        """Take rows from queue and write them in batches until None is taken."""
+        batch = []
+        flush_clock = _clock() + self.flush_interval
+        is_closed, is_flush_required = False, False
+        while not is_closed:
+            try:
+                if batch or is_flush_required:
+                    report_msg = self._queue.get(timeout=max(flush_clock - _clock(), 0))
+                else:
+                    report_msg = self._queue.get()
+                if report_msg is None:
+                    is_closed = True
+                else:
+                    batch.append(report_msg)
+                    if len(batch) < self.batch_size and _clock() < flush_clock:
+                        continue
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+                batch = []
+                is_flush_required = True
+            if is_closed or _clock() >= flush_clock:
+                if is_flush_required:
+                    self._flush()
+                    is_flush_required = False
+                flush_clock = _clock() + self.flush_interval
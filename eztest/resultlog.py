@@ -0,0 +1,222 @@
+"""Binary result log, a compact alternative of CSV report file.
+
+File starts with 8 bytes header b'EZTRL\\x00\\x00\\x01'(magic and version), followed by records, each of them starts
+with 1 byte record type, numbers are little-endian:
+C: case dictionary record, case index(uint32), length of id(uint16), length of description(uint16), id and
+   description in UTF-8. It is written before the first result of the case.
+S: stage dictionary record, stage index(uint16), length of name(uint16), name in UTF-8. It is written before the first
+   result of the stage.
+R: result record, 35 bytes after record type: case index(uint32), repeat index(uint32), status(uint8, 1 is Pass),
+   starts datetime(int64), ends datetime(int64), time taken in seconds(float64), stage index(uint16, 65535 if no stage).
+   Datetime is microseconds since 1970-01-01 00:00:00 of the local time written in CSV report file, and the minimum
+   int64 if it is None.
+
+Only the columns used by calc are kept, Expected, Received, Output, Log Path and additional columns except "Stage"
+are empty after the binary result log is converted to CSV report file.
+
+usage:
+encoder = Encoder()
+f.write(HEADER)
+f.write(encoder.encode(Record('case1', 'description', 0, True, start_datetime, end_datetime, 0.3, None)))
+
+for record in read_records('report.ezr'):
+    print(record.id, record.status, record.time_taken)
+
+to_csv('report.ezr', 'report.csv')
+"""
+import datetime
+import struct
+import threading
+
+from collections import namedtuple
+
+from . import compression, utility
+
+HEADER = b'EZTRL\x00\x00\x01'
+CASE_RECORD = b'C'
+STAGE_RECORD = b'S'
+RESULT_RECORD = b'R'
+CSV = 'csv'
+BINARY = 'binary'
+FILE_EXTENSION = '.ezr'
+NO_STAGE = 0xFFFF
+NO_DATETIME = -(2 ** 63)
+EPOCH = datetime.datetime(1970, 1, 1)
+CSV_HEADER = ('"Repeat Index","Id","Description","Status","Expected","Received","Output",'
+              '"Starts DateTime","Ends DateTime","E2E Taken","Log Path"')
+
+_case_struct = struct.Struct('<IHH')
+_stage_struct = struct.Struct('<HH')
+_result_struct = struct.Struct('<IIBqqdH')
+
+Record = namedtuple('Record', ['id', 'description', 'repeat_index', 'status', 'start_time', 'end_time',
+                               'time_taken', 'stage'])
+
+
+def to_microseconds(date_time):
+    """Convert datetime to microseconds since 1970-01-01 00:00:00.
+
+    :param datetime.datetime date_time: datetime.
+    :return int: microseconds, the minimum int64 if datetime is None.
+    """
+    if date_time is None:
+        return NO_DATETIME
+    delta = date_time - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_microseconds(microseconds):
+    """Convert microseconds since 1970-01-01 00:00:00 to datetime.
+
+    :param int microseconds: microseconds.
+    :return datetime.datetime: datetime, None if it is the minimum int64.
+    """
+    if microseconds == NO_DATETIME:
+        return None
+    return EPOCH + datetime.timedelta(microseconds=microseconds)
+
+
+def is_result_log(file_path):
+    """Whether file is binary result log.
+
+    :param str file_path: file path.
+    :return bool: True if file starts with header of binary result log, it may be compressed.
+    """
+    with compression.open_file(file_path, 'rb') as f:
+        return f.read(len(HEADER)) == HEADER
+
+
+class Encoder(object):
+    """Encode records into bytes of binary result log, case ids and stages are written into dictionary once."""
+    def __init__(self):
+        self.case_indexes = dict()
+        self.stage_indexes = dict()
+        self._mutex = threading.Lock()
+
+    def encode(self, record):
+        """Encode record, dictionary records are prepended if case id or stage is new.
+
+        :param Record record: record.
+        :return bytes: bytes.
+        """
+        with self._mutex:
+            prefix = b''
+            case_index = self.case_indexes.get(record.id)
+            if case_index is None:
+                case_index = self.case_indexes[record.id] = len(self.case_indexes)
+                id_bytes = str(record.id).encode('utf-8')[:0xFFFF]
+                description = '' if record.description is None else str(record.description)
+                description_bytes = description.encode('utf-8')[:0xFFFF]
+                prefix += CASE_RECORD + _case_struct.pack(case_index, len(id_bytes), len(description_bytes)) + \
+                    id_bytes + description_bytes
+            if record.stage is None:
+                stage_index = NO_STAGE
+            else:
+                stage_index = self.stage_indexes.get(record.stage)
+                if stage_index is None:
+                    stage_index = self.stage_indexes[record.stage] = len(self.stage_indexes)
+                    name_bytes = str(record.stage).encode('utf-8')[:0xFFFF]
+                    prefix += STAGE_RECORD + _stage_struct.pack(stage_index, len(name_bytes)) + name_bytes
+        return prefix + RESULT_RECORD + _result_struct.pack(
+            case_index, record.repeat_index or 0, 1 if record.status else 0,
+            to_microseconds(record.start_time), to_microseconds(record.end_time),
+            float('nan') if record.time_taken is None else record.time_taken, stage_index)
+
+
+def read_records(file_path, position=None):
+    """Read records from binary result log, which may be compressed.
+
+    :param str file_path: file path.
+    :param dict position: resume reading from position of a previous reading of the same file, it is updated once a
+        record is read: {"offset": offset after the last complete record, "cases": {case index: (id, description)},
+        "stages": {stage index: name}}. Reading stops at an incomplete record which is still being written.
+    :return: generator of Record.
+    """
+    if position is None:
+        position = dict()
+    cases = position['cases'] = dict(position.get('cases') or {})
+    stages = position['stages'] = dict(position.get('stages') or {})
+    with compression.open_file(file_path, 'rb') as f:
+        if f.read(len(HEADER)) != HEADER:
+            raise ValueError('Not binary result log: {}'.format(file_path))
+        offset = position['offset'] = position.get('offset') or len(HEADER)
+        compression.skip(f, offset - len(HEADER))
+        while True:
+            record_type = f.read(1)
+            if not record_type:
+                break
+            if record_type == RESULT_RECORD:
+                data = f.read(_result_struct.size)
+                if len(data) < _result_struct.size:
+                    break
+                case_index, repeat_index, status, start_us, end_us, time_taken, stage_index = _result_struct.unpack(data)
+                case_id, description = cases[case_index]
+                offset += 1 + _result_struct.size
+                position['offset'] = offset
+                yield Record(case_id, description, repeat_index, status == 1,
+                             from_microseconds(start_us), from_microseconds(end_us),
+                             None if time_taken != time_taken else time_taken, stages.get(stage_index))
+            elif record_type == CASE_RECORD:
+                data = f.read(_case_struct.size)
+                if len(data) < _case_struct.size:
+                    break
+                case_index, id_length, description_length = _case_struct.unpack(data)
+                data = f.read(id_length + description_length)
+                if len(data) < id_length + description_length:
+                    break
+                cases[case_index] = (data[:id_length].decode('utf-8'), data[id_length:].decode('utf-8'))
+                offset += 1 + _case_struct.size + len(data)
+                position['offset'] = offset
+            elif record_type == STAGE_RECORD:
+                data = f.read(_stage_struct.size)
+                if len(data) < _stage_struct.size:
+                    break
+                stage_index, name_length = _stage_struct.unpack(data)
+                data = f.read(name_length)
+                if len(data) < name_length:
+                    break
+                stages[stage_index] = data.decode('utf-8')
+                offset += 1 + _stage_struct.size + len(data)
+                position['offset'] = offset
+            else:
+                raise ValueError('Unknown record type {!r} in {}'.format(record_type, file_path))
+
+
+def format_record(record, has_stage=False):
+    """Format record as a row of CSV report file.
+
+    :param Record record: record.
+    :param bool has_stage: whether to append "Stage" column.
+    :return str: a row of CSV report file.
+    """
+    report_msg = '"%s","%s","%s","%s","","","","%s","%s","%s",""' % (
+        record.repeat_index, record.id,
+        utility.csv_format(record.description),
+        'Pass' if record.status else 'Fail',
+        utility.date2str(record.start_time),
+        utility.date2str(record.end_time),
+        record.time_taken)
+    if has_stage:
+        report_msg += ',"%s"' % utility.csv_format(record.stage)
+    return report_msg + '\n'
+
+
+def to_csv(file_path, csv_file_path):
+    """Convert binary result log to CSV report file.
+
+    :param str file_path: binary result log path.
+    :param str csv_file_path: CSV report file path.
+    :return int: count of records.
+    """
+    has_stage = False
+    for record in read_records(file_path):
+        if record.stage is not None:
+            has_stage = True
+            break
+    count = 0
+    with open(csv_file_path, 'w') as f:
+        f.write(CSV_HEADER + (',"Stage"' if has_stage else '') + '\n')
+        for record in read_records(file_path):
+            f.write(format_record(record, has_stage))
+            count += 1
+    return count
@@ -0,0 +1,91 @@
+"""Rolling window: a ring buffer of per-second buckets of case results, which gets throughput, failure rate and
+percentiles of time taken over the last seconds in constant memory.
+
+Each bucket keeps count, failed count and a latency histogram(see histogram) of case results which end in the same
+second, bucket of the second which is [size] seconds older is reused, so case results which end more than [size]
+seconds before the latest one are ignored. Seconds are taken from end time of case results, so rolling windows do not
+depend on clock of report server, and case results can be recorded in any order.
+
+usage:
+window = RollingWindow(size=300)
+window.record(end_time, 0.3, True)
+count, failed_count, histogram = window.get(10)    # over the last 10 seconds until the latest second
+count, failed_count, histogram = window.get(10, end_second)     # over 10 seconds until end_second
+"""
+from . import histogram, resultlog
+
+WINDOWS = (10, 60, 300)
+
+
+def to_second(date_time):
+    """Convert datetime to seconds since 1970-01-01 00:00:00.
+
+    :param datetime.datetime date_time: datetime.
+    :return int: seconds.
+    """
+    delta = date_time - resultlog.EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+class RollingWindow(object):
+    """Per-second buckets of the latest [size] seconds."""
+    __slots__ = ('size', 'latest_second', 'ignored_count', '_seconds', '_counts', '_failed_counts', '_histograms')
+
+    def __init__(self, size=max(WINDOWS)):
+        """Init.
+
+        :param int size: count of buckets, the longest window in seconds.
+        """
+        self.size = size
+        self.latest_second = None
+        self.ignored_count = 0
+        self._seconds = [None] * size
+        self._counts = [0] * size
+        self._failed_counts = [0] * size
+        self._histograms = [None] * size
+
+    def record(self, end_time, time_taken, is_pass):
+        """Record a case result into bucket of its end second.
+
+        :param datetime.datetime end_time: end datetime.
+        :param float time_taken: time taken in seconds.
+        :param bool is_pass: is case passed.
+        :return bool: False if it ends [size] seconds before the latest one and is ignored.
+        """
+        second = to_second(end_time)
+        if self.latest_second is None or second > self.latest_second:
+            self.latest_second = second
+        elif second <= self.latest_second - self.size:
+            self.ignored_count += 1
+            return False
+        index = second % self.size
+        if self._seconds[index] != second:
+            self._seconds[index] = second
+            self._counts[index] = 0
+            self._failed_counts[index] = 0
+            self._histograms[index] = histogram.Histogram()
+        self._counts[index] += 1
+        if not is_pass:
+            self._failed_counts[index] += 1
+        self._histograms[index].record(time_taken)
+        return True
+
+    def get(self, seconds, end_second=None):
+        """Get case results of a window.
+
+        :param int seconds: length of window in seconds, only the latest [size] seconds are kept.
+        :param int end_second: the last second of window, the latest second if it is None.
+        :return tuple: count, failed count and merged histogram of case results.
+        """
+        count, failed_count, merged = 0, 0, histogram.Histogram()
+        if self.latest_second is None:
+            return count, failed_count, merged
+        if end_second is None:
+            end_second = self.latest_second
+        start_second = max(end_second - seconds, self.latest_second - self.size)
+        for index, second in enumerate(self._seconds):
+            if second is not None and start_second < second <= end_second:
+                count += self._counts[index]
+                failed_count += self._failed_counts[index]
+                merged.merge(self._histograms[index])
+        return count, failed_count, merged
@@ -0,0 +1,73 @@
+import datetime
+import time
+import unittest
+
+import eztest
+from eztest.agent import Agent, format_statuses, DEFAULT_BIND, IDLE, WAITING, RUNNING, FINISHED
+from eztest.utility import SysStandardOutput
+
+
+def _run_until_stopped(args, report_queue, cancel_event, summary_queue, progress_interval):
+    summary_queue.put((1, 0, None))
+    cancel_event.wait(10)
+    summary_queue.put((2, 1, datetime.datetime.now()))
+
+
+def _wait_status(ag, state, timeout=10):
+    deadline = time.time() + timeout
+    status = ag.handle(dict(command='status'))
+    while status['state'] != state and time.time() < deadline:
+        time.sleep(0.05)
+        status = ag.handle(dict(command='status'))
+    return status
+
+
+class TestAgent(unittest.TestCase):
+    def test_handle(self):
+        ag = Agent(_run_until_stopped)
+        self.assertEqual(ag.handle(dict(command='status')), dict(state=IDLE, finished_count=0, failed_count=0))
+        self.assertEqual(ag.handle(dict(command='restart')), dict(error='ValueError: Unknown command: restart'))
+        self.assertEqual(ag.handle(dict(command='start')), dict(error="KeyError: 'args'"))
+
+        with SysStandardOutput():
+            status = ag.handle(dict(command='start', args=dict(mode='concurrency'), starts_in=0, duration=60))
+        self.assertIn(status['state'], [WAITING, RUNNING])
+        self.assertEqual(ag.handle(dict(command='start', args={}, starts_in=0)),
+                         dict(error='RuntimeError: Testing is running.'))
+        deadline = time.time() + 10
+        while ag.handle(dict(command='status'))['finished_count'] == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(ag.handle(dict(command='status')), dict(state=RUNNING, finished_count=1, failed_count=0))
+
+        time.sleep(0.2)
+        ag.handle(dict(command='stop'))
+        status = _wait_status(ag, FINISHED)
+        dtstatus = datetime.datetime.now()
+        time.sleep(0.3)
+        self.assertEqual(ag.handle(dict(command='status')), status)
+        self.assertEqual((status['finished_count'], status['failed_count']), (2, 1))
+        self.assertLess(ag.finished_time, dtstatus)
+        self.assertGreater(status['seconds'], 0.2)
+        self.assertEqual(status['throughput'], 2 / status['seconds'])
+
+    def test_format_statuses(self):
+        agents = [('node1', 8766), ('node2', 8766), ('node3', 8766)]
+        statuses = [dict(state=FINISHED, finished_count=10, failed_count=1, seconds=5.0, throughput=2.0),
+                    dict(state=RUNNING, finished_count=6, failed_count=0),
+                    dict(error='ConnectionRefusedError: refused')]
+        self.assertEqual(format_statuses(agents, statuses).splitlines(), [
+            'Agent,State,Finished Count,Failed Count,Seconds,Throughput',
+            'node1:8766,finished,10,1,5.0,2.0',
+            'node2:8766,running,6,0,,',
+            'node3:8766,ConnectionRefusedError: refused,,,,',
+            'Total,,16,1,,2.0',
+        ])
+
+    def test_bind(self):
+        parser, _ = eztest._define_parser()
+        self.assertEqual(parser.parse_args(['agent']).bind, DEFAULT_BIND)
+        self.assertEqual(parser.parse_args(['agent', '--bind', '0.0.0.0']).bind, '0.0.0.0')
+
+
+if __name__ == '__main__':
+    unittest.main()
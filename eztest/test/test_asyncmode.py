@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from eztest import testcase, utility
+from eztest._asyncmode import AsyncTest
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class _Case(testcase.BaseCase):
+    def __init__(self):
+        super(_Case, self).__init__()
+        self.id = 'Case1'
+        self.description = 'description'
+
+    def run(self):
+        return True
+
+
+class _AsyncCase(_Case):
+    running_count = 0
+    max_running_count = 0
+
+    async def run(self):
+        _AsyncCase.running_count += 1
+        _AsyncCase.max_running_count = max(_AsyncCase.max_running_count, _AsyncCase.running_count)
+        try:
+            await asyncio.sleep(0.05)
+        finally:
+            _AsyncCase.running_count -= 1
+        return True
+
+
+class _SlowQueue(queue.Queue):
+    def put(self, item, block=True, timeout=None):
+        time.sleep(0.2)
+        queue.Queue.put(self, item, block, timeout)
+
+
+def _run_test(test, seconds, report_queue=None):
+    test.report_queue = report_queue or queue.Queue()
+    timer = threading.Timer(seconds, test.cancel)
+    with utility.SysStandardOutput():
+        timer.start()
+        try:
+            test.run()
+        finally:
+            timer.cancel()
+    rows = []
+    while not test.report_queue.empty():
+        rows.append(test.report_queue.get_nowait())
+    return rows
+
+
+class TestAsyncTest(unittest.TestCase):
+    def test_coroutine_case(self):
+        _AsyncCase.max_running_count = 0
+        test = AsyncTest()
+        test.cases = [_AsyncCase()]
+        test.thread_count = 3
+        rows = _run_test(test, 0.3)
+
+        self.assertTrue(test.wait(0))
+        self.assertEqual(test.worker_count, 3)
+        self.assertEqual(_AsyncCase.max_running_count, 3)
+        self.assertEqual(test.round_finished, test.round_started)
+        self.assertGreaterEqual(test.case_finished_count, 9)
+        self.assertEqual(test.case_failed_count, 0)
+        self.assertEqual(len(rows), test.case_finished_count)
+
+    def test_case(self):
+        test = AsyncTest()
+        test.cases = [_Case()]
+        test.thread_count = 2
+        test.interval_seconds = 0.1
+        rows = _run_test(test, 0.25)
+
+        self.assertEqual(test.round_finished, test.round_started)
+        self.assertGreaterEqual(test.case_finished_count, 4)
+        self.assertEqual(len(rows), test.case_finished_count)
+        self.assertTrue(all(row.split(',')[3] == '"Pass"' for row in rows))
+
+    def test_slow_report(self):
+        test = AsyncTest()
+        test.cases = [_Case()]
+        test.thread_count = 3
+        rows = _run_test(test, 0.5, _SlowQueue())
+
+        self.assertGreaterEqual(test.case_finished_count, 6)
+        self.assertEqual(len(rows), test.case_finished_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
+import datetime
+import json
 import os
+import shutil
+import tempfile
 import unittest
 
-from eztest import calc_report, utility
+from eztest import calc_report, compression, resultlog, utility
 
 
 class TestCalcReport(unittest.TestCase):
@@ -9,38 +13,46 @@ class TestCalcReport(unittest.TestCase):
         with utility.SysStandardOutput() as output:
             calc_report.calc('reports')
 
-        self.assertIn('Case1,135,7539,1.7907%,3.69,26.583,17.76997945964989', output)
-        self.assertIn('Case2,1,2,50.0000%,16.461,26.072,21.2665', output)
-        self.assertIn('Case3,1,2,50.0000%,16.461,26.072,21.2665', output)
+        self.assertIn('Case1,135,7539,1.7907%,3.69,26.583,15.955680594243269,2.707111577609843,16.465919,17.989631,'
+                      '18.497535,19.464191,26.443775', output)
+        self.assertIn('Case2,1,2,50.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072', output)
+        self.assertIn('Case3,1,2,50.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072', output)
 
-        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:32:00,72,3938,1.8283%,3.72,26.583,16.959928979894286\n'
-                      'Case1,2,2018-06-18 11:32:00,2018-06-18 12:32:00,63,3600,1.7500%,3.69,25.363,17.76997945964989\n'
-                      'Case1,3,2018-06-18 12:32:00,2018-06-18 13:32:00,0,1,0.0000%,16.491,16.491,16.491', output)
-        self.assertIn('Case2,1,2018-06-18 10:32:00,2018-06-18 11:32:00,0,1,0.0000%,26.072,26.072,26.072\n'
-                      'Case2,2,2018-06-18 11:32:00,2018-06-18 12:32:00,1,1,100.0000%,16.461,16.461,16.461', output)
-        self.assertIn('Case3,1,2018-06-18 10:32:00,2018-06-18 11:32:00,0,1,0.0000%,26.072,26.072,26.072\n'
-                      'Case3,2,2018-06-18 11:32:00,2018-06-18 12:32:00,1,1,100.0000%,16.461,16.461,16.461', output)
+        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:32:00,72,3938,1.8283%,3.72,26.583,15.833573895378365,'
+                      '2.6446341273599385,16.252927,17.793023,18.251775,19.103743,26.443775\n'
+                      'Case1,2,2018-06-18 11:32:00,2018-06-18 12:32:00,63,3600,1.7500%,3.69,25.363,16.089103055555555,'
+                      '2.7680415681471735,16.678911,18.186239,18.612223,19.464191,25.363\n'
+                      'Case1,3,2018-06-18 12:32:00,2018-06-18 13:32:00,0,1,0.0000%,16.491,16.491,16.491,0.0,16.491', output)
+        self.assertIn('Case2,1,2018-06-18 10:32:00,2018-06-18 11:32:00,0,1,0.0000%,26.072,26.072,26.072,0.0,26.072,26.072,26.072,26.072,26.072\n'
+                      'Case2,2,2018-06-18 11:32:00,2018-06-18 12:32:00,1,1,100.0000%,16.461,16.461,16.461,0.0,16.461,16.461,16.461,16.461,16.461', output)
+        self.assertIn('Case3,1,2018-06-18 10:32:00,2018-06-18 11:32:00,0,1,0.0000%,26.072,26.072,26.072,0.0,26.072,26.072,26.072,26.072,26.072\n'
+                      'Case3,2,2018-06-18 11:32:00,2018-06-18 12:32:00,1,1,100.0000%,16.461,16.461,16.461,0.0,16.461,16.461,16.461,16.461,16.461', output)
 
         del output
 
         with utility.SysStandardOutput() as output:
             calc_report.calc('reports', group_minutes=30)
 
-        self.assertIn('Case1,135,7539,1.7907%,3.69,26.583,17.76997945964989', output)
-        self.assertIn('Case2,1,2,50.0000%,16.461,26.072,21.2665', output)
-        self.assertIn('Case3,1,2,50.0000%,16.461,26.072,21.2665', output)
-
-        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:02:00,30,1938,1.5480%,3.83,26.583,16.469082024050984\n'
-                      'Case1,2,2018-06-18 11:02:00,2018-06-18 11:32:00,42,2000,2.1000%,3.72,18.932,16.959928979894286\n'
-                      'Case1,3,2018-06-18 11:32:00,2018-06-18 12:02:00,38,1932,1.9669%,3.69,25.363,16.23456723705196\n'
-                      'Case1,4,2018-06-18 12:02:00,2018-06-18 12:32:00,25,1668,1.4988%,3.72,20.412,17.76997945964989\n'
-                      'Case1,5,2018-06-18 12:32:00,2018-06-18 13:02:00,0,1,0.0000%,16.491,16.491,16.491', output)
-        self.assertIn('Case2,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,1,0.0000%,26.072,26.072,26.072\n'
-                      'Case2,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,\n'
-                      'Case2,3,2018-06-18 11:32:00,2018-06-18 12:02:00,1,1,100.0000%,16.461,16.461,16.461', output)
-        self.assertIn('Case3,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,1,0.0000%,26.072,26.072,26.072\n'
-                      'Case3,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,\n'
-                      'Case3,3,2018-06-18 11:32:00,2018-06-18 12:02:00,1,1,100.0000%,16.461,16.461,16.461', output)
+        self.assertIn('Case1,135,7539,1.7907%,3.69,26.583,15.955680594243269,2.707111577609843,16.465919,17.989631,'
+                      '18.497535,19.464191,26.443775', output)
+        self.assertIn('Case2,1,2,50.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072', output)
+        self.assertIn('Case3,1,2,50.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072', output)
+
+        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:02:00,30,1938,1.5480%,3.83,26.583,15.971461300309597,'
+                      '2.903636211637802,16.334847,18.104319,18.694143,26.066943,26.583\n'
+                      'Case1,2,2018-06-18 11:02:00,2018-06-18 11:32:00,42,2000,2.1000%,3.72,18.932,15.699961,2.359098888448511,'
+                      '16.195583,17.596415,17.842175,18.251775,18.710527\n'
+                      'Case1,3,2018-06-18 11:32:00,2018-06-18 12:02:00,38,1932,1.9669%,3.69,25.363,16.05983436853002,'
+                      '2.7359523524439617,16.596991,18.137087,18.530303,23.822335,25.363\n'
+                      'Case1,4,2018-06-18 12:02:00,2018-06-18 12:32:00,25,1668,1.4988%,3.72,20.412,16.123004196642686,'
+                      '2.8043690028559065,16.769023,18.268159,18.759679,19.300351,20.412\n'
+                      'Case1,5,2018-06-18 12:32:00,2018-06-18 13:02:00,0,1,0.0000%,16.491,16.491,16.491,0.0,16.491', output)
+        self.assertIn('Case2,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,1,0.0000%,26.072,26.072,26.072,0.0,26.072,26.072,26.072,26.072,26.072\n'
+                      'Case2,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,,,,,,,\n'
+                      'Case2,3,2018-06-18 11:32:00,2018-06-18 12:02:00,1,1,100.0000%,16.461,16.461,16.461,0.0,16.461,16.461,16.461,16.461,16.461', output)
+        self.assertIn('Case3,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,1,0.0000%,26.072,26.072,26.072,0.0,26.072,26.072,26.072,26.072,26.072\n'
+                      'Case3,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,,,,,,,\n'
+                      'Case3,3,2018-06-18 11:32:00,2018-06-18 12:02:00,1,1,100.0000%,16.461,16.461,16.461,0.0,16.461,16.461,16.461,16.461,16.461', output)
 
         del output
 
@@ -48,33 +60,251 @@ class TestCalcReport(unittest.TestCase):
         with utility.SysStandardOutput() as output:
             calc_report.calc(os.path.join('reports', 'report1.csv'))
 
-        self.assertIn('Case1,68,3835,1.7731%,3.69,26.583,16.610214623718797', output)
-        self.assertIn('Case2,1,2,50.0000%,16.461,26.072,21.2665', output)
+        self.assertIn('Case1,68,3835,1.7731%,3.69,26.583,15.966938722294655', output)
+        self.assertIn('Case2,1,2,50.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072', output)
 
-        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:32:00,36,1969,1.8283%,3.72,26.583,16.959928979894286\n'
-                      'Case1,2,2018-06-18 11:32:00,2018-06-18 12:32:00,32,1865,1.7158%,3.69,25.363,16.72942924743759\n'
-                      'Case1,3,2018-06-18 12:32:00,2018-06-18 13:32:00,0,1,0.0000%,16.491,16.491,16.491', output)
-        self.assertIn('Case2,1,2018-06-18 10:32:00,2018-06-18 11:32:00,0,1,0.0000%,26.072,26.072,26.072\n'
-                      'Case2,2,2018-06-18 11:32:00,2018-06-18 12:32:00,1,1,100.0000%,16.461,16.461,16.461', output)
+        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:32:00,36,1969,1.8283%,3.72,26.583,15.833573895378365,'
+                      '2.6446341273599385,16.252927,17.793023,18.251775,19.103743,26.443775\n'
+                      'Case1,2,2018-06-18 11:32:00,2018-06-18 12:32:00,32,1865,1.7158%,3.69,25.363,16.107459517426275,'
+                      '2.741176125065527,16.687103,18.169855,18.612223,19.464191,25.363\n'
+                      'Case1,3,2018-06-18 12:32:00,2018-06-18 13:32:00,0,1,0.0000%,16.491,16.491,16.491,0.0,16.491', output)
+        self.assertIn('Case2,1,2018-06-18 10:32:00,2018-06-18 11:32:00,0,1,0.0000%,26.072,26.072,26.072,0.0,26.072,26.072,26.072,26.072,26.072\n'
+                      'Case2,2,2018-06-18 11:32:00,2018-06-18 12:32:00,1,1,100.0000%,16.461,16.461,16.461,0.0,16.461,16.461,16.461,16.461,16.461', output)
 
         del output
 
         with utility.SysStandardOutput() as output:
             calc_report.calc(os.path.join('reports', 'report2.csv'), group_minutes=30)
 
-        self.assertIn('Case1,67,3704,1.8089%,3.69,26.583,17.76997945964989', output)
-        self.assertIn('Case3,1,2,50.0000%,16.461,26.072,21.2665', output)
+        self.assertIn('Case1,67,3704,1.8089%,3.69,26.583,15.944024298056155', output)
+        self.assertIn('Case3,1,2,50.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072', output)
 
-        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:02:00,15,969,1.5480%,3.83,26.583,16.469082024050984\n'
-                      'Case1,2,2018-06-18 11:02:00,2018-06-18 11:32:00,21,1000,2.1000%,3.72,18.932,16.959928979894286\n'
-                      'Case1,3,2018-06-18 11:32:00,2018-06-18 12:02:00,19,966,1.9669%,3.69,25.363,16.23456723705196\n'
-                      'Case1,4,2018-06-18 12:02:00,2018-06-18 12:32:00,12,769,1.5605%,3.72,20.412,17.76997945964989', output)
-        self.assertIn('Case3,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,1,0.0000%,26.072,26.072,26.072\n'
-                      'Case3,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,\n'
-                      'Case3,3,2018-06-18 11:32:00,2018-06-18 12:02:00,1,1,100.0000%,16.461,16.461,16.461', output)
+        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 11:02:00,15,969,1.5480%,3.83,26.583,15.971461300309597,'
+                      '2.903636211637802,16.334847,18.104319,18.694143,26.066943,26.583\n'
+                      'Case1,2,2018-06-18 11:02:00,2018-06-18 11:32:00,21,1000,2.1000%,3.72,18.932,15.699961,2.359098888448511,'
+                      '16.195583,17.596415,17.842175,18.251775,18.710527\n'
+                      'Case1,3,2018-06-18 11:32:00,2018-06-18 12:02:00,19,966,1.9669%,3.69,25.363,16.05983436853002,'
+                      '2.7359523524439617,16.596991,18.137087,18.530303,23.822335,25.363\n'
+                      'Case1,4,2018-06-18 12:02:00,2018-06-18 12:32:00,12,769,1.5605%,3.72,20.412,16.0813511053316,'
+                      '2.870699788090707,16.752639,18.284543,18.808831,19.300351,20.412', output)
+        self.assertIn('Case3,1,2018-06-18 10:32:00,2018-06-18 11:02:00,0,1,0.0000%,26.072,26.072,26.072,0.0,26.072,26.072,26.072,26.072,26.072\n'
+                      'Case3,2,2018-06-18 11:02:00,2018-06-18 11:32:00,0,0,0.0000%,,,,,,,,,\n'
+                      'Case3,3,2018-06-18 11:32:00,2018-06-18 12:02:00,1,1,100.0000%,16.461,16.461,16.461,0.0,16.461,16.461,16.461,16.461,16.461', output)
 
         del output
 
+    def test_stage_summary(self):
+        fd, file_path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write('"Repeat Index","Id","Description","Status","Expected","Received","Output",'
+                    '"Starts DateTime","Ends DateTime","E2E Taken","Log Path","Stage"\n'
+                    '"0","Case1","Case1","Pass","","","","2018-06-18 10:32:00.000000","2018-06-18 10:32:01.000000","1.0","","up"\n'
+                    '"0","Case1","Case1","Fail","","","line1\nline2","2018-06-18 10:32:01.000000","2018-06-18 10:32:03.000000","2.0","","steady"\n'
+                    '"1","Case1","Case1","Pass","","","","2018-06-18 10:32:03.000000","2018-06-18 10:32:07.000000","4.0","","steady"\n')
+        try:
+            with utility.SysStandardOutput() as output:
+                calc_report.calc(file_path)
+        finally:
+            os.remove(file_path)
+
+        self.assertIn('Case1,1,3,33.3333%,1.0,4.0,2.3333333333333335,1.2472191289246473,2.000895,4.0,4.0,4.0,4.0', output)
+        self.assertIn('Stage,Case Id,Fail Count,Total Count,Failure Rate,Minimum Time Taken,Maximum Time Taken,Average Time Taken,'
+                      'Standard Deviation,P50,P90,P95,P99,P99.9\n'
+                      'up,Case1,0,1,0.0000%,1.0,1.0,1.0,0.0,1.0,1.0,1.0,1.0,1.0\n'
+                      'steady,Case1,1,2,50.0000%,2.0,4.0,3.0,1.0,2.000895,4.0,4.0,4.0,4.0', output)
+
+        del output
+
+    def test_processes(self):
+        with utility.SysStandardOutput() as output:
+            calc_report.calc('reports', group_minutes=30)
+        with utility.SysStandardOutput() as output2:
+            calc_report.calc('reports', group_minutes=30, processes=2)
+
+        self.assertIn('Case3,1,2,50.0000%,16.461,26.072,21.2665,4.8055,16.465919,26.072,26.072,26.072,26.072', output2)
+        self.assertEqual(output2.output, output.output)
+
+        del output, output2
+
+    def test_group_summary(self):
+        case_summary, start_times, group_summary = dict(), dict(), calc_report.GroupSummary()
+        group_gap = calc_report.datetime.timedelta(seconds=60)
+        start = calc_report.datetime.datetime(2018, 6, 18, 10, 32, 10)
+        for case_id, minutes in [('Case1', 0), ('Case10', 0), ('Case1', 3), ('Case10', 1), ('Case1_x', 0)]:
+            start_date = start + calc_report.datetime.timedelta(minutes=minutes)
+            calc_report.analyze_case(case_id, True, start_date, start_date + calc_report.datetime.timedelta(seconds=1),
+                                     1.0, case_summary, start_times, group_summary, group_gap)
+
+        self.assertEqual(sorted(group_summary), [('Case1', 0), ('Case1', 3), ('Case10', 0), ('Case10', 1),
+                                                 ('Case1_x', 0)])
+        self.assertEqual(calc_report.get_start_time(group_summary, 'Case1_x'), start.replace(second=0))
+        output = calc_report.output_summary(case_summary, group_summary, group_gap)
+        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 10:33:00,0,1,0.0000%,1.0,1.0,1.0,0.0,1.0,1.0,1.0,1.0,1.0\n'
+                      'Case1,2,2018-06-18 10:33:00,2018-06-18 10:34:00,0,0,0.0000%,,,,,,,,,\n'
+                      'Case1,3,2018-06-18 10:34:00,2018-06-18 10:35:00,0,0,0.0000%,,,,,,,,,\n'
+                      'Case1,4,2018-06-18 10:35:00,2018-06-18 10:36:00,0,1,0.0000%,1.0', output)
+        self.assertEqual(output.count('\nCase10,'), 3)
+
+    def test_out_of_order(self):
+        rows = ['"{}","Case1","d","{}","","","","2018-06-18 10:{:02d}:00.000000","2018-06-18 10:{:02d}:30.000000",'
+                '"30.0","",""\n'.format(i, 'Fail' if i % 3 else 'Pass', i * 7 % 60, i * 7 % 60) for i in range(1, 20)]
+        outputs = []
+        for content in [rows, rows[:1] + sorted(rows[1:], reverse=True)]:
+            fd, file_path = tempfile.mkstemp(suffix='.csv')
+            with os.fdopen(fd, 'w') as f:
+                f.write('"Repeat Index","Id","Description","Status","Expected","Received","Output",'
+                        '"Starts DateTime","Ends DateTime","E2E Taken","Log Path"\n' + ''.join(content))
+            try:
+                with utility.SysStandardOutput() as output:
+                    calc_report.calc(file_path, group_minutes=15)
+            finally:
+                os.remove(file_path)
+            outputs.append(output.output.split('\n', 1)[1])
+
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn('Case1,1,2018-06-18 09:52:00,2018-06-18 10:07:00,0,2,0.0000%', outputs[0])
+        self.assertIn('Case1,2,2018-06-18 10:07:00,2018-06-18 10:22:00,5,6,83.3333%', outputs[0])
+
+    def test_analyze_file(self):
+        header = ('"Repeat Index","Id","Description","Status","Expected","Received","Output",'
+                  '"Starts DateTime","Ends DateTime","E2E Taken","Log Path","Stage"\n')
+        file_paths = []
+        for content in [
+            '"0","Case1_x","d","Pass","","","","2018-06-18 10:31:10.000000","2018-06-18 10:31:11.000000","1.0","","up"\n'
+            '"0","Case1","d","Fail","","","line1\n"1","Case9","d","Pass"\nline3","2018-06-18 10:32:00.000000",'
+            '"2018-06-18 10:32:02.000000","2.0","","up"\n'
+            '"0","Case2","d","Pass","","","","2018-06-18 10:33:00.000000","2018-06-18 10:36:30.000000","210.0","",""\n'
+            '"1","Case1","d","Pass","","","","2018-06-18 10:31:00.000000","2018-06-18 10:31:00.500000","0.5","","up"\n'
+            '"0","Case2","d","Pass","","","","2018-06-18 10:34:00.000000","2018-06-18 10:34:04.000000","4.0","",'
+            '"2018-06-18 10:00:00.000000","2018-06-18 10:00:00.000000","9.0"\n',
+            '"0","Case2","d","Fail","","","","2018-06-18 10:36:00.000000","2018-06-18 10:36:03.000000","3.0","","steady"\n'
+            '"0","Case1","d","Pass","","","","2018-06-18 10:40:00.000000","2018-06-18 10:40:07.000000","7.0","","steady"\n'
+        ]:
+            fd, file_path = tempfile.mkstemp(suffix='.csv')
+            with os.fdopen(fd, 'w') as f:
+                f.write(header + content)
+            file_paths.append(file_path)
+
+        numpy = calc_report.numpy
+        try:
+            for numpy_module in {numpy, None}:
+                calc_report.numpy = numpy_module
+                group_gap = calc_report.datetime.timedelta(seconds=60)
+                expected = [dict(), calc_report.GroupSummary(), calc_report.OrderedDict()]
+                actual = [dict(), calc_report.GroupSummary(), calc_report.OrderedDict()]
+                for file_path in file_paths:
+                    calc_report.analyze_lines(file_path, expected[0], expected[1], group_gap, expected[2])
+                    self.assertTrue(calc_report.analyze_file(file_path, actual[0], actual[1], group_gap, actual[2]))
+                self.assertEqual(actual[0], expected[0])
+                self.assertEqual(actual[1], expected[1])
+                self.assertEqual(actual[1].start_times, expected[1].start_times)
+                self.assertEqual(list(actual[2].items()), list(expected[2].items()))
+        finally:
+            calc_report.numpy = numpy
+            for file_path in file_paths:
+                os.remove(file_path)
+
+        fd, file_path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(header + '"0","Case1","","Pass","","","","2018-06-18 10:31:10.000000",'
+                             '"2018-06-18 10:31:11.000000","1.0","","up"\n')
+        try:
+            case_summary = dict()
+            self.assertFalse(calc_report.analyze_file(file_path, case_summary, calc_report.GroupSummary(),
+                                                      calc_report.datetime.timedelta(seconds=60)))
+            self.assertEqual(case_summary, dict())
+        finally:
+            os.remove(file_path)
+
+    def test_analyze_file_error(self):
+        def analyze_rows(*args):
+            raise RuntimeError('merge failed')
+
+        analyze_rows_function = calc_report.analyze_rows
+        calc_report.analyze_rows = analyze_rows
+        try:
+            with self.assertRaises(RuntimeError):
+                calc_report.analyze_file('', dict(), calc_report.GroupSummary(),
+                                         calc_report.datetime.timedelta(seconds=60), rows=(dict(), dict()))
+        finally:
+            calc_report.analyze_rows = analyze_rows_function
+
+    def _calc(self, file_paths, state_path=None):
+        with utility.SysStandardOutput() as output:
+            calc_report.calc(file_paths, group_minutes=15, state_path=state_path)
+        return output.output[output.output.find('Case Id'):]
+
+    def test_state(self):
+        header = ('"Repeat Index","Id","Description","Status","Expected","Received","Output",'
+                  '"Starts DateTime","Ends DateTime","E2E Taken","Log Path","Stage"\n')
+        rows = ['"{}","Case{}","d","{}","","","{}","2018-06-18 10:{:02d}:00.000000","2018-06-18 10:{:02d}:30.000000",'
+                '"{}.0","","s{}"\n'.format(i, i % 2, 'Fail' if i % 3 == 0 else 'Pass', 'line1\nline2' if i % 4 == 0 else '',
+                                           i, i, i % 7 + 1, i // 20) for i in range(60)]
+        content = (header + ''.join(rows)).encode('utf-8')
+        folder = tempfile.mkdtemp()
+        report_folder = os.path.join(folder, 'reports')
+        os.mkdir(report_folder)
+        file_path = os.path.join(report_folder, 'report.csv')
+        expected_path = os.path.join(folder, 'expected.csv')
+        state_path = os.path.join(folder, 'state.json')
+        try:
+            # Report file is written while it is calculated, rows and lines of Output are cut in the middle.
+            for size in [len(header) - 10, len(header) + 5, content.index(b'line2') + 2,
+                         content.index(b'line2', len(header) + len(''.join(rows[:30]))), len(content)]:
+                with open(file_path, 'wb') as f:
+                    f.write(content[:size])
+                with open(expected_path, 'w') as f:
+                    f.write(header + ''.join(row for i, row in enumerate(rows)
+                                             if len(header) + len(''.join(rows[:i + 1])) <= size))
+                self.assertEqual(self._calc(report_folder, state_path), self._calc(expected_path))
+
+            # Report file is rolled over and compressed.
+            os.rename(file_path, file_path + '.1')
+            compression.compress_file(file_path + '.1')
+            with open(file_path, 'w') as f:
+                f.write(header + rows[59].replace('"59"', '"60"') + rows[1].replace('"1"', '"61"'))
+            output = self._calc([file_path + '.1.gz', file_path])
+            self.assertEqual(self._calc(report_folder, state_path), output)
+
+            # Bytes which are read already are not read again.
+            with open(file_path + '.1', 'wb') as f:
+                f.write(content.replace(rows[50].encode('utf-8'), rows[50].replace('Pass', 'Fail').encode('utf-8')))
+            compression.compress_file(file_path + '.1')
+            self.assertNotEqual(self._calc([file_path + '.1.gz', file_path]), output)
+            self.assertEqual(self._calc(report_folder, state_path), output)
+            with open(state_path) as f:
+                files = json.load(f)['files']
+            self.assertEqual(sorted((f['path'], f['position']['offset']) for f in files),
+                             [(os.path.abspath(file_path), os.path.getsize(file_path)),
+                              (os.path.abspath(file_path + '.1.gz'), len(content))])
+        finally:
+            shutil.rmtree(folder)
+
+    def test_state_of_result_log(self):
+        encoder = resultlog.Encoder()
+        start = datetime.datetime(2018, 6, 18, 10, 32)
+        content = resultlog.HEADER
+        sizes = []
+        for i in range(30):
+            start_time = start + datetime.timedelta(minutes=i)
+            content += encoder.encode(resultlog.Record('Case{}'.format(i % 3), 'd', i, i % 4 != 0, start_time,
+                                                       start_time + datetime.timedelta(seconds=i), float(i),
+                                                       'stage{}'.format(i // 10)))
+            sizes.append(len(content))
+        folder = tempfile.mkdtemp()
+        file_path = os.path.join(folder, 'report.ezr')
+        expected_path = os.path.join(folder, 'expected.ezr')
+        state_path = os.path.join(folder, 'state.json')
+        try:
+            for size in [3, sizes[0] - 1, sizes[9] + 20, sizes[10] - 3, len(content)]:
+                with open(file_path, 'wb') as f:
+                    f.write(content[:size])
+                with open(expected_path, 'wb') as f:
+                    f.write(content[:max([len(resultlog.HEADER)] + [s for s in sizes if s <= size])])
+                self.assertEqual(self._calc(file_path, state_path), self._calc(expected_path))
+        finally:
+            shutil.rmtree(folder)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,57 @@
+import datetime
+import pickle
+import unittest
+
+from eztest import datagram
+
+
+def _case_result(case_id, index, **kwargs):
+    start_time = datetime.datetime(2018, 6, 18, 10, 32, 1, 123456) + datetime.timedelta(seconds=index)
+    case_result = {'repeat_index': index, 'id': case_id, 'description': 'description of ' + case_id,
+                   'status': index % 3 != 0, 'expected': None, 'received': 'received {}'.format(index),
+                   'output_messages': ['message é'], 'start_time': start_time,
+                   'end_time': start_time + datetime.timedelta(seconds=0.25), 'time_taken': 0.25}
+    case_result.update(kwargs)
+    return case_result
+
+
+class TestDatagram(unittest.TestCase):
+    def test_encode_decode(self):
+        case_results = [_case_result('Case{}'.format(i % 3), i) for i in range(100)]
+        case_results.append(_case_result('Case4', 100, start_time=None, end_time=None, time_taken=None,
+                                         output_messages=[]))
+        encoder = datagram.Encoder(datagram_size=600)
+        datagrams = encoder.encode(case_results)
+
+        self.assertGreater(len(datagrams), 1)
+        self.assertEqual(sum(count for _, count in datagrams), 101)
+        decoded = []
+        for data, count in datagrams:
+            self.assertLessEqual(len(data), 600)
+            self.assertTrue(datagram.is_datagram(data))
+            decoded.extend(datagram.decode(data))
+        self.assertEqual(decoded, case_results)
+
+    def test_payload_limit(self):
+        case_result = _case_result('Case1', 1, expected='é' * 10, received='x' * 100000,
+                                   output_messages=['a' * 6, 'b' * 6, 'c' * 6])
+        self.assertEqual(datagram.Encoder().encode([case_result]), [])
+
+        encoder = datagram.Encoder(payload_limit=15)
+        (data, count), = encoder.encode([case_result, _case_result('Case1', 2)])
+        self.assertEqual(count, 2)
+        decoded = datagram.decode(data)
+        self.assertEqual((decoded[0]['expected'], decoded[0]['received'], decoded[0]['output_messages']),
+                         ('é' * 7, 'x' * 15, ['a' * 6, 'b' * 6, 'c' * 3]))
+        self.assertEqual(decoded[1], _case_result('Case1', 2))
+
+    def test_malformed(self):
+        (data, _), = datagram.Encoder().encode([_case_result('Case1', 1)])
+        for malformed in [b'', b'EZTD\x02' + data[5:], data[:-1], data[:5] + b'\x01\x00' + data[7:],
+                          data[:12] + b'\xff' * 7 + b'\x7f' + data[20:], pickle.dumps(_case_result('Case1', 1))]:
+            self.assertRaises(ValueError, datagram.decode, malformed)
+        self.assertFalse(datagram.is_datagram(b'\x80\x03}q'))
+
+
+if __name__ == '__main__':
+    unittest.main()
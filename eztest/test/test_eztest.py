@@ -1,10 +1,16 @@
 import datetime
 import unittest
 import argparse
+import signal
 import eztest
 from eztest import _to_datetime, _is_matched, _parser_args, __version__
 from eztest.utility import SysStandardOutput
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 
 class TestEZTest(unittest.TestCase):
     def __init__(self, *args, **kwargs):
@@ -35,11 +41,12 @@ class TestEZTest(unittest.TestCase):
 
 
     def test_parser(self):
-        options = '{test,stop,calc,server,dump}'
+        options = '{test,agent,controller,stop,calc,convert,server,dump}'
 
         with SysStandardOutput() as f1, self.assertRaises(SystemExit):
             _parser_args(['eztest'])
-        self.assertIn('usage: eztest [-h] [--version] {}'.format(options), f1.output)
+        self.assertIn('usage: eztest [-h] [--version]', f1.output)
+        self.assertIn(options, f1.output)
 
         with SysStandardOutput() as f2, self.assertRaises(SystemExit):
             _parser_args(['eztest', 'abc'])
@@ -55,7 +62,8 @@ class TestEZTest(unittest.TestCase):
 
         with SysStandardOutput() as f1, self.assertRaises(SystemExit):
             _parser_args(['eztest', '--help'])
-        self.assertIn('usage: eztest [-h] [--version] {}'.format(options), f1.output)
+        self.assertIn('usage: eztest [-h] [--version]', f1.output)
+        self.assertIn(options, f1.output)
         self.assertIn('positional arguments', f1.output)
         self.assertIn('optional arguments', f1.output)
 
@@ -115,12 +123,24 @@ class TestEZTest(unittest.TestCase):
                            stress=1,
                            repeat=1,
                            interval=0,
+                           think_time=None,
+                           pacing=0,
                            limit=0,
+                           queue_size=0,
+                           rate=1.0,
+                           processes=1,
+                           stages=None,
+                           profile=None,
                            starts=None,
                            duration=None,
                            ends=None,
                            report_folder=None,
                            report_server=None,
+                           report_transport='udp',
+                           report_payload_limit=None,
+                           report_batch_size=1000,
+                           report_flush_interval=1.0,
+                           report_format='csv',
                            noreport=False,
                            nolog=False,
                            mail_config=None,
@@ -139,12 +159,24 @@ class TestEZTest(unittest.TestCase):
                            stress=10,
                            repeat=11,
                            interval=12,
+                           think_time=None,
+                           pacing=0,
                            limit=13,
+                           queue_size=0,
+                           rate=1.0,
+                           processes=1,
+                           stages=None,
+                           profile=None,
                            starts=datetime.datetime(2018, 1, 2, 3, 4, 5),
                            duration=1,
                            ends=datetime.datetime(2018, 11, 12, 13, 14, 15),
                            report_folder='report_folder',
                            report_server='report_server:1234',
+                           report_transport='udp',
+                           report_payload_limit=None,
+                           report_batch_size=1000,
+                           report_flush_interval=1.0,
+                           report_format='csv',
                            noreport=True,
                            nolog=True,
                            mail_config='mail_config',
@@ -171,6 +203,36 @@ class TestEZTest(unittest.TestCase):
                           '--mail-config', 'mail_config'
                           ])
         self.assertDictEqual(eval(f1.output), expect_data)
+    def test_run_in_process(self):
+        calls = []
+
+        def start_tests(args, cancel_event=None, report_queue=None, progress_queue=None, progress_interval=None):
+            calls.append((args, cancel_event, report_queue, progress_queue, progress_interval))
+            if report_queue is not None:
+                report_queue.put('row')
+            if progress_queue is not None:
+                progress_queue.put((1, 0, None))
+            return 3, 1
+
+        report_queue, summary_queue = queue.Queue(), queue.Queue()
+        start_tests_function, sigint_handler = eztest._start_tests, signal.getsignal(signal.SIGINT)
+        eztest._start_tests = start_tests
+        try:
+            eztest._run_in_process('args', report_queue, 'event', summary_queue)
+            eztest._run_in_process('args', None, 'event', summary_queue, 0.5)
+        finally:
+            eztest._start_tests = start_tests_function
+            signal.signal(signal.SIGINT, sigint_handler)
+
+        self.assertEqual(calls, [('args', 'event', report_queue, None, None),
+                                 ('args', 'event', None, summary_queue, 0.5)])
+        self.assertEqual(report_queue.get_nowait(), 'row')
+        self.assertIsNone(report_queue.get_nowait())
+        self.assertTrue(report_queue.empty())
+        summaries = [summary_queue.get_nowait() for _ in range(3)]
+        self.assertEqual([summary[:2] for summary in summaries], [(3, 1), (1, 0), (3, 1)])
+        self.assertEqual([summary[2] is None for summary in summaries], [False, True, False])
+        self.assertIsInstance(summaries[2][2], datetime.datetime)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import json
+import unittest
+
+from eztest import histogram
+
+
+class TestHistogram(unittest.TestCase):
+    def setUp(self):
+        self.values = [i / 1000.0 for i in range(1, 1001)] + [0.0, 0.0000005, 30.0]
+
+    def test_record(self):
+        h = histogram.Histogram()
+        self.assertIsNone(h.mean())
+        self.assertIsNone(h.percentile(50))
+        for value in self.values:
+            h.record(value)
+
+        self.assertEqual(h.count, 1003)
+        mean = (500.5 + 30.000001) / 1003
+        self.assertAlmostEqual(h.mean(), mean, places=12)
+        self.assertAlmostEqual(h.stddev(), (sum((v - mean) ** 2 for v in self.values) / 1003) ** 0.5, places=6)
+        self.assertEqual(h.percentile(0), 0.0)
+        self.assertEqual(h.percentile(100), 30.0)
+        values = sorted(self.values)
+        for percentile, rank in [(50, 502), (90, 903), (99, 993), (99.9, 1002)]:
+            self.assertGreaterEqual(h.percentile(percentile), values[rank - 1])
+            self.assertLessEqual(h.percentile(percentile), values[rank - 1] * 1.001)
+
+        h = histogram.Histogram()
+        h.record(2.5)
+        self.assertEqual((h.mean(), h.stddev(), h.percentile(99.9)), (2.5, 0.0, 2.5))
+
+    def test_merge(self):
+        expected = histogram.Histogram()
+        for value in self.values:
+            expected.record(value)
+
+        numpy = histogram.numpy
+        try:
+            for numpy_module in {numpy, None}:
+                histogram.numpy = numpy_module
+                h, other = histogram.Histogram(), histogram.Histogram()
+                h.record_values(self.values[:300])
+                other.record_values(self.values[300:])
+                h.merge(other)
+                h.merge(histogram.Histogram())
+                self.assertEqual(h, expected)
+                self.assertEqual((h.minimum, h.maximum), (0, 30000000))
+                self.assertEqual([h.percentile(p) for p in (50, 99.9)], [expected.percentile(p) for p in (50, 99.9)])
+        finally:
+            histogram.numpy = numpy
+
+    def test_to_dict(self):
+        h = histogram.Histogram()
+        self.assertEqual(histogram.Histogram.from_dict(json.loads(json.dumps(h.to_dict()))), h)
+        for value in self.values:
+            h.record(value)
+        loaded = histogram.Histogram.from_dict(json.loads(json.dumps(h.to_dict())))
+        self.assertEqual(loaded, h)
+        self.assertEqual((loaded.minimum, loaded.maximum, loaded.percentile(99)), (0, 30000000, h.percentile(99)))
+
+    def test_bucket(self):
+        for microseconds in [0, 1, 2047, 2048, 2049, 4095, 4096, 123456789, 2 ** 40 + 1]:
+            lowest, highest = histogram.get_bucket_range(histogram.get_bucket(microseconds))
+            self.assertLessEqual(lowest, microseconds)
+            self.assertLessEqual(microseconds, highest)
+            self.assertLessEqual(highest - lowest, microseconds / 1024.0)
+        self.assertEqual(histogram.get_bucket(2047) + 1, histogram.get_bucket(2048))
+        self.assertEqual(histogram.get_bucket_range(histogram.get_bucket(4096) - 1), (4094, 4095))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from eztest import loadprofile
+
+
+class TestLoadProfile(unittest.TestCase):
+    def test_parse_stage(self):
+        stage = loadprofile.parse_stage('warm-up=60:10')
+        self.assertEqual(stage.name, 'warm-up')
+        self.assertEqual(stage.duration, 60)
+        self.assertEqual(stage.target, 10)
+
+        stage = loadprofile.parse_stage('30:2.5', 1)
+        self.assertEqual(stage.name, 'Stage 2')
+        self.assertEqual(stage.duration, 30)
+        self.assertEqual(stage.target, 2.5)
+        self.assertEqual(str(stage), 'Stage 2=30:2.5')
+
+        self.assertRaises(ValueError, loadprofile.parse_stage, '60')
+        self.assertRaises(ValueError, loadprofile.parse_stage, 'a=b:c')
+
+    def test_load_stages(self):
+        fd, file_path = tempfile.mkstemp(suffix='.ini')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('[warm-up]\nduration=60\ntarget=10\n\n[steady]\nduration=300\ntarget=50\n')
+            stages = loadprofile.get_stages(file_path=file_path)
+        finally:
+            os.remove(file_path)
+        self.assertEqual([str(stage) for stage in stages], ['warm-up=60:10', 'steady=300:50'])
+        self.assertIsNone(loadprofile.get_stages())
+        self.assertRaises(ValueError, loadprofile.load_stages, file_path)
+
+    def test_split_stages(self):
+        stages = loadprofile.get_stages(['60:10', '60:2.5'])
+        self.assertEqual([str(stage) for stage in loadprofile.split_stages(stages, 3, 0)], ['Stage 1=60:4', 'Stage 2=60:0.8333333333333334'])
+        self.assertEqual([str(stage) for stage in loadprofile.split_stages(stages, 3, 2)], ['Stage 1=60:3', 'Stage 2=60:0.8333333333333334'])
+
+    def test_stage_round_trip(self):
+        for duration, target in [(60, 100 / 3.0), (1234567, 1234567.5), (0.1, 1e-07), (1e+20, 2.5 / 3)]:
+            stage = loadprofile.parse_stage(str(loadprofile.Stage(duration, target, 'steady')))
+            self.assertEqual((stage.name, stage.duration, stage.target), ('steady', duration, target))
+
+    def test_get_target(self):
+        profile = loadprofile.LoadProfile(loadprofile.get_stages(['up=10:10', '20:10', 'down=10:0']))
+        self.assertEqual(profile.total_seconds, 40)
+        stage, target = profile.get_target(0)
+        self.assertEqual((stage.name, target), ('up', 0))
+        stage, target = profile.get_target(5)
+        self.assertEqual((stage.name, target), ('up', 5))
+        stage, target = profile.get_target(20)
+        self.assertEqual((stage.name, target), ('Stage 2', 10))
+        stage, target = profile.get_target(35)
+        self.assertEqual((stage.name, target), ('down', 5))
+        self.assertEqual(profile.get_target(40), (None, None))
+
+        self.assertRaises(ValueError, loadprofile.LoadProfile, [])
+        self.assertRaises(ValueError, loadprofile.LoadProfile, loadprofile.get_stages(['0:10']))
+        self.assertRaises(ValueError, loadprofile.LoadProfile, loadprofile.get_stages(['10:-1']))
+
+    def test_get_arrival_seconds(self):
+        profile = loadprofile.LoadProfile(loadprofile.get_stages(['10:10', '10:10', '10:0']))
+        self.assertEqual(profile.get_arrival_seconds(0), 0)
+        self.assertAlmostEqual(profile.get_arrival_seconds(5), 10 ** 0.5)
+        self.assertAlmostEqual(profile.get_arrival_seconds(50), 10)
+        self.assertAlmostEqual(profile.get_arrival_seconds(100), 15)
+        self.assertAlmostEqual(profile.get_arrival_seconds(195), 30 - 10 ** 0.5)
+        self.assertIsNone(profile.get_arrival_seconds(200))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,295 @@
+import datetime
+import os
+import pickle
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from eztest import calc_report, compression, datagram, report, utility
+
+
+def _case_result(case_id, end_second, status=True):
+    end_time = datetime.datetime(2018, 6, 18, 10, 32) + datetime.timedelta(seconds=end_second)
+    return {'repeat_index': 0, 'id': case_id, 'description': case_id, 'status': status, 'expected': None,
+            'received': None, 'output_messages': [], 'start_time': end_time - datetime.timedelta(seconds=1),
+            'end_time': end_time, 'time_taken': 1.0}
+
+
+_unpickled = []
+
+
+class _Exploit(object):
+    def __reduce__(self):
+        return _unpickled.append, ('executed',)
+
+
+class TestReportBaseHandler(unittest.TestCase):
+    def test_out_of_order(self):
+        handler = report.ReportBaseHandler()
+        handler.group_gap = datetime.timedelta(seconds=60)
+        for end_second in [130, 10, 70, 5, 190]:
+            handler.write(_case_result('Case1', end_second))
+
+        self.assertEqual(sorted((index, value['total_count']) for (_, index), value in handler.group_summary.items()),
+                         [(-2, 2), (-1, 1), (0, 1), (1, 1)])
+        dump = handler.dump()
+        self.assertIn('Case1,1,2018-06-18 10:32:00,2018-06-18 10:33:00,0,2,0.0000%,1.0,1.0,1.0,0.0,1.0,1.0,1.0,1.0,1.0\n'
+                      'Case1,2,2018-06-18 10:33:00,2018-06-18 10:34:00,0,1,0.0000%,1.0,1.0,1.0,0.0,1.0,1.0,1.0,1.0,1.0\n'
+                      'Case1,3,2018-06-18 10:34:00,2018-06-18 10:35:00,0,1,0.0000%,1.0,1.0,1.0,0.0,1.0,1.0,1.0,1.0,1.0\n'
+                      'Case1,4,2018-06-18 10:35:00,2018-06-18 10:36:00,0,1,0.0000%,1.0,1.0,1.0,0.0,1.0,1.0,1.0,1.0,1.0\n',
+                      dump)
+        self.assertNotIn('Late Count', dump)
+
+    def test_lateness(self):
+        handler = report.ReportBaseHandler()
+        handler.group_gap = datetime.timedelta(seconds=60)
+        handler.lateness = datetime.timedelta(seconds=30)
+        for end_second in [100, 75, 60, 200, 171, 165]:
+            handler.write(_case_result('Case1', end_second, end_second != 60))
+        handler.write(_case_result('Case2', 5))
+
+        self.assertEqual(handler.late_counts, {'Case1': 2})
+        self.assertEqual((handler.case_summary['Case1']['total_count'], handler.case_summary['Case1']['fail_count']),
+                         (6, 1))
+        self.assertEqual(sorted((key, value['total_count'], value['fail_count'])
+                                for key, value in handler.group_summary.items()),
+                         [(('Case1', 0), 2, 0), (('Case1', 1), 1, 0), (('Case1', 2), 1, 0), (('Case2', 0), 1, 0)])
+        self.assertIn('\nCase Id,Late Count(ended more than 30 seconds before the latest one, not in groups)\n'
+                      'Case1,2\n', handler.dump())
+
+    def test_rolling_windows(self):
+        handler = report.ReportBaseHandler()
+        handler.window_seconds = (10, 60)
+        for end_second in range(100):
+            handler.write(_case_result('Case1', end_second, end_second % 4 != 0))
+        handler.write(_case_result('Case2', 80))
+
+        self.assertEqual(handler.rolling_windows['Case1'].size, 60)
+        self.assertTrue(handler.dump().endswith(
+            '\nRolling windows until 2018-06-18 10:33:40\n'
+            'Case Id,Window Seconds,Fail Count,Total Count,Failure Rate,Throughput,Average Time Taken,'
+            'P50,P90,P95,P99,P99.9\n'
+            'Case1,10,2,10,20.0000%,1,1.0,1.0,1.0,1.0,1.0,1.0\n'
+            'Case1,60,15,60,25.0000%,1,1.0,1.0,1.0,1.0,1.0,1.0\n'
+            'Case2,10,0,0,0.0000%,0,,,,,,\n'
+            'Case2,60,0,1,0.0000%,0.0166667,1.0,1.0,1.0,1.0,1.0,1.0\n'))
+
+
+class _BlockedHandler(report.ReportBaseHandler):
+    def __init__(self):
+        super(_BlockedHandler, self).__init__()
+        self.event = threading.Event()
+
+    def write_batch(self, case_results):
+        self.event.wait()
+        super(_BlockedHandler, self).write_batch(case_results)
+
+
+class TestReportFileHandler(unittest.TestCase):
+    def test_write_batch(self):
+        folder = tempfile.mkdtemp()
+        try:
+            handler = report.ReportFileHandler()
+            handler.report_folder_name = os.path.join(folder, 'reports')
+            handler.max_bytes = 1000
+            handler.write_batch([_case_result('Case{}'.format(i % 2), i) for i in range(20)])
+            handler.write(_case_result('Case1', 30))
+            handler.close()
+
+            self.assertEqual(handler.case_summary['Case0']['total_count'], 10)
+            self.assertEqual(handler.case_summary['Case1']['total_count'], 11)
+            lines = []
+            for file_name in sorted(os.listdir(handler.report_folder_name)):
+                with compression.open_file(os.path.join(handler.report_folder_name, file_name)) as f:
+                    content = f.read()
+                self.assertLess(len(content), 1000)
+                lines.extend(content.splitlines()[1:])
+            self.assertGreater(handler.file_index, 2)
+            self.assertEqual(len(lines), 21)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_size(self):
+        folder = tempfile.mkdtemp()
+        try:
+            for report_format in [report.resultlog.CSV, report.resultlog.BINARY]:
+                handler = report.ReportFileHandler(report_format)
+                handler.report_folder_name = os.path.join(folder, report_format)
+                handler.max_bytes = 500
+                handler.compression = compression.NONE
+                for i in range(30):
+                    case_result = _case_result('Case{}'.format(i % 3), i)
+                    case_result['description'] = '\u7528\u4f8b {}'.format(i)
+                    if i % 2:
+                        handler.write(case_result)
+                    else:
+                        handler.write_batch([case_result])
+                handler.flush()
+
+                file_path = os.path.join(handler.report_folder_name, handler.filename)
+                self.assertEqual(handler._size, os.path.getsize(file_path))
+                for index in range(1, handler.file_index):
+                    self.assertLess(os.path.getsize('{}.{}'.format(file_path, index)), 500)
+                self.assertGreater(handler.file_index, 2)
+                handler._stream.close()
+        finally:
+            shutil.rmtree(folder)
+
+    def test_compression(self):
+        folder = tempfile.mkdtemp()
+        try:
+            methods = [compression.GZIP] + ([compression.ZSTD] if compression.zstandard is not None else [])
+            for method in methods:
+                for report_format in [report.resultlog.CSV, report.resultlog.BINARY]:
+                    handler = report.ReportFileHandler(report_format)
+                    handler.report_folder_name = os.path.join(folder, method + report_format)
+                    handler.max_bytes = 1000
+                    handler.compression = method
+                    handler.write_batch([_case_result('Case{}'.format(i % 2), i, i % 5 != 0) for i in range(40)])
+                    handler.close()
+
+                    file_names = sorted(os.listdir(handler.report_folder_name))
+                    self.assertEqual(len(file_names), handler.file_index)
+                    file_paths = []
+                    for file_name in file_names:
+                        file_path = os.path.join(handler.report_folder_name, file_name)
+                        file_paths.append(file_path)
+                        if file_name != handler.filename:
+                            self.assertTrue(file_name.endswith(compression.EXTENSIONS[method]))
+                            self.assertEqual(compression.get_method(file_path), method)
+                    self.assertEqual(sum(len(calc_report.read_file(file_path)[0]['Case0'].ends)
+                                         for file_path in file_paths), 20)
+
+                    with utility.SysStandardOutput() as output:
+                        calc_report.calc(handler.report_folder_name)
+                    self.assertIn('\nCase0,4,20,20.0000%', output)
+        finally:
+            shutil.rmtree(folder)
+
+
+class TestReportServer(unittest.TestCase):
+    def test_serve(self):
+        server = report.ReportServer(report.ReportBaseHandler(), port=0, queue_size=10000, batch_size=7)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client.settimeout(5)
+        sender = datagram.ReportSender(('127.0.0.1', server.port), datagram_size=600)
+        sender.start()
+        try:
+            for i in range(50):
+                sender.put(_case_result('Case1', i, i % 10 != 0))
+            sender.close()
+            client.sendto(pickle.dumps(_case_result('Case1', 50)), ('127.0.0.1', server.port))
+            client.sendto(pickle.dumps(_Exploit()), ('127.0.0.1', server.port))
+            client.sendto(datagram.HEADER + b'\x00\x00', ('127.0.0.1', server.port))
+            for _ in range(50):
+                if server.processed_count >= 50 and server.error_count >= 3:
+                    break
+                time.sleep(0.1)
+            client.sendto(report.DUMP, ('127.0.0.1', server.port))
+            data, _ = client.recvfrom(65535)
+        finally:
+            client.close()
+            server.shutdown()
+            thread.join()
+
+        dump = data.decode('utf-8')
+        self.assertEqual((sender.sent_count, sender.datagram_count, sender.dropped_count), (50, 4, 0))
+        self.assertEqual(_unpickled, [])
+        self.assertIn('Case1,5,50,10.0000%', dump)
+        self.assertTrue(dump.endswith('Received Batches,Dropped Batches,Failed Batches,Written Case Results\n'
+                                      '7,0,3,50\n'))
+
+    def _start(self, port=0):
+        server = report.ReportServer(report.ReportBaseHandler(), port=port)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        return server, thread
+
+    def _wait(self, server, count):
+        for _ in range(50):
+            if server.processed_count >= count:
+                break
+            time.sleep(0.1)
+
+    def test_stream(self):
+        server, thread = self._start()
+        port = server.port
+        sender = datagram.StreamReportSender(('127.0.0.1', port), flush_interval=0.05, reconnect_interval=0.1)
+        sender.start()
+        try:
+            for i in range(20):
+                sender.put(_case_result('Case1', i))
+            self._wait(server, 20)
+        finally:
+            server.shutdown()
+            thread.join()
+        self.assertEqual(server.processed_count, 20)
+
+        for i in range(20, 30):
+            sender.put(_case_result('Case1', i))
+        time.sleep(0.3)
+        server, thread = self._start(port)
+        try:
+            for i in range(30, 40):
+                sender.put(_case_result('Case1', i, i % 10 != 0))
+            sender.close()
+            self._wait(server, 20)
+            client = socket.create_connection(('127.0.0.1', port), 5)
+            try:
+                client.sendall(datagram.pack_frame(report.DUMP))
+                dump = datagram.read_frame(client.makefile('rb')).decode('utf-8')
+            finally:
+                client.close()
+        finally:
+            server.shutdown()
+            thread.join()
+
+        self.assertEqual((sender.sent_count, sender.dropped_count, sender.connection_count), (40, 0, 2))
+        self.assertIn('Case1,1,20,5.0000%', dump)
+        self.assertTrue(dump.endswith(',0,0,20\n'))
+
+    def test_stop_after_acknowledged(self):
+        handler = _BlockedHandler()
+        server = report.ReportServer(handler, port=0, batch_size=1)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        client = socket.create_connection(('127.0.0.1', server.port), 5)
+        try:
+            encoder = datagram.Encoder()
+            for i in range(10):
+                (data, _), = encoder.encode([_case_result('Case1', i)])
+                client.sendall(datagram.pack_frame(data))
+                self.assertEqual(client.recv(1), datagram.ACK)
+            server.shutdown()
+            time.sleep(0.3)
+            handler.event.set()
+            thread.join()
+        finally:
+            client.close()
+
+        self.assertEqual((server.processed_count, handler.case_summary['Case1']['total_count']), (10, 10))
+
+    def test_spill(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+        s.close()
+        sender = datagram.StreamReportSender(('127.0.0.1', port), flush_interval=0.05, spill_size=2000)
+        sender.start()
+        for i in range(30):
+            sender.put(_case_result('Case1', i))
+        time.sleep(0.2)
+        for i in range(30, 60):
+            sender.put(_case_result('Case1', i))
+        sender.close()
+        self.assertEqual((sender.sent_count, sender.dropped_count, sender.connection_count), (0, 60, 0))
+        self.assertIsNotNone(sender.last_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
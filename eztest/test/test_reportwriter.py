@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+
+from eztest.reportwriter import ReportWriter
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class SlowFile(StringIO):
+    def __init__(self):
+        StringIO.__init__(self)
+        self.write_count = 0
+        self.flush_count = 0
+
+    def write(self, s):
+        self.write_count += 1
+        time.sleep(0.01)
+        return StringIO.write(self, s)
+
+    def flush(self):
+        self.flush_count += 1
+
+
+class TestReportWriter(unittest.TestCase):
+    def test_write_in_batches(self):
+        f = SlowFile()
+        writer = ReportWriter(f, batch_size=100, flush_interval=60)
+        writer.start()
+        for i in range(1000):
+            writer.put('%d\n' % i)
+        writer.close()
+
+        self.assertEqual(f.getvalue(), ''.join('%d\n' % i for i in range(1000)))
+        self.assertEqual(writer.written_count, 1000)
+        self.assertLess(f.write_count, 1000)
+        self.assertEqual(f.flush_count, 1)
+
+    def test_flush_interval(self):
+        f = SlowFile()
+        writer = ReportWriter(f, batch_size=100, flush_interval=0.1)
+        writer.start()
+        writer.put('a\n')
+        time.sleep(0.5)
+        self.assertEqual(f.getvalue(), 'a\n')
+        self.assertEqual(f.flush_count, 1)
+        writer.close()
+        self.assertEqual(f.flush_count, 1)
+
+    def test_backpressure(self):
+        f = SlowFile()
+        writer = ReportWriter(f, batch_size=1, flush_interval=60, queue_size=2)
+        writer.start()
+        threads = [threading.Thread(target=writer.put, args=('%d\n' % i,)) for i in range(20)]
+        for td in threads:
+            td.start()
+        time.sleep(0.05)
+        self.assertLessEqual(writer._queue.qsize(), 2)
+        for td in threads:
+            td.join()
+        writer.close()
+        self.assertEqual(writer.written_count, 20)
+        self.assertEqual(sorted(f.getvalue().split()), sorted(str(i) for i in range(20)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from eztest import calc_report, resultlog, utility
+
+
+def _write_result_log(records):
+    fd, file_path = tempfile.mkstemp(suffix=resultlog.FILE_EXTENSION)
+    encoder = resultlog.Encoder()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(resultlog.HEADER)
+        for record in records:
+            f.write(encoder.encode(record))
+    return file_path
+
+
+class TestResultLog(unittest.TestCase):
+    def setUp(self):
+        start = datetime.datetime(2018, 6, 18, 10, 32)
+        self.records = [
+            resultlog.Record('Case1', 'Case1', 0, True, start, start + datetime.timedelta(seconds=1), 1.0, 'up'),
+            resultlog.Record('Case1', 'Case1', 0, False, start + datetime.timedelta(seconds=1),
+                             start + datetime.timedelta(seconds=3), 2.0, 'steady'),
+            resultlog.Record('Case1', 'Case1', 1, True, start + datetime.timedelta(seconds=3),
+                             start + datetime.timedelta(seconds=7, microseconds=123456), 4.0, 'steady'),
+        ]
+        self.file_path = _write_result_log(self.records)
+
+    def tearDown(self):
+        os.remove(self.file_path)
+
+    def test_read_records(self):
+        self.assertTrue(resultlog.is_result_log(self.file_path))
+        self.assertEqual(list(resultlog.read_records(self.file_path)), self.records)
+        # 3 result records, 1 case record and 2 stage records.
+        self.assertEqual(os.path.getsize(self.file_path),
+                         len(resultlog.HEADER) + 3 * 36 + (1 + 8 + 10) + (1 + 4 + 2) + (1 + 4 + 6))
+
+        record = resultlog.Record('Case2', None, None, False, None, None, None, None)
+        file_path = _write_result_log([record])
+        try:
+            self.assertEqual(list(resultlog.read_records(file_path)),
+                             [resultlog.Record('Case2', '', 0, False, None, None, None, None)])
+        finally:
+            os.remove(file_path)
+
+    def test_calc(self):
+        with utility.SysStandardOutput() as output:
+            calc_report.calc(self.file_path)
+
+        self.assertIn('Case1,1,3,33.3333%,1.0,4.0,2.3333333333333335,1.2472191289246473,2.000895,4.0,4.0,4.0,4.0', output)
+        self.assertIn('up,Case1,0,1,0.0000%,1.0,1.0,1.0,0.0,1.0,1.0,1.0,1.0,1.0\n'
+                      'steady,Case1,1,2,50.0000%,2.0,4.0,3.0,1.0,2.000895,4.0,4.0,4.0,4.0', output)
+
+        del output
+
+    def test_to_csv(self):
+        csv_file_path = self.file_path + '.csv'
+        try:
+            self.assertEqual(resultlog.to_csv(self.file_path, csv_file_path), 3)
+            with open(csv_file_path) as f:
+                lines = f.read().splitlines()
+            with utility.SysStandardOutput() as output:
+                calc_report.calc(csv_file_path)
+        finally:
+            os.remove(csv_file_path)
+
+        self.assertEqual(lines[0], resultlog.CSV_HEADER + ',"Stage"')
+        self.assertEqual(lines[3], '"1","Case1","Case1","Pass","","","","2018-06-18 10:32:03.000000",'
+                                   '"2018-06-18 10:32:07.123456","4.0","","steady"')
+        self.assertIn('Case1,1,3,33.3333%,1.0,4.0,2.3333333333333335,1.2472191289246473,2.000895,4.0,4.0,4.0,4.0', output)
+        self.assertIn('steady,Case1,1,2,50.0000%,2.0,4.0,3.0,1.0,2.000895,4.0,4.0,4.0,4.0', output)
+
+        del output
+
+
+if __name__ == '__main__':
+    unittest.main()
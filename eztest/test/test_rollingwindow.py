@@ -0,0 +1,44 @@
+import datetime
+import unittest
+
+from eztest import rollingwindow
+
+
+class TestRollingWindow(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2018, 6, 18, 10, 32)
+        self.second = rollingwindow.to_second(self.start)
+
+    def test_record(self):
+        window = rollingwindow.RollingWindow(size=60)
+        self.assertEqual(window.get(10)[:2], (0, 0))
+        self.assertEqual(window.get(10, self.second)[:2], (0, 0))
+        for i in range(120):
+            for j in range(i % 3 + 1):
+                end_time = self.start + datetime.timedelta(seconds=i, microseconds=j * 1000)
+                self.assertTrue(window.record(end_time, (i + j) / 1000.0, (i + j) % 5 != 0))
+
+        self.assertEqual(window.latest_second, self.second + 119)
+        count, failed_count, values = window.get(10)
+        self.assertEqual((count, failed_count), (sum(i % 3 + 1 for i in range(110, 120)),
+                                                 sum(1 for i in range(110, 120) for j in range(i % 3 + 1)
+                                                     if (i + j) % 5 == 0)))
+        self.assertEqual((values.minimum, values.maximum), (110000, 121000))
+        self.assertEqual(window.get(60)[0], sum(i % 3 + 1 for i in range(60, 120)))
+        self.assertEqual(window.get(600)[0], window.get(60)[0])
+        self.assertEqual(window.get(10, self.second + 59)[0], 0)
+        self.assertEqual(window.get(10, self.second + 100)[0], sum(i % 3 + 1 for i in range(91, 101)))
+
+    def test_out_of_order(self):
+        window = rollingwindow.RollingWindow(size=10)
+        for second in [5, 1, 9, 3, 14, 4, 2, 30, 21, 20]:
+            window.record(self.start + datetime.timedelta(seconds=second), 0.1, True)
+
+        self.assertEqual(window.ignored_count, 3)
+        self.assertEqual(window.get(10)[0], 2)
+        self.assertEqual(window.get(10, self.second + 14)[0], 0)
+        self.assertEqual(len(window._seconds), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,282 @@
+import time
+import unittest
+
+from eztest import loadprofile, resultlog, testcase, testmode, utility
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class _Case(testcase.BaseCase):
+    run_seconds = 0
+
+    def __init__(self):
+        super(_Case, self).__init__()
+        self.id = 'Case1'
+        self.description = 'description'
+
+    def run(self):
+        if self.run_seconds > 0:
+            time.sleep(self.run_seconds)
+        return True
+
+
+class _SlowCase(_Case):
+    run_seconds = 0.2
+
+
+class _QuickCase(_Case):
+    run_seconds = 0.02
+
+
+class _CountCase(_Case):
+    def __init__(self):
+        super(_CountCase, self).__init__()
+        self.count = 0
+
+    def run(self):
+        self.count += 1
+        self.received = self.count
+        return True
+
+
+class _ReusableCountCase(_CountCase):
+    reusable = True
+
+
+def _create_test(test_class, **kwargs):
+    test = test_class()
+    test.cases = [_Case()]
+    test.report_queue = queue.Queue()
+    for name, value in kwargs.items():
+        setattr(test, name, value)
+    return test
+
+
+def _get_rows(test):
+    rows = []
+    while not test.report_queue.empty():
+        rows.append(test.report_queue.get_nowait())
+    return rows
+
+
+class TestContinuousTest(unittest.TestCase):
+    def test_case_state(self):
+        for case, expected in [(_CountCase(), ['"1"', '"1"', '"1"']), (_ReusableCountCase(), ['"1"', '"2"', '"3"'])]:
+            test = _create_test(testmode.ContinuousTest, cases=[case], repeat_times=3)
+            with utility.SysStandardOutput():
+                test.run()
+            self.assertTrue(test.wait(5))
+            self.assertEqual([row.split(',')[5] for row in _get_rows(test)], expected)
+
+
+class TestSimultaneousTest(unittest.TestCase):
+    def test_rounds(self):
+        test = _create_test(testmode.SimultaneousTest, cases=[_QuickCase()], thread_count=3, repeat_times=5)
+        dtstart = time.time()
+        with utility.SysStandardOutput():
+            test.run()
+            self.assertTrue(test.wait(5))
+
+        self.assertLess(time.time() - dtstart, 1)
+        self.assertEqual((test.round_started, test.round_finished), (15, 15))
+        self.assertEqual(len(_get_rows(test)), 15)
+
+
+class TestConcurrencyTest(unittest.TestCase):
+    def test_live_counts(self):
+        test = _create_test(testmode.ConcurrencyTest, cases=[_QuickCase()], thread_count=3)
+        with utility.SysStandardOutput():
+            test.run()
+            try:
+                time.sleep(0.2)
+                self.assertGreaterEqual(test.round_started, 3)
+                self.assertGreaterEqual(test.case_finished_count, 6)
+                self.assertEqual(test.case_failed_count, 0)
+                self.assertEqual(len(test._counters), 3)
+            finally:
+                dtcancel = time.time()
+                test.cancel()
+            self.assertTrue(test.wait(5))
+            self.assertLess(time.time() - dtcancel, 0.5)
+
+        self.assertEqual(len(test._counters), 0)
+        self.assertEqual(test.round_finished, test.round_started)
+        self.assertEqual(test.case_finished_count, len(_get_rows(test)))
+        self.assertEqual(test.case_failed_count, 0)
+
+    def test_pacing(self):
+        test = _create_test(testmode.ConcurrencyTest, interval_seconds=2)
+        self.assertEqual(test.get_pause_seconds(testmode._clock() - 0.3), 2)
+        test.pacing_seconds = 1
+        self.assertAlmostEqual(test.get_pause_seconds(testmode._clock() - 0.3), 0.7, delta=0.05)
+        self.assertLess(test.get_pause_seconds(testmode._clock() - 1.5), 0)
+
+        test = _create_test(testmode.ConcurrencyTest, cases=[_QuickCase()], pacing_seconds=0.1)
+        with utility.SysStandardOutput():
+            test.run()
+            time.sleep(0.55)
+            test.cancel()
+            self.assertTrue(test.wait(5))
+        self.assertTrue(4 <= test.round_started <= 6)
+
+    def test_cancel_think_time(self):
+        test = _create_test(testmode.ConcurrencyTest, thread_count=2, think_time=10)
+        with utility.SysStandardOutput():
+            test.run()
+            time.sleep(0.1)
+            dtcancel = time.time()
+            test.cancel()
+            self.assertTrue(test.wait(5))
+        self.assertLess(time.time() - dtcancel, 0.5)
+        self.assertEqual(test.case_finished_count, 2)
+
+    def test_profile(self):
+        test = _create_test(testmode.ConcurrencyTest, cases=[_QuickCase()])
+        test.set_profile(loadprofile.LoadProfile(loadprofile.get_stages(['up=0.3:3', 'steady=0.4:3', 'down=0.3:0'])))
+        worker_counts = []
+        with utility.SysStandardOutput() as output:
+            test.run()
+            while not test.wait(0.02):
+                worker_counts.append(test.worker_count)
+
+        self.assertIn('Load profile is finished.', output.output)
+        self.assertEqual(max(worker_counts), 3)
+        self.assertLess(worker_counts[0], 3)
+        self.assertLess(min(worker_counts[worker_counts.index(3):]), 3)
+        self.assertEqual(test.additional_report_header, ['"Stage"'])
+        stages = [row.rstrip('\n').split(',')[-1] for row in _get_rows(test)]
+        self.assertEqual(len(stages), test.case_finished_count)
+        self.assertEqual(set(stages), {'"up"', '"steady"', '"down"'})
+
+
+class TestFrequentPoolTest(unittest.TestCase):
+    def test_case_pool(self):
+        test = _create_test(testmode.FrequentPoolTest, thread_count=2, queue_size=100)
+        test.reset()
+        with utility.SysStandardOutput():
+            test.start_workers()
+            for i in range(50):
+                test.put_arrival(i)
+            test.finish_rounds()
+
+        self.assertEqual(test.round_finished, 50)
+        self.assertEqual(len(_get_rows(test)), 50)
+        self.assertLessEqual(len(test._case_pool), test.get_worker_count())
+
+    def test_pool_size(self):
+        test = _create_test(testmode.FrequentPoolTest, thread_count=10)
+        self.assertEqual(test.get_worker_count(), 10)
+        test.max_thread_count = 3
+        self.assertEqual(test.get_worker_count(), 3)
+
+        test.reset()
+        with utility.SysStandardOutput():
+            test.start_workers()
+            self.assertEqual(len(test._workers), 3)
+            self.assertEqual(test._queue.maxsize, 3)
+            test.finish_rounds()
+
+        test.queue_size = 5
+        test.reset()
+        with utility.SysStandardOutput():
+            test.start_workers()
+            self.assertEqual(test._queue.maxsize, 5)
+            test.finish_rounds()
+
+    def test_queued_and_dropped(self):
+        test = _create_test(testmode.FrequentPoolTest, cases=[_SlowCase()], thread_count=1, queue_size=1)
+        test.reset()
+        with utility.SysStandardOutput():
+            test.start_workers()
+            try:
+                results = [test.put_arrival(0)]
+                deadline = time.time() + 5
+                while test.busy_count < 1 and time.time() < deadline:
+                    time.sleep(0.01)
+                results.extend([test.put_arrival(1), test.put_arrival(2)])
+            finally:
+                test.finish_rounds()
+
+        self.assertEqual(results, [0, 1, 2])
+        self.assertEqual((test.round_started, test.queued_count, test.dropped_count), (2, 1, 1))
+        self.assertEqual(test.round_finished, 2)
+        self.assertEqual([row.split(',')[0] for row in _get_rows(test)], ['"0"', '"1"'])
+
+    def test_cancel(self):
+        test = _create_test(testmode.FrequentPoolTest, cases=[_SlowCase()], thread_count=2, max_thread_count=3)
+        with utility.SysStandardOutput() as output:
+            test.run()
+            workers = list(test._workers)
+            time.sleep(0.2)
+            test.cancel()
+            self.assertTrue(test.wait(5))
+
+        self.assertEqual(len(workers), 3)
+        self.assertFalse(any(td.is_alive() for td in workers))
+        self.assertEqual(test._workers, [])
+        self.assertEqual(test.round_finished, test.round_started)
+        self.assertIn('Arrivals: %d started' % test.round_started, output.output)
+
+
+class TestArrivalRateTest(unittest.TestCase):
+    def test_case_pool(self):
+        test = _create_test(testmode.ArrivalRateTest, thread_count=2, arrival_rate=200.0)
+        with utility.SysStandardOutput():
+            test.run()
+            time.sleep(0.3)
+            test.cancel()
+            self.assertTrue(test.wait(5))
+
+        self.assertGreater(test.round_finished, 20)
+        self.assertLessEqual(len(test._case_pool), test.get_worker_count())
+
+    def test_get_intended_seconds(self):
+        test = _create_test(testmode.ArrivalRateTest, arrival_rate=4.0)
+        self.assertEqual([test.get_intended_seconds(i) for i in range(3)], [0.0, 0.25, 0.5])
+
+    def test_binary_report_format(self):
+        test = _create_test(testmode.ArrivalRateTest, report_format=resultlog.BINARY)
+        with self.assertRaises(ValueError):
+            test.check_report_format()
+        test = _create_test(testmode.ConcurrencyTest, report_format=resultlog.BINARY)
+        test.set_profile(loadprofile.LoadProfile(loadprofile.get_stages(['60:10'])))
+        test.check_report_format()
+
+    def test_invalid_rate(self):
+        test = _create_test(testmode.ArrivalRateTest, arrival_rate=0)
+        with self.assertRaises(ValueError):
+            test.start_test()
+
+    def test_schedule_lag(self):
+        test = _create_test(testmode.ArrivalRateTest, cases=[_SlowCase()], thread_count=1, arrival_rate=20.0)
+        with utility.SysStandardOutput() as output:
+            test.run()
+            time.sleep(0.5)
+            test.cancel()
+            self.assertTrue(test.wait(5))
+
+        self.assertEqual(test.additional_report_header, ['"Intended DateTime"', '"Schedule Lag"'])
+        rows = [row.rstrip('\n').split(',') for row in _get_rows(test)]
+        passed_rows = [row for row in rows if row[3] == '"Pass"']
+        dropped_rows = [row for row in rows if row[3] == '"Fail"']
+        self.assertTrue(0 < len(passed_rows) <= test.round_finished)
+        self.assertGreater(test.dropped_count, 0)
+        self.assertEqual(len(dropped_rows), test.dropped_count)
+        self.assertEqual(test.case_failed_count, test.dropped_count)
+        self.assertTrue(all(row[6] == '"Arrival is dropped because queue is full."' for row in dropped_rows))
+        lags = []
+        for row in rows:
+            self.assertEqual(len(row), 13)
+            utility.str2date(row[11].strip('"'), '%Y-%m-%d %H:%M:%S.%f')
+            lags.append(float(row[12].strip('"')))
+        self.assertTrue(all(lag >= 0 for lag in lags))
+        self.assertGreater(test.max_schedule_lag, 0.1)
+        self.assertLessEqual(max(float(row[12].strip('"')) for row in passed_rows), round(test.max_schedule_lag, 6))
+        self.assertIn('Schedule lag: average', output.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
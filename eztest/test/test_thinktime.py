@@ -0,0 +1,38 @@
+import unittest
+
+from eztest import thinktime
+
+
+class TestThinkTime(unittest.TestCase):
+    def test_parse_think_time(self):
+        self.assertEqual(str(thinktime.parse_think_time('1.5')), 'constant:1.5')
+        self.assertEqual(str(thinktime.parse_think_time('Uniform:0.5:1.5')), 'uniform:0.5:1.5')
+        self.assertEqual(str(thinktime.parse_think_time('exponential:2')), 'exponential:2')
+
+        self.assertRaises(ValueError, thinktime.parse_think_time, 'normal:1')
+        self.assertRaises(ValueError, thinktime.parse_think_time, 'uniform:1')
+        self.assertRaises(ValueError, thinktime.parse_think_time, 'uniform:2:1')
+        self.assertRaises(ValueError, thinktime.parse_think_time, '-1')
+        self.assertRaises(ValueError, thinktime.parse_think_time, 'constant:a')
+
+    def test_next(self):
+        self.assertEqual(thinktime.ThinkTime(thinktime.CONSTANT, 2).next(), 2)
+
+        think_time = thinktime.ThinkTime(thinktime.UNIFORM, 0.5, 1.5)
+        for _ in range(100):
+            self.assertTrue(0.5 <= think_time.next() <= 1.5)
+
+        think_time = thinktime.ThinkTime(thinktime.EXPONENTIAL, 2)
+        seconds = [think_time.next() for _ in range(10000)]
+        self.assertTrue(all(s >= 0 for s in seconds))
+        self.assertAlmostEqual(sum(seconds) / len(seconds), 2, delta=0.2)
+        self.assertEqual(thinktime.ThinkTime(thinktime.EXPONENTIAL, 0).next(), 0)
+
+    def test_get_seconds(self):
+        self.assertEqual(thinktime.get_seconds(None), 0)
+        self.assertEqual(thinktime.get_seconds(1.5), 1.5)
+        self.assertEqual(thinktime.get_seconds(thinktime.ThinkTime(thinktime.CONSTANT, 3)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -194,6 +194,11 @@ class TestUtility(unittest.TestCase):
         with self.assertRaises(AssertionError):
             utility.verify_dictionary([1,2,3], [3,4,5])
 
+    def test_split_value(self):
+        self.assertEqual([utility.split_value(10, 3, i) for i in range(3)], [4, 3, 3])
+        self.assertEqual([utility.split_value(2, 3, i) for i in range(3)], [1, 1, 0])
+        self.assertEqual([utility.split_value(0, 2, i) for i in range(2)], [0, 0])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -15,6 +15,8 @@ ERROR = 'ERROR'
 
 class BaseCase(object):
     """A abstract class used for sending request to web service and getting response."""
+    reusable = False    # True if case can be reset and run again in place, otherwise it is copied for each round
+
     def __init__(self):
         """Init."""
         self.description = None
@@ -37,6 +39,7 @@ class BaseCase(object):
         self.end_datetime = None
         self.time_taken = None
         self.is_under_stress_test = False
+        self.think_time = None  # thinktime.ThinkTime or seconds paused after this case, overrides think time of testing
 
     def __eq__(self, other):
         if isinstance(other, str):
@@ -56,10 +59,25 @@ class BaseCase(object):
         new.expected = self.expected
         new.no_log = self.no_log
         new.log_folder = self.log_folder
+        new.think_time = self.think_time
         new.output_messages = []
         new.additional_messages = []
         return new
 
+    def reset(self):
+        """Reset result of last run in place, so that this case can be run again without being copied.
+        It is only called if reusable is True, override it to clear state of each run which your case keeps.
+        """
+        self._file = None
+        self.log_path = None
+        self.received = None
+        self.output_messages = []
+        self.additional_messages = []
+        self.status = None
+        self.start_datetime = None
+        self.end_datetime = None
+        self.time_taken = None
+
     def get_time_taken(self):
         """Get time taken.
 
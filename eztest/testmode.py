@@ -23,7 +23,34 @@ ConcurrencyTest Test:
 Frequent Test:
     a. Start <thread_count> threads per <interval_seconds> seconds, and run self.cases one by one in each thread.
     Note: only have <max_thread_count> running if it is set.
+
+Frequent Pool Test:
+    a. Start <max_thread_count> long-lived worker threads (<thread_count> if <max_thread_count> is not set);
+    b. Put <thread_count> arrivals into a bounded queue per <interval_seconds> seconds;
+    c. Each worker takes arrivals from the queue and runs self.cases one by one for each of them.
+    Note: arrivals are dropped if the queue is full.
+
+Arrival Rate Test:
+    a. Start <max_thread_count> long-lived worker threads (<thread_count> if <max_thread_count> is not set);
+    b. Put arrivals into a bounded queue with <arrival_rate> arrivals per second, following a monotonic clock schedule;
+    c. Each worker takes arrivals from the queue and runs self.cases one by one for each of them.
+    Note: late arrivals are started immediately to catch up the schedule, and the lag between intended and actual
+    start time is logged into report.
+
+Async Test (eztest._asyncmode.AsyncTest):
+    a. Start <thread_count> virtual users as tasks on one event loop;
+    b. In each virtual user, run self.cases one by one and sleep <interval_seconds> seconds, until testing is cancelled.
+    Note: cases can define coroutine functions, such as "async def run(self)".
+
+Think Time (eztest.thinktime.ThinkTime):
+    Each case is followed by <think_time> seconds' pause, which can be constant, uniform or exponential distribution,
+    case.think_time overrides it. Concurrency and Async Test can also hold each round to <pacing_seconds>.
+
+Load Profile (eztest.loadprofile.LoadProfile):
+    Concurrency, Frequent, Frequent Pool, Arrival Rate and Async Test can ramp their target through stages instead of
+    applying <thread_count> or <arrival_rate> from the first second, stage of each case is logged into report.
 """
+import collections
 import copy
 import datetime
 import os
@@ -31,21 +58,27 @@ import threading
 import time
 import traceback
 import zipfile
-import socket
 
-from . import utility
+from . import datagram, reportwriter, resultlog, thinktime, utility
 from .testcase import BaseCase
 
 try:
-    import cPickle as pickle
+    import queue
 except ImportError:
-    import pickle
+    import Queue as queue
 
 NORMAL = 0
 CONTINUOUS = 1
 SIMULTANEOUS = 2
 CONCURRENCY = 3
 FREQUENT = 4
+FREQUENT_POOL = 5
+ARRIVAL_RATE = 6
+ASYNC = 7
+
+PROFILE_INTERVAL_SECONDS = 0.1
+
+_clock = getattr(time, 'monotonic', time.time)
 
 
 class NormalTest(object):
@@ -61,30 +94,82 @@ class NormalTest(object):
         self.no_report = False
         self.report_folder = 'reports'
         self.report_server = None   # a tuple(host, port)
+        self.report_transport = datagram.UDP    # udp, or tcp which sends case results over a persistent connection
+        self.report_queue = None    # a queue which formatted case results will be put into, e.g.: multiprocessing.Queue
+        self.report_batch_size = 1000   # rows are written into report file in batches by a writer thread, 0 to disable
+        self.report_flush_interval = 1.0
+        self.report_format = resultlog.CSV  # csv, or binary which writes compact binary result log(resultlog)
+        self.report_datagram_size = datagram.DATAGRAM_SIZE  # case results are sent to report server in datagrams
+        self.report_send_interval = 0.1
+        self.report_payload_limit = None    # truncate expected, received and output messages sent to report server
         self.mail = None
         self.additional_report_header = []
         self.test_mode = NORMAL
         self.starts_time = None
         self.ends_time = None
+        self.profile = None     # loadprofile.LoadProfile, ramps target concurrency or arrival rate through stages
+        self.current_stage = None
+        self.think_time = None  # thinktime.ThinkTime or seconds paused after each case, overridden by case.think_time
 
         self._mutex = threading.Lock()
+        self._round_condition = threading.Condition(self._mutex)
         self._stop_test_timer = None
         self._file = None
+        self._writer = None
+        self._encoder = None
+        self._sender = None
         self.is_cancelled = False
         self.round_finished = 0
         self.round_started = 0
-        self._socket = None
+        self.case_finished_count = 0
+        self.case_failed_count = 0
+        self._finished_event = threading.Event()
+        self._cancel_event = threading.Event()
+        self._case_pool = collections.deque()
+        self._profile_start_clock = None
+        self._profile_thread = None
+
+    def wait(self, timeout=None):
+        """Wait until testing is finished.
+
+        :param float timeout: timeout in seconds, wait forever if it is None.
+        :return bool: whether testing is finished.
+        """
+        return self._finished_event.wait(timeout)
+
+    def wait_rounds(self):
+        """Wait until all started rounds are finished."""
+        with self._round_condition:
+            while self.round_finished < self.round_started:
+                self._round_condition.wait()
 
     def process_finished(self):
         """Process after testing is finished: close report file, send mail, invoke teardown function."""
+        stop_test_timer = self._stop_test_timer
+        if stop_test_timer:
+            stop_test_timer.cancel()
+        try:
+            self._process_finished()
+        finally:
+            self._finished_event.set()
+
+    def _process_finished(self):
+        """Close report file, send mail, invoke teardown function."""
         report_file = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
         if self._file:
             report_file = self._file.name
             self._file.close()
             self._file = None
-        elif self._socket:
-            self._socket.close()
-            self._socket = None
+        elif self._sender is not None:
+            self._sender.close()
+            print('Report server: sent {} case results in {} batches, dropped {}.'.format(
+                self._sender.sent_count, self._sender.datagram_count, self._sender.dropped_count))
+            if self._sender.last_error is not None:
+                print('Last error of sending: {!r}'.format(self._sender.last_error))
+            self._sender = None
 
         if self.mail is not None:
             print('-' * 80)
@@ -115,75 +200,261 @@ class NormalTest(object):
             self.teardown()
         print('Completed all test cases!')
 
+    def format_case(self, case):
+        """Format case as a row of report file.
+
+        :param BaseCase case: case.
+        :return str: a row of report file.
+        """
+        output_messages = '\n'.join(utility.csv_format(message) for message in case.output_messages)
+        report_msg = '"%s","%s","%s","%s","%s","%s","%s","%s","%s","%s","%s"' % (
+            case.repeat_index, case.id,
+            utility.csv_format(case.description),
+            'Pass' if case.status else 'Fail',
+            utility.csv_format(case.expected),
+            utility.csv_format(case.received),
+            output_messages,
+            utility.date2str(case.start_datetime),
+            utility.date2str(case.end_datetime),
+            case.get_time_taken(),
+            case.log_path if case.log_path else '')
+        if case.additional_messages:
+            for message in case.additional_messages:
+                report_msg += ',"%s"' % (utility.csv_format(message))
+        return report_msg + '\n'
+
+    def get_record(self, case):
+        """Get record of binary result log from case.
+
+        :param BaseCase case: case.
+        :return resultlog.Record: record.
+        """
+        stage = case.additional_messages[-1] if self.profile is not None and case.additional_messages else None
+        return resultlog.Record(case.id, case.description, case.repeat_index, case.status,
+                                case.start_datetime, case.end_datetime, case.get_time_taken(), stage)
+
+    def format_report(self, case):
+        """Format case as a row of report file or a record of binary result log, according to report format.
+
+        :param BaseCase case: case.
+        :return str|resultlog.Record: a row of report file or a record.
+        """
+        if self.report_format == resultlog.BINARY:
+            return self.get_record(case)
+        return self.format_case(case)
+
     def case_finished(self, case):
-        """Process after case is finished: log output from case to report file.
+        """Process after case is finished: count it and log output from case to report file.
 
         :param BaseCase case: case."""
-        if self._file:
-            output_messages = '\n'.join(utility.csv_format(message) for message in case.output_messages)
-            report_msg = '"%s","%s","%s","%s","%s","%s","%s","%s","%s","%s","%s"' % (
-                case.repeat_index, case.id,
-                utility.csv_format(case.description),
-                'Pass' if case.status else 'Fail',
-                utility.csv_format(case.expected),
-                utility.csv_format(case.received),
-                output_messages,
-                utility.date2str(case.start_datetime),
-                utility.date2str(case.end_datetime),
-                case.get_time_taken(),
-                case.log_path if case.log_path else '')
-            if case.additional_messages:
-                for message in case.additional_messages:
-                    report_msg += ',"%s"' % (utility.csv_format(message))
-            report_msg += '\n'
-            with self._mutex:
-                if self._file:
-                    self._file.write(report_msg)
-                    self._file.flush()
-        elif self._socket:
-            try:
-                self._socket.sendto(pickle.dumps(
-                    dict(
-                        repeat_index=case.repeat_index,
-                        id=case.id,
-                        description=case.description,
-                        status=case.status,
-                        expected=case.expected,
-                        received=case.received,
-                        output_messages=case.output_messages,
-                        start_time=case.start_datetime,
-                        end_time=case.end_datetime,
-                        time_taken=case.get_time_taken()
-                    )
-                ), self.report_server)
-            except Exception:
-                pass
+        with self._mutex:
+            self.case_finished_count += 1
+            if not case.status:
+                self.case_failed_count += 1
+        self.report_case(case)
+
+    def report_case(self, case):
+        """Log output from case to report file, report queue or report server.
+
+        :param BaseCase case: case."""
+        if self.report_queue is not None:
+            self.report_queue.put(self.format_report(case))
+        elif self._file:
+            self.write_report(self.format_report(case))
+        elif self._sender is not None:
+            self._sender.put(dict(
+                repeat_index=case.repeat_index,
+                id=case.id,
+                description=case.description,
+                status=case.status,
+                expected=case.expected,
+                received=case.received,
+                output_messages=case.output_messages,
+                start_time=case.start_datetime,
+                end_time=case.end_datetime,
+                time_taken=case.get_time_taken()
+            ))
+
+    def new_cases(self, repeat_index=0, is_under_stress_test=True):
+        """Copy self.cases, so that they can be run in a thread. Copied cases can be run again after renew_cases.
+
+        :param int repeat_index: repeat index.
+        :param bool is_under_stress_test: is under stress test.
+        :return list: copied cases.
+        """
+        new_cases = []
+        for c in self.cases:
+            c2 = copy.deepcopy(c)
+            c2.is_under_stress_test = is_under_stress_test
+            c2.repeat_index = repeat_index
+            new_cases.append(c2)
+        return new_cases
+
+    @classmethod
+    def renew_cases(cls, cases, repeat_index):
+        """Renew cases in the list, so that they can be run again: reusable cases are reset in place, other cases are
+        replaced with their copies, so that state kept by last run is not seen by next run.
+
+        :param list cases: cases copied by new_cases.
+        :param int repeat_index: repeat index.
+        :return list: cases.
+        """
+        for i, c in enumerate(cases):
+            if c is None:
+                continue
+            if c.reusable:
+                c.reset()
+            else:
+                c2 = copy.deepcopy(c)
+                c2.is_under_stress_test = c.is_under_stress_test
+                cases[i] = c = c2
+            c.repeat_index = repeat_index
+        return cases
+
+    def acquire_cases(self, repeat_index):
+        """Take cases which are released by finished threads, or copy self.cases if there is not any.
+
+        :param int repeat_index: repeat index.
+        :return list: cases.
+        """
+        try:
+            return self.renew_cases(self._case_pool.pop(), repeat_index)
+        except IndexError:
+            return self.new_cases(repeat_index)
+
+    def release_cases(self, cases):
+        """Release cases after they are finished, so that they can be acquired again.
+
+        :param list cases: cases returned by acquire_cases.
+        """
+        self._case_pool.append(cases)
+
+    def write_report(self, report_msg):
+        """Write a row into report file, by report writer thread if it is started.
+
+        :param str|resultlog.Record report_msg: a row of report file, or a record if report format is binary.
+        """
+        writer = self._writer
+        if writer is not None:
+            writer.put(report_msg)
+            return
+        encoder = self._encoder
+        if encoder is not None:
+            report_msg = encoder.encode(report_msg)
+        with self._mutex:
+            if self._file:
+                self._file.write(report_msg)
+                self._file.flush()
 
     def run_cases(self, cases):
         """Run cases in sequence.
 
         :param list cases: cases."""
         try:
-            for case in cases:
-                if self.is_cancelled:
-                    break
-                if case is not None:
-                    if hasattr(case, 'on_finished'):
-                        case.on_finished = self.case_finished
-                    case.do_case()
+            self.do_cases(cases, self.case_finished)
         finally:
-            with self._mutex:
+            with self._round_condition:
                 self.round_finished += 1
+                self._round_condition.notify_all()
+
+    def do_cases(self, cases, on_finished):
+        """Run cases in sequence without counting finished round.
+
+        :param list cases: cases.
+        :param on_finished: callback method after each case is finished.
+        """
+        if self.profile is not None:
+            self.tag_stage(cases)
+        for case in cases:
+            if self.is_cancelled:
+                break
+            if case is not None:
+                if hasattr(case, 'on_finished'):
+                    case.on_finished = on_finished
+                case.do_case()
+                think_seconds = self.get_think_seconds(case)
+                if think_seconds > 0 and self._cancel_event.wait(think_seconds):
+                    break
+
+    def get_think_seconds(self, case):
+        """Get seconds to pause after case, from think time of case or think time of testing.
+
+        :param BaseCase case: case.
+        :return float: seconds.
+        """
+        think_time = getattr(case, 'think_time', None)
+        return thinktime.get_seconds(self.think_time if think_time is None else think_time)
+
+    def set_profile(self, profile):
+        """Set load profile, stage of each case will be logged into report.
+
+        :param loadprofile.LoadProfile profile: load profile.
+        """
+        self.profile = profile
+        if '"Stage"' not in self.additional_report_header:
+            self.additional_report_header.append('"Stage"')
+
+    def tag_stage(self, cases):
+        """Log current stage of load profile into cases.
+
+        :param list cases: cases.
+        """
+        stage_name = self.current_stage.name if self.current_stage else ''
+        for case in cases:
+            if case is not None:
+                case.additional_messages.append(stage_name)
+
+    def apply_target(self, target):
+        """Apply target of load profile, override it in test modes which support load profile.
+        Target is ignored in other test modes, command line does not set load profile for them.
+
+        :param float target: target concurrency or arrival rate.
+        """
+        pass
+
+    def update_profile(self):
+        """Apply current target of load profile, or cancel testing after the last stage.
+
+        :return bool: False if load profile is finished or testing is cancelled.
+        """
+        if self.is_cancelled:
+            return False
+        stage, target = self.profile.get_target(_clock() - self._profile_start_clock)
+        if stage is None:
+            print('Load profile is finished.')
+            self.cancel()
+            return False
+        if stage is not self.current_stage:
+            self.current_stage = stage
+            print('Starting stage %s...' % stage.name)
+        self.apply_target(target)
+        return True
+
+    def follow_profile(self):
+        """Apply target of load profile per PROFILE_INTERVAL_SECONDS seconds until it is finished."""
+        while not self.is_cancelled:
+            self._cancel_event.wait(PROFILE_INTERVAL_SECONDS)
+            if not self.update_profile():
+                break
+
+    def start_profile(self):
+        """Apply the first target of load profile, and follow the load profile in a thread."""
+        self._profile_start_clock = _clock()
+        self.update_profile()
+        self._profile_thread = threading.Thread(target=self.follow_profile)
+        self._profile_thread.start()
 
     def cancel(self):
         """Cancel testing."""
         self.is_cancelled = True
+        self._cancel_event.set()
         print('Cancelled at %s' % datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
 
     def stop_test(self):
         """Stop testing."""
-        self._stop_test_timer.cancel()
-        self._stop_test_timer = None
+        if self._stop_test_timer:
+            self._stop_test_timer.cancel()
+            self._stop_test_timer = None
         self.cancel()
 
     def start_test(self):
@@ -201,38 +472,91 @@ class NormalTest(object):
     def reset(self):
         """Reset: cancel existed testing, clean captured data."""
         self._stop_test_timer = None
+        self._finished_event.clear()
+        self._cancel_event.clear()
+        self._case_pool.clear()
+        self._profile_start_clock = None
+        self._profile_thread = None
+        self.current_stage = None
         self._file = None
-        self._socket = None
+        self._writer = None
+        self._encoder = None
+        self._sender = None
         self.is_cancelled = False
         self.round_finished = 0
         self.round_started = 0
+        self.case_finished_count = 0
+        self.case_failed_count = 0
+
+    def open_report(self):
+        """Open report file, or report sender if report server is set."""
+        if not self.no_report:
+            if self.report_server:
+                if self.report_transport == datagram.TCP:
+                    self._sender = datagram.StreamReportSender(
+                        self.report_server, self.report_send_interval, self.report_payload_limit)
+                else:
+                    self._sender = datagram.ReportSender(
+                        self.report_server, self.report_datagram_size, self.report_send_interval,
+                        self.report_payload_limit)
+                self._sender.start()
+            else:
+                self._file = self.create_report_file()
+                if self.report_batch_size > 0:
+                    self._writer = reportwriter.ReportWriter(
+                        self._file, self.report_batch_size, self.report_flush_interval,
+                        encode=self._encoder.encode if self._encoder is not None else None)
+                    self._writer.start()
+
+    def check_report_format(self):
+        """Check whether report format keeps additional columns of report, binary result log only keeps "Stage".
+
+        :raise ValueError: report format is binary and there are other additional columns.
+        """
+        if self.report_format == resultlog.BINARY:
+            headers = [h for h in self.additional_report_header if h != '"Stage"']
+            if headers:
+                raise ValueError('Binary report format cannot keep {} columns, please use csv report format.'.format(
+                    ' and '.join(headers)))
+
+    def create_report_file(self):
+        """Create report file under report folder and write header.
+        Binary result log(.ezr) is created instead if report format is binary.
+
+        :return: file object.
+        """
+        self.check_report_format()
+        if not os.path.exists(self.report_folder):
+            os.mkdir(self.report_folder)
+        file_name = 'report_%s' % datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')
+        if self.report_format == resultlog.BINARY:
+            f = open(os.path.join(self.report_folder, file_name + resultlog.FILE_EXTENSION), 'wb')
+            f.write(resultlog.HEADER)
+            self._encoder = resultlog.Encoder()
+            return f
+        report_file = os.path.join(self.report_folder, file_name + '.csv')
+        f = open(report_file, 'w')
+        f.write('"Repeat Index","Id","Description","Status","Expected","Received","Output",'
+                '"Starts DateTime","Ends DateTime","E2E Taken","Log Path"')
+        if self.additional_report_header:
+            for h in self.additional_report_header:
+                f.write(',%s' % h)
+        f.write('\n')
+        return f
 
     def run(self):
         """Do all cases in self.cases. All cases should inherit from BaseCase."""
         if len(self.cases) > 0:
             self.reset()
             try:
-                if not self.no_report:
-                    if self.report_server:
-                        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                    else:
-                        if not os.path.exists(self.report_folder):
-                            os.mkdir(self.report_folder)
-                        report_file = os.path.join(
-                            self.report_folder, 'report_%s.csv' % datetime.datetime.now().strftime('%Y%m%d%H%M%S%f'))
-                        f = open(report_file, 'w')
-                        f.write('"Repeat Index","Id","Description","Status","Expected","Received","Output",'
-                                '"Starts DateTime","Ends DateTime","E2E Taken","Log Path"')
-                        if self.additional_report_header:
-                            for h in self.additional_report_header:
-                                f.write(',%s' % h)
-                        f.write('\n')
-                        self._file = f
+                if self.report_queue is None:
+                    self.open_report()
                 if self.starts_time:
                     print('Waiting until %s...' % self.starts_time)
                     total_seconds = (self.starts_time - datetime.datetime.now()).total_seconds()
-                    if total_seconds > 0:
-                        time.sleep(total_seconds)
+                    if total_seconds > 0 and self._cancel_event.wait(total_seconds):
+                        self._finished_event.set()
+                        return
                 if self.ends_time:
                     print('Will be stopped at %s...' % self.ends_time)
                     total_seconds = (self.ends_time - datetime.datetime.now()).total_seconds()
@@ -240,6 +564,7 @@ class NormalTest(object):
                         self._stop_test_timer = threading.Timer(total_seconds, self.stop_test)
                         self._stop_test_timer.start()
                     else:
+                        self._finished_event.set()
                         return
                 if self.setup:
                     self.setup()
@@ -248,6 +573,9 @@ class NormalTest(object):
             except Exception:
                 print('-' * 80)
                 traceback.print_exc()
+                self._finished_event.set()
+        else:
+            self._finished_event.set()
 
 
 class ContinuousTest(NormalTest):
@@ -268,18 +596,19 @@ class ContinuousTest(NormalTest):
     def start_test(self):
         """Start Continuous testing."""
         try:
+            new_cases = None
             for rp1 in range(self.repeat_times):
                 self.current_round = rp1
                 print('Starting (%d) round...' % rp1)
-                new_cases = []
-                for c in self.cases:
-                    c2 = copy.deepcopy(c)
-                    c2.repeat_index = rp1
-                    new_cases.append(c2)
+                if new_cases is None:
+                    new_cases = self.new_cases(rp1, is_under_stress_test=False)
+                else:
+                    self.renew_cases(new_cases, rp1)
                 self.round_started += 1
                 self.run_cases(new_cases)
-                if self.interval_seconds > 0:
-                    time.sleep(self.interval_seconds)
+                if self.interval_seconds > 0 and rp1 < self.repeat_times - 1:
+                    if self._cancel_event.wait(self.interval_seconds):
+                        break
         except Exception:
             print('-' * 80)
             traceback.print_exc()
@@ -304,56 +633,99 @@ class SimultaneousTest(ContinuousTest):
     def __init__(self):
         super(SimultaneousTest, self).__init__()
         self.thread_count = 1
-        self._repeat_capture_timer = None
-        self.is_repeat_started = False
+        self._round_thread = None
+        self._thread_cases = []
         self.test_mode = SIMULTANEOUS
 
-    def repeat_capture_timer_method(self):
-        """Timer callback method: start next round of Simultaneous testing."""
-        run_required = False
-        if self.current_round >= self.repeat_times:
-            if self.round_finished >= self.round_started:
-                self._repeat_capture_timer.cancel()
-                self.process_finished()
-                return
-        elif self.is_repeat_started:
-            if self.round_finished >= self.round_started:
-                if self.interval_seconds > 0:
-                    time.sleep(self.interval_seconds)
-                run_required = True
-        else:
-            run_required = True
-        if run_required:
-            print('Starting (%d) round...' % self.current_round)
-            tds = []
-            for i in range(self.thread_count):
-                new_cases = []
-                for c in self.cases:
-                    c2 = copy.deepcopy(c)
-                    c2.is_under_stress_test = True
-                    c2.repeat_index = self.current_round
-                    new_cases.append(c2)
-                td = threading.Thread(target=self.run_cases, args=(new_cases,))
-                tds.append(td)
-            for td in tds:
-                if self.is_cancelled:
-                    return
+    def start_round(self):
+        """Start <thread_count> threads for current round."""
+        print('Starting (%d) round...' % self.current_round)
+        tds = []
+        for i in range(self.thread_count):
+            if i < len(self._thread_cases):
+                new_cases = self.renew_cases(self._thread_cases[i], self.current_round)
+            else:
+                new_cases = self.new_cases(self.current_round)
+                self._thread_cases.append(new_cases)
+            td = threading.Thread(target=self.run_cases, args=(new_cases,))
+            tds.append(td)
+        for td in tds:
+            if self.is_cancelled:
+                break
+            with self._round_condition:
                 self.round_started += 1
-                td.start()
-            self.current_round += 1
-            self.is_repeat_started = True
-        self._repeat_capture_timer = threading.Timer(1, self.repeat_capture_timer_method)
-        self._repeat_capture_timer.start()
+            td.start()
+        self.current_round += 1
+
+    def _do_rounds(self):
+        """Start next round as soon as all threads of previous round are finished."""
+        try:
+            while self.current_round < self.repeat_times and not self.is_cancelled:
+                if self.current_round > 0 and self.interval_seconds > 0:
+                    if self._cancel_event.wait(self.interval_seconds):
+                        break
+                self.start_round()
+                self.wait_rounds()
+        except Exception:
+            print('-' * 80)
+            traceback.print_exc()
+        finally:
+            self.wait_rounds()
+            self.process_finished()
 
     def start_test(self):
         """Start Simultaneous testing."""
-        self._repeat_capture_timer = threading.Timer(1, self.repeat_capture_timer_method)
-        self._repeat_capture_timer.start()
+        self._round_thread = threading.Thread(target=self._do_rounds)
+        self._round_thread.start()
 
     def reset(self):
         """Reset: cancel existed testing, clean captured data."""
         super(SimultaneousTest, self).reset()
-        self.is_repeat_started = False
+        self._round_thread = None
+        self._thread_cases = []
+
+
+class _ThreadCounter(object):
+    """Counters of a thread, which are only updated by that thread, and merged into testing after it exits."""
+    __slots__ = ['test', 'round_started', 'round_finished', 'case_finished_count', 'case_failed_count']
+
+    def __init__(self, test):
+        """Init.
+
+        :param NormalTest test: test mode object which cases are reported to.
+        """
+        self.test = test
+        self.round_started = 0
+        self.round_finished = 0
+        self.case_finished_count = 0
+        self.case_failed_count = 0
+
+    def case_finished(self, case):
+        """Process after case is finished: count it without locking and log output from case to report file.
+
+        :param BaseCase case: case.
+        """
+        self.case_finished_count += 1
+        if not case.status:
+            self.case_failed_count += 1
+        self.test.report_case(case)
+
+
+def _live_count(name):
+    """Count of ConcurrencyTest, which is the count merged from exited threads plus counts of running threads.
+
+    :param str name: name of count, e.g.: case_finished_count.
+    :return property: property.
+    """
+    merged_name = '_merged_' + name
+
+    def get_count(self):
+        with self._mutex_count:
+            return getattr(self, merged_name) + sum(getattr(counter, name) for counter in self._counters)
+
+    def set_count(self, value):
+        setattr(self, merged_name, value)
+    return property(get_count, set_count)
 
 
 class ConcurrencyTest(NormalTest):
@@ -364,54 +736,144 @@ class ConcurrencyTest(NormalTest):
         b.2 After all cases are finished, sleep <interval_seconds> seconds to release resources;
         b.3 Repeat #b.1 and #b.2 with <repeat_times> times.
 
+    Note: if <pacing_seconds> is set, each thread starts its rounds every <pacing_seconds> seconds instead, the time
+    cases took is subtracted from sleeping.
+    Each thread counts rounds and cases by itself without locking, round_started, round_finished, case_finished_count
+    and case_failed_count sum counts of running threads when they are read, and counts of a thread are merged into
+    them after it exits.
+
     All cases should inherit from testcase.BaseCase.
     """
+    round_started = _live_count('round_started')
+    round_finished = _live_count('round_finished')
+    case_finished_count = _live_count('case_finished_count')
+    case_failed_count = _live_count('case_failed_count')
+
     def __init__(self):
         super(ConcurrencyTest, self).__init__()
         self.thread_count = 1
         self.interval_seconds = 0
+        self.pacing_seconds = 0
+        self.alive_count = 0
+        self.worker_count = 0
+        self.target_count = 0
         self._mutex_count = threading.Lock()
-        self._count_capture_timer = None
+        self._counters = set()
         self.test_mode = CONCURRENCY
 
+    def _is_above_target(self):
+        """Whether there are more threads than target of load profile, current thread will exit if so.
+
+        :return bool: True if current thread should exit.
+        """
+        if self.worker_count <= self.target_count:
+            return False
+        with self._mutex_count:
+            if self.worker_count > self.target_count:
+                self.worker_count -= 1
+                return True
+        return False
+
+    def _exit_thread(self, counter=None):
+        """Merge counters of exited thread, the last exited thread processes finished testing.
+
+        :param _ThreadCounter counter: counters of exited thread.
+        """
+        with self._mutex_count:
+            if counter is not None:
+                self._counters.discard(counter)
+                self._merged_round_started += counter.round_started
+                self._merged_round_finished += counter.round_finished
+                self._merged_case_finished_count += counter.case_finished_count
+                self._merged_case_failed_count += counter.case_failed_count
+            self.alive_count -= 1
+            is_last = self.alive_count == 0
+        if is_last:
+            self.process_finished()
+
     def _do_in_thread(self):
         """Continuously run cases in each thread."""
-        rpi = 0
-        while not self.is_cancelled:
-            new_cases = []
-            for c in self.cases:
-                c2 = copy.deepcopy(c)
-                c2.is_under_stress_test = True
-                c2.repeat_index = rpi
-                new_cases.append(c2)
-            rpi += 1
-            with self._mutex_count:
-                self.round_started += 1
-            self.run_cases(new_cases)
-            if self.interval_seconds > 0:
-                time.sleep(self.interval_seconds)
-
-    def _count_capture_timer_method(self):
-        """Timer callback method: start next round of Concurrency testing."""
-        if self.round_finished >= self.round_started:
-            self._count_capture_timer.cancel()
-            self.process_finished()
-        else:
-            self._count_capture_timer = threading.Timer(1, self._count_capture_timer_method)
-            self._count_capture_timer.start()
+        counter = _ThreadCounter(self)
+        with self._mutex_count:
+            self._counters.add(counter)
+        try:
+            rpi = 0
+            new_cases = self.new_cases(rpi)
+            while not self.is_cancelled:
+                if self.profile is not None and self._is_above_target():
+                    break
+                if rpi > 0:
+                    self.renew_cases(new_cases, rpi)
+                rpi += 1
+                counter.round_started += 1
+                round_clock = _clock()
+                try:
+                    self.do_cases(new_cases, counter.case_finished)
+                finally:
+                    counter.round_finished += 1
+                pause_seconds = self.get_pause_seconds(round_clock)
+                if pause_seconds > 0:
+                    self._cancel_event.wait(pause_seconds)
+        except Exception:
+            print('-' * 80)
+            traceback.print_exc()
+        finally:
+            self._exit_thread(counter)
+
+    def get_pause_seconds(self, round_clock):
+        """Get seconds to pause after a round.
+
+        :param float round_clock: clock time when the round is started.
+        :return float: <pacing_seconds> minus seconds the round took if pacing is set, otherwise <interval_seconds>.
+        """
+        if self.pacing_seconds > 0:
+            return self.pacing_seconds - (_clock() - round_clock)
+        return self.interval_seconds
+
+    def apply_target(self, target):
+        """Start threads, or let threads exit after their current round, to reach target concurrency.
+
+        :param float target: target count of threads.
+        """
+        with self._mutex_count:
+            self.target_count = int(round(target))
+            start_count = self.target_count - self.worker_count
+            if start_count > 0:
+                self.worker_count += start_count
+                self.alive_count += start_count
+        for i in range(start_count):
+            threading.Thread(target=self._do_in_thread).start()
+
+    def follow_profile(self):
+        """Follow load profile, and then count profile thread as exited."""
+        try:
+            super(ConcurrencyTest, self).follow_profile()
+        finally:
+            self._exit_thread()
 
     def start_test(self):
         """Start Concurrency testing."""
+        if self.profile is not None:
+            self.alive_count = 1
+            self.start_profile()
+            return
         tds = []
         for i in range(self.thread_count):
             td = threading.Thread(target=self._do_in_thread)
             tds.append(td)
+        self.alive_count = self.worker_count = self.target_count = len(tds)
+        if not tds:
+            self.process_finished()
         for td in tds:
-            if self.is_cancelled:
-                return
             td.start()
-        self._count_capture_timer = threading.Timer(1, self._count_capture_timer_method)
-        self._count_capture_timer.start()
+
+    def reset(self):
+        """Reset: cancel existed testing, clean captured data."""
+        super(ConcurrencyTest, self).reset()
+        self.alive_count = 0
+        self.worker_count = 0
+        self.target_count = 0
+        self._counters = set()
 
 
 class FrequentTest(NormalTest):
@@ -431,60 +893,346 @@ class FrequentTest(NormalTest):
         self.thread_started = 0
         self.thread_finished = 0
         self.test_mode = FREQUENT
-        self._repeat_capture_timer = None
+        self._round_thread = None
 
     def reset(self):
         """Reset: cancel existed testing, clean captured data."""
         super(FrequentTest, self).reset()
         self.thread_started = 0
         self.thread_finished = 0
+        self._round_thread = None
 
     def run_cases(self, cases):
         """Run cases in sequence.
 
         :param list cases: cases."""
-        super(FrequentTest, self).run_cases(cases)
+        try:
+            super(FrequentTest, self).run_cases(cases)
+        finally:
+            self.release_cases(cases)
         self.thread_finished += 1
 
-    def repeat_capture_timer_method(self):
-        """Timer callback method: start next round of Frequent testing."""
-        if self.is_cancelled:
-            if self.round_finished >= self.round_started:
-                self._repeat_capture_timer.cancel()
-                self.process_finished()
-                return
+    def start_round(self):
+        """Start next round of Frequent testing."""
+        print('Starting (%d) round...' % self.current_round)
+        if self.max_thread_count <= self.thread_count:
+            available_count = self.thread_count
         else:
-            print('Starting (%d) round...' % self.current_round)
-            if self.max_thread_count <= self.thread_count:
+            available_count = self.max_thread_count - (self.thread_started - self.thread_finished)
+            if available_count > self.thread_count:
                 available_count = self.thread_count
-            else:
-                available_count = self.max_thread_count - (self.thread_started - self.thread_finished)
-                if available_count > self.thread_count:
-                    available_count = self.thread_count
-            tds = []
-            for i in range(available_count):
-                new_cases = []
-                for c in self.cases:
-                    c2 = copy.deepcopy(c)
-                    c2.is_under_stress_test = True
-                    c2.repeat_index = self.current_round
-                    new_cases.append(c2)
-                td = threading.Thread(target=self.run_cases, args=(new_cases,))
-                tds.append(td)
-            for td in tds:
-                if self.is_cancelled:
-                    return
+        started_count = 0
+        for i in range(available_count):
+            if self.is_cancelled:
+                break
+            new_cases = self.acquire_cases(self.current_round)
+            td = threading.Thread(target=self.run_cases, args=(new_cases,))
+            with self._round_condition:
                 self.round_started += 1
-                td.start()
-            self.current_round += 1
-            self.thread_started += available_count
-            print('Initialized %d threads' % available_count)
+            td.start()
+            started_count += 1
+        self.current_round += 1
+        self.thread_started += started_count
+        print('Initialized %d threads' % started_count)
+
+    def finish_rounds(self):
+        """Wait until all started rounds are finished."""
+        self.wait_rounds()
+
+    def apply_target(self, target):
+        """Apply target of load profile.
 
-        self._repeat_capture_timer = threading.Timer(self.interval_seconds, self.repeat_capture_timer_method)
-        self._repeat_capture_timer.start()
+        :param float target: target count of threads started per <interval_seconds> seconds.
+        """
+        self.thread_count = int(round(target))
+
+    def _do_rounds(self):
+        """Start a round per <interval_seconds> seconds until testing is cancelled, then wait for running rounds."""
+        try:
+            next_clock = _clock()
+            while not self.is_cancelled:
+                self.start_round()
+                next_clock += self.interval_seconds
+                self._cancel_event.wait(max(next_clock - _clock(), 0))
+        except Exception:
+            print('-' * 80)
+            traceback.print_exc()
+        finally:
+            self.finish_rounds()
+            self.process_finished()
 
     def start_test(self):
         """Start Frequent testing."""
         if self.interval_seconds is None or self.interval_seconds < 1:
             self.interval_seconds = 1
-        self.repeat_capture_timer_method()
\ No newline at end of file
+        if self.profile is not None:
+            self.start_profile()
+        self._round_thread = threading.Thread(target=self._do_rounds)
+        self._round_thread.start()
+
+
+class FrequentPoolTest(FrequentTest):
+    """Frequent Pool Test:
+    a. Start <max_thread_count> long-lived worker threads (<thread_count> if <max_thread_count> is not set);
+    b. Put <thread_count> arrivals into a bounded queue per <interval_seconds> seconds;
+    c. Each worker takes arrivals from the queue and runs self.cases one by one for each of them.
+
+    Note: the queue can hold <queue_size> arrivals (the count of workers if it is not set), arrivals are dropped if
+    the queue is full. Arrivals which have to wait for a free worker are counted as queued.
+
+    All cases should inherit from testcase.BaseCase.
+    """
+    def __init__(self):
+        super(FrequentPoolTest, self).__init__()
+        self.queue_size = 0
+        self.queued_count = 0
+        self.dropped_count = 0
+        self.busy_count = 0
+        self.test_mode = FREQUENT_POOL
+        self._queue = None
+        self._workers = []
+
+    def reset(self):
+        """Reset: cancel existed testing, clean captured data."""
+        super(FrequentPoolTest, self).reset()
+        self.queued_count = 0
+        self.dropped_count = 0
+        self.busy_count = 0
+        self._queue = None
+        self._workers = []
+
+    def get_worker_count(self):
+        """Get count of worker threads.
+
+        :return int: <max_thread_count> if it is set, otherwise <thread_count>.
+        """
+        return self.max_thread_count if self.max_thread_count > 0 else self.thread_count
+
+    def _do_in_worker(self):
+        """Take arrivals from queue and run cases for each of them, until None is taken."""
+        new_cases = self.new_cases()
+        while True:
+            arrival = self._queue.get()
+            if arrival is None:
+                break
+            with self._mutex:
+                self.busy_count += 1
+            try:
+                self.run_arrival(arrival, new_cases)
+            finally:
+                with self._mutex:
+                    self.busy_count -= 1
+
+    def run_arrival(self, arrival, cases):
+        """Run cases for an arrival taken from queue.
+
+        :param int arrival: repeat index.
+        :param list cases: cases of worker, which are reused for each arrival.
+        """
+        self.run_cases(self.renew_cases(cases, arrival))
+
+    def release_cases(self, cases):
+        """Cases belong to worker and are reused for its next arrival, so they are not released into case pool.
+
+        :param list cases: cases of worker.
+        """
+        pass
+
+    def put_arrival(self, arrival):
+        """Put an arrival into queue.
+
+        :param arrival: arrival which will be passed to run_arrival.
+        :return int: 0 if a worker is free for it, 1 if it is queued, 2 if it is dropped.
+        """
+        with self._mutex:
+            is_idle = self.busy_count + self._queue.qsize() < len(self._workers)
+        try:
+            self._queue.put_nowait(arrival)
+        except queue.Full:
+            self.dropped_count += 1
+            return 2
+        with self._mutex:
+            self.round_started += 1
+        if is_idle:
+            return 0
+        self.queued_count += 1
+        return 1
+
+    def _stop_workers(self):
+        """Stop all worker threads and wait until they exit."""
+        for _ in self._workers:
+            self._queue.put(None)
+        for td in self._workers:
+            td.join()
+        self._workers = []
+
+    def process_finished(self):
+        """Process after testing is finished: print arrival statistics, and then close report file etc."""
+        print('-' * 80)
+        print('Arrivals: %d started, %d queued, %d dropped' % (self.round_started, self.queued_count, self.dropped_count))
+        super(FrequentPoolTest, self).process_finished()
+
+    def start_round(self):
+        """Put next round of arrivals into queue."""
+        queued, dropped = 0, 0
+        for i in range(self.thread_count):
+            result = self.put_arrival(self.current_round)
+            if result == 1:
+                queued += 1
+            elif result == 2:
+                dropped += 1
+        print('Starting (%d) round: %d arrivals, %d queued, %d dropped' % (
+            self.current_round, self.thread_count, queued, dropped))
+        self.current_round += 1
+
+    def finish_rounds(self):
+        """Stop all worker threads after queued arrivals are finished."""
+        self._stop_workers()
+
+    def start_workers(self):
+        """Create queue and start worker threads."""
+        worker_count = self.get_worker_count()
+        self._queue = queue.Queue(maxsize=self.queue_size if self.queue_size > 0 else worker_count)
+        for i in range(worker_count):
+            td = threading.Thread(target=self._do_in_worker)
+            self._workers.append(td)
+            td.start()
+        print('Started %d workers' % worker_count)
+
+    def start_test(self):
+        """Start Frequent Pool testing."""
+        if self.interval_seconds is None or self.interval_seconds < 1:
+            self.interval_seconds = 1
+        self.start_workers()
+        if self.profile is not None:
+            self.start_profile()
+        self._round_thread = threading.Thread(target=self._do_rounds)
+        self._round_thread.start()
+
+
+class ArrivalRateTest(FrequentPoolTest):
+    """Arrival Rate Test:
+    a. Start <max_thread_count> long-lived worker threads (<thread_count> if <max_thread_count> is not set);
+    b. Put arrivals into a bounded queue with <arrival_rate> arrivals per second, following a monotonic clock schedule;
+    c. Each worker takes arrivals from the queue and runs self.cases one by one for each of them.
+
+    Note: the n-th arrival is intended to start at <n / arrival_rate> seconds after testing is started, arrivals which
+    are late are put into queue immediately, so the offered load does not drift by sleeping or queuing time.
+    "Intended DateTime" and "Schedule Lag" are appended to each case in report, schedule lag is the seconds between
+    the intended start time and the time a worker takes the arrival. Cases of arrivals which are dropped because the
+    queue is full are reported as failed, with the schedule lag when they are dropped.
+
+    All cases should inherit from testcase.BaseCase.
+    """
+    def __init__(self):
+        super(ArrivalRateTest, self).__init__()
+        self.arrival_rate = 1.0
+        self.additional_report_header = ['"Intended DateTime"', '"Schedule Lag"']
+        self.test_mode = ARRIVAL_RATE
+        self.max_schedule_lag = 0.0
+        self.total_schedule_lag = 0.0
+        self._schedule_thread = None
+
+    def reset(self):
+        """Reset: cancel existed testing, clean captured data."""
+        super(ArrivalRateTest, self).reset()
+        self.max_schedule_lag = 0.0
+        self.total_schedule_lag = 0.0
+        self._schedule_thread = None
+
+    def run_arrival(self, arrival, cases):
+        """Run cases for an arrival taken from queue, and log its schedule lag into each case.
+
+        :param tuple arrival: (repeat index, intended clock time, intended datetime).
+        :param list cases: cases of worker, which are reused for each arrival.
+        """
+        repeat_index, intended_clock, intended_datetime = arrival
+        schedule_lag = max(_clock() - intended_clock, 0.0)
+        with self._mutex:
+            self.total_schedule_lag += schedule_lag
+            if schedule_lag > self.max_schedule_lag:
+                self.max_schedule_lag = schedule_lag
+        for c in self.renew_cases(cases, repeat_index):
+            c.additional_messages.append(utility.date2str(intended_datetime))
+            c.additional_messages.append('%.6f' % schedule_lag)
+        self.run_cases(cases)
+
+    def drop_arrival(self, arrival):
+        """Report cases of an arrival which is dropped because queue is full as failed, with its intended start time and
+        schedule lag, so that report does not hide the load which is not served.
+
+        :param tuple arrival: (repeat index, intended clock time, intended datetime).
+        """
+        repeat_index, intended_clock, intended_datetime = arrival
+        schedule_lag = max(_clock() - intended_clock, 0.0)
+        dtnow = datetime.datetime.now()
+        cases = self.new_cases(repeat_index)
+        for c in cases:
+            if c is not None:
+                c.start_datetime = c.end_datetime = dtnow
+                c.status = False
+                c.output_messages.append('Arrival is dropped because queue is full.')
+                c.additional_messages.append(utility.date2str(intended_datetime))
+                c.additional_messages.append('%.6f' % schedule_lag)
+        if self.profile is not None:
+            self.tag_stage(cases)
+        for c in cases:
+            if c is not None:
+                self.case_finished(c)
+
+    def get_intended_seconds(self, index):
+        """Get seconds after testing is started when the arrival is intended to start.
+
+        :param int index: index of arrival.
+        :return float: seconds, None if load profile is finished before that.
+        """
+        if self.profile is not None:
+            return self.profile.get_arrival_seconds(index)
+        return index / self.arrival_rate
+
+    def apply_target(self, target):
+        """Apply target of load profile, arrivals are scheduled by load profile directly.
+
+        :param float target: target arrival rate.
+        """
+        self.arrival_rate = target
+
+    def _schedule(self):
+        """Put arrivals into queue following the schedule until testing is cancelled."""
+        try:
+            start_clock = self._profile_start_clock if self.profile is not None else _clock()
+            start_datetime = datetime.datetime.now() - datetime.timedelta(seconds=_clock() - start_clock)
+            index = 0
+            while not self.is_cancelled:
+                intended = self.get_intended_seconds(index)
+                if intended is None:
+                    self._cancel_event.wait()
+                    break
+                delay = start_clock + intended - _clock()
+                if delay > 0:
+                    self._cancel_event.wait(delay)
+                    continue
+                arrival = (index, start_clock + intended, start_datetime + datetime.timedelta(seconds=intended))
+                if self.put_arrival(arrival) == 2:
+                    self.drop_arrival(arrival)
+                index += 1
+        finally:
+            self._stop_workers()
+            self.process_finished()
+
+    def process_finished(self):
+        """Process after testing is finished: print schedule lag statistics, and then close report file etc."""
+        print('-' * 80)
+        print('Schedule lag: average %.6f, maximum %.6f seconds' % (
+            self.total_schedule_lag / self.round_finished if self.round_finished else 0.0, self.max_schedule_lag))
+        super(ArrivalRateTest, self).process_finished()
+
+    def start_test(self):
+        """Start Arrival Rate testing."""
+        if self.profile is None and (self.arrival_rate is None or self.arrival_rate <= 0):
+            raise ValueError('Arrival rate should be greater than 0.')
+        self.start_workers()
+        if self.profile is not None:
+            self.start_profile()
+        self._schedule_thread = threading.Thread(target=self._schedule)
+        self._schedule_thread.start()
@@ -0,0 +1,86 @@
+"""Think time: seconds which a virtual user pauses after each case, to model how realistic users pause between steps.
+
+Distribution can be:
+constant:seconds            e.g.: "constant:1" or "1", always pause 1 second.
+uniform:minimum:maximum     e.g.: "uniform:0.5:1.5", pause random seconds between 0.5 and 1.5.
+exponential:mean            e.g.: "exponential:1", pause random seconds which follow exponential distribution with mean 1.
+
+usage:
+think_time = parse_think_time('uniform:0.5:1.5')
+think_time.next()           # Get seconds to pause.
+
+# Or define think time of a case, which overrides think time of testing.
+class MyCase(BaseCase):
+    def __init__(self):
+        super(MyCase, self).__init__()
+        self.think_time = ThinkTime(EXPONENTIAL, 3)
+"""
+import random
+
+CONSTANT = 'constant'
+UNIFORM = 'uniform'
+EXPONENTIAL = 'exponential'
+PARAMETER_COUNTS = {CONSTANT: 1, UNIFORM: 2, EXPONENTIAL: 1}
+
+
+class ThinkTime(object):
+    """Think time with distribution."""
+    def __init__(self, distribution=CONSTANT, *parameters):
+        """Init.
+
+        :param str distribution: constant, uniform or exponential.
+        :param parameters: seconds for constant, minimum and maximum seconds for uniform, mean seconds for exponential.
+        """
+        if distribution not in PARAMETER_COUNTS:
+            raise ValueError('Think time distribution should be one of {}.'.format(', '.join(sorted(PARAMETER_COUNTS))))
+        if len(parameters) != PARAMETER_COUNTS[distribution]:
+            raise ValueError('Think time distribution {} requires {} parameters.'.format(
+                distribution, PARAMETER_COUNTS[distribution]))
+        self.distribution = distribution
+        self.parameters = [float(p) for p in parameters]
+        if any(p < 0 for p in self.parameters):
+            raise ValueError('Think time should not be negative.')
+        if distribution == UNIFORM and self.parameters[0] > self.parameters[1]:
+            raise ValueError('Minimum think time should not be greater than maximum think time.')
+
+    def next(self):
+        """Get seconds to pause.
+
+        :return float: seconds.
+        """
+        if self.distribution == UNIFORM:
+            return random.uniform(self.parameters[0], self.parameters[1])
+        elif self.distribution == EXPONENTIAL:
+            return random.expovariate(1.0 / self.parameters[0]) if self.parameters[0] > 0 else 0.0
+        return self.parameters[0]
+
+    def __str__(self):
+        return ':'.join([self.distribution] + ['{:g}'.format(p) for p in self.parameters])
+
+
+def parse_think_time(value):
+    """Parse think time from "distribution:parameters" or seconds.
+
+    :param str value: think time string.
+    :return ThinkTime: think time.
+    """
+    parts = str(value).split(':')
+    if len(parts) == 1:
+        parts.insert(0, CONSTANT)
+    try:
+        return ThinkTime(parts[0].lower(), *parts[1:])
+    except ValueError as e:
+        raise ValueError('Think time "{}" is invalid, {}'.format(value, str(e)))
+
+
+def get_seconds(think_time):
+    """Get seconds to pause from think time.
+
+    :param ThinkTime|float think_time: think time, or seconds.
+    :return float: seconds, 0 if think time is None.
+    """
+    if think_time is None:
+        return 0
+    elif isinstance(think_time, ThinkTime):
+        return think_time.next()
+    return think_time
@@ -140,6 +140,17 @@ def total_seconds(start_date, ends_date, date_format=None):
     return (timedelta.microseconds + (timedelta.seconds + timedelta.days * 24 * 3600) * 10.0 ** 6) / 10.0 ** 6
 
 
+def split_value(value, count, index):
+    """Split value into count shares as even as possible, and get share of index.
+
+    :param int value: value to be split.
+    :param int count: count of shares.
+    :param int index: index of share.
+    :return int: share of index.
+    """
+    return value // count + (1 if index < value % count else 0)
+
+
 def compare_str(string1, string2, ignore_case=False):
     """Compare two strings.
     1 : first string is larger than the second
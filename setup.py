@@ -35,6 +35,7 @@ setup(
         "Intended Audience :: Developers",
     ],
     install_requires=['psutil'],
+    extras_require={'zstd': ['zstandard']},
     keywords='performance load test testing performance-test load-test performance-testing load-testing',
     license="GPL",
     platforms=["Windows", "MacOS", "Unix", "Linux"],